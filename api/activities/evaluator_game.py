@@ -1,13 +1,34 @@
-from sentence_transformers import SentenceTransformer, util
-import spacy
 import os
+import threading
+
+import registro_modelos
+from cache_sujetos import get_cache_sujetos
+from embeddings_texto import get_almacen_embeddings
+from .lexico_sujetos import TrieTokens, tokenizar, variantes
 
 # Forzar uso de CPU si hay incompatibilidad CUDA
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
-nlp = spacy.load("es_core_news_sm")
 
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", device='cpu')
+# spaCy y el SentenceTransformer viven en el registro compartido del proceso
+# (registro_modelos.py): se cargan una sola vez, en el primer uso.
+def get_nlp():
+    """Pipeline de spaCy en español compartido."""
+    return registro_modelos.get_nlp("juegos")
+
+
+def get_modelo_similitud():
+    """SentenceTransformer multilingüe compartido para similitud semántica."""
+    return registro_modelos.get_sentence_transformer("juegos")
+
+
+def __getattr__(nombre):
+    # Compatibilidad con el código que usaba los globales `nlp` y `model`
+    if nombre == "nlp":
+        return get_nlp()
+    if nombre == "model":
+        return get_modelo_similitud()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 GENERICOS = {
     "animal", "cosa", "ser", "objeto", "elemento", "lugar",
@@ -61,9 +82,8 @@ def similitud_semantica(texto1: str, texto2: str) -> float:
     Calcula la similitud semántica entre dos textos usando Sentence Transformers.
     Devuelve un valor aproximado entre 0 y 1.
     """
-    emb1 = model.encode(texto1, convert_to_tensor=True, device='cpu')
-    emb2 = model.encode(texto2, convert_to_tensor=True, device='cpu')
-    return util.cos_sim(emb1, emb2).item()
+    # Embeddings cacheados y codificados en lote (embeddings_texto.py)
+    return get_almacen_embeddings().similitud(texto1, texto2)
 
 
 def obtener_sujeto(frase: str):
@@ -77,27 +97,133 @@ def obtener_sujeto(frase: str):
     - Para sistemas del cuerpo, usa "sistema X" completo
     - Prioriza sustantivos después de ":" si existe
     - Busca el sustantivo más específico, no el primero
+
+    El resultado se memoiza por frase normalizada (cache_sujetos.py).
     """
-    # Si la frase tiene ":", verificar si es un sistema del cuerpo
+    return get_cache_sujetos("juegos").memo(frase, lambda: _obtener_sujeto_sin_cache(frase))
+
+
+def precalcular_sujetos(frases):
+    """Cachea los sujetos de `frases` (ej: los captions del catálogo al arrancar)."""
+    for frase in dict.fromkeys(frases):
+        obtener_sujeto(frase)
+
+
+def _obtener_sujeto_sin_cache(frase: str):
+    # Camino rápido: animal o sistema del cuerpo conocido, sin spaCy
+    sujeto = _sujeto_por_lexico(frase)
+    _contar_lexico(sujeto is not None)
+    if sujeto is not None:
+        return sujeto
+
+    # Si hay contenido después del ":", procesar esa parte
     if ":" in frase:
-        partes = frase.split(":", 1)
-        prefijo = partes[0].strip().lower()
+        frase_principal = frase.split(":", 1)[1].strip()
+        sujeto_principal = _extraer_sujeto_de_texto(frase_principal)
+        if sujeto_principal:
+            return sujeto_principal
+    
+    # Si no hay ":" o no se encontró sujeto después, procesar toda la frase
+    return _extraer_sujeto_de_texto(frase)
+
+
+# ============================================
+# ⚡ Camino rápido por léxico (sin spaCy)
+# ============================================
+
+_trie_sujetos = None
+_trie_sujetos_lock = threading.Lock()
+_lexico_hits = 0
+_lexico_misses = 0
+
+
+# Determinantes tras los que un animal del léxico es sustantivo para spaCy
+# (normalizados como en lexico_sujetos.tokenizar: minúsculas, sin tildes)
+DETERMINANTES = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "del", "al",
+    "este", "esta", "estos", "estas", "ese", "esa", "esos", "esas",
+    "aquel", "aquella", "aquellos", "aquellas",
+    "mi", "mis", "tu", "tus", "su", "sus",
+}
+
+
+def get_trie_sujetos():
+    """
+    Trie con ANIMALES_PRIORITARIOS en singular y plural. Se arma una sola
+    vez.
+    """
+    global _trie_sujetos
+    if _trie_sujetos is None:
+        with _trie_sujetos_lock:
+            if _trie_sujetos is None:
+                trie = TrieTokens()
+                for animal in ANIMALES_PRIORITARIOS:
+                    for forma in variantes(animal):
+                        trie.agregar(forma, animal)
+                _trie_sujetos = trie
+    return _trie_sujetos
+
+
+def _sujeto_por_lexico(frase: str):
+    """
+    Sujeto de la frase si se puede decidir solo con el léxico (None si hace
+    falta spaCy). Solo responde en los casos donde _obtener_sujeto_sin_cache
+    llega a la misma respuesta con spaCy:
+    - Un sistema del cuerpo en el título ("Sistema digestivo: ..."): es la
+      misma regla de texto que se aplicaba antes de spaCy
+    - El primer animal del texto (después del ":" si lo hay), solo si va
+      justo después de un determinante ("un mono", "los leones"): ahí spaCy
+      lo etiqueta como sustantivo dentro de un noun chunk y devuelve ese
+      mismo animal aunque haya otros sustantivos antes. Si el primer animal
+      va en otra posición ("es muy mono", "Perros jugando") decide spaCy
+
+    "sistema X" sin título no se resuelve aquí: spaCy devuelve "sistema"
+    ("digestivo" es un adjetivo fuera del sustantivo).
+
+    Diferencia conocida: el modelo de spaCy a veces etiqueta mal un animal
+    tras un determinante (en el catálogo, "de la mariposa" sale como ADJ y
+    spaCy responde "huevo"); el léxico responde "mariposa". Se lista con
+    paridad_lexico_sujetos.py.
+    """
+    texto = frase
+    if ":" in frase:
+        prefijo, texto = frase.split(":", 1)
+        prefijo = prefijo.strip().lower()
         
         # Verificar si el prefijo contiene "sistema" + nombre de sistema
         for sistema in SISTEMAS_CUERPO:
             if sistema in prefijo:
                 # Devolver "sistema circulatorio", "sistema digestivo", etc.
                 return f"sistema {sistema}"
-        
-        # Si no es un sistema pero hay contenido después del ":", procesar esa parte
-        if len(partes) > 1:
-            frase_principal = partes[1].strip()
-            sujeto_principal = _extraer_sujeto_de_texto(frase_principal)
-            if sujeto_principal:
-                return sujeto_principal
-    
-    # Si no hay ":" o no se encontró sujeto después, procesar toda la frase
-    return _extraer_sujeto_de_texto(frase)
+
+    coincidencias = get_trie_sujetos().buscar(texto)
+    if not coincidencias:
+        return None
+    posicion, _, animal = coincidencias[0]
+    if posicion > 0 and tokenizar(texto)[posicion - 1] in DETERMINANTES:
+        return animal
+    return None
+
+
+def _contar_lexico(hit):
+    global _lexico_hits, _lexico_misses
+    with _trie_sujetos_lock:
+        if hit:
+            _lexico_hits += 1
+        else:
+            _lexico_misses += 1
+
+
+def stats_lexico():
+    """Tasa de sujetos resueltos por el léxico sin spaCy (para /stats)."""
+    with _trie_sujetos_lock:
+        total = _lexico_hits + _lexico_misses
+        return {
+            "hits": _lexico_hits,
+            "misses_spacy": _lexico_misses,
+            "hit_rate": round(_lexico_hits / total, 4) if total else 0.0,
+            "patrones": _trie_sujetos.patrones if _trie_sujetos is not None else None,
+        }
 
 
 def _extraer_sujeto_de_texto(texto: str):
@@ -105,7 +231,7 @@ def _extraer_sujeto_de_texto(texto: str):
     Extrae el sujeto de un texto, ignorando categorías genéricas.
     Prioriza animales sobre sustantivos cuantitativos (variedad, tipo, etc.).
     """
-    doc = nlp(texto)
+    doc = get_nlp()(texto)
     candidatos = []
     animales_encontrados = []
 
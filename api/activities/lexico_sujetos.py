@@ -0,0 +1,104 @@
+"""
+Léxico de sujetos conocidos para extraer el sujeto sin spaCy.
+
+La mayoría de las descripciones nombran un animal de ANIMALES_PRIORITARIOS
+("un burro", "los leones"). Cuando el animal va tras un determinante, spaCy
+termina en la misma respuesta, así que basta con buscar las palabras del
+léxico (las reglas están en evaluator_game._sujeto_por_lexico y la paridad
+con spaCy se revisa con paridad_lexico_sujetos.py).
+
+TrieTokens es un trie de tokens normalizados (minúsculas, sin tildes): cada
+patrón es una secuencia de tokens ("sistema", "digestivo") y una frase se
+recorre una sola vez, devolviendo las coincidencias más largas de izquierda
+a derecha, sin solaparse. Cada forma del léxico se registra en singular y en
+plural ("burro"/"burros", "león"/"leones", "pez"/"peces").
+
+Uso:
+    trie = TrieTokens()
+    for forma in variantes("burro"):
+        trie.agregar(forma, ("animal", "burro"))
+    trie.buscar("Burros en su hábitat")  # [(0, 1, ("animal", "burro"))]
+"""
+
+import re
+import unicodedata
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_token(palabra):
+    """Minúsculas y sin tildes ("León" -> "leon"; la ñ se conserva)."""
+    palabra = unicodedata.normalize("NFD", palabra.lower())
+    palabra = "".join(c for c in palabra if not unicodedata.combining(c) or c == "\u0303")
+    return unicodedata.normalize("NFC", palabra)
+
+
+def tokenizar(texto):
+    """Tokens normalizados de un texto (solo palabras, sin puntuación)."""
+    return [normalizar_token(palabra) for palabra in _PALABRA.findall(texto)]
+
+
+def plural(palabra):
+    """Plural en español de un sustantivo ("pez" -> "peces", "león" -> "leones")."""
+    if palabra.endswith("z"):
+        return palabra[:-1] + "ces"
+    if palabra[-1] in "aeiouáéó":
+        return palabra + "s"
+    return palabra + "es"
+
+
+def variantes(forma):
+    """Singular y plural de cada palabra de la forma ("sistema digestivo" -> 4 variantes)."""
+    resultado = [[]]
+    for palabra in forma.split():
+        resultado = [previas + [alternativa] for previas in resultado
+                     for alternativa in (palabra, plural(palabra))]
+    return [" ".join(palabras) for palabras in resultado]
+
+
+class TrieTokens:
+    """
+    Matcher de múltiples patrones sobre tokens (trie de palabras).
+    """
+
+    _FIN = object()
+
+    def __init__(self):
+        self._raiz = {}
+        self.patrones = 0
+
+    def agregar(self, patron, valor):
+        """Registra un patrón (texto de una o más palabras) con su valor."""
+        nodo = self._raiz
+        for token in tokenizar(patron):
+            nodo = nodo.setdefault(token, {})
+        if self._FIN not in nodo:
+            self.patrones += 1
+        nodo[self._FIN] = valor
+
+    def buscar(self, texto):
+        """
+        Coincidencias del texto, de izquierda a derecha y sin solaparse
+        (en cada posición gana el patrón más largo).
+
+        Returns:
+            list de (posicion_token, n_tokens, valor)
+        """
+        tokens = tokenizar(texto)
+        coincidencias = []
+        i = 0
+        while i < len(tokens):
+            nodo = self._raiz
+            mejor = None
+            j = i
+            while j < len(tokens) and tokens[j] in nodo:
+                nodo = nodo[tokens[j]]
+                j += 1
+                if self._FIN in nodo:
+                    mejor = (i, j - i, nodo[self._FIN])
+            if mejor is not None:
+                coincidencias.append(mejor)
+                i += mejor[1]
+            else:
+                i += 1
+        return coincidencias
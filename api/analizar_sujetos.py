@@ -3,7 +3,7 @@ Script para analizar los sujetos detectados por el evaluador en todas las descri
 
 Este script:
 1. Lee el CSV con las descripciones del modelo
-2. Envía cada descripción al endpoint /evaluate
+2. Envía todas las descripciones en una sola petición a /evaluate-batch
 3. Extrae el sujeto_modelo detectado
 4. Genera un CSV con: folder_name, content, sujeto_modelo
 """
@@ -14,7 +14,7 @@ import json
 from pathlib import Path
 
 # Configuración
-API_URL = "http://localhost:8000/evaluate"
+API_URL = "http://localhost:8000/evaluate-batch"
 INPUT_CSV = "descripciones.csv"
 OUTPUT_CSV = "analisis_sujetos.csv"
 
@@ -85,48 +85,45 @@ def analizar_sujetos():
     resultados = []
     errores = []
     
-    for idx, row in enumerate(reader, 1):
-        folder = row['folder_name']
-        content = row['content']
+    filas = list(reader)
+    
+    try:
+        # Una sola petición con todos los pares (se usa la misma descripción
+        # en ambos lados para extraer el sujeto)
+        payload = {
+            "pares": [
+                {"texto_modelo": row['content'], "texto_nino": row['content']}
+                for row in filas
+            ],
+            "umbral": 0.5
+        }
         
-        print(f"[{idx}/44] {folder}...", end=" ")
+        response = requests.post(API_URL, json=payload, timeout=120)
+        response.raise_for_status()
         
-        try:
-            # Hacer petición al endpoint
-            payload = {
-                "texto_modelo": content,
-                "texto_nino": content,  # Usar la misma para extraer el sujeto
-                "umbral": 0.5
-            }
-            
-            response = requests.post(API_URL, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            sujeto_modelo = data.get('detalles', {}).get('sujeto_modelo', 'N/A')
+        data = response.json()
+        print(f"⏱️ Lote procesado por la API en {data.get('processing_time_seconds', 0):.2f}s\n")
+        
+        for idx, (row, resultado) in enumerate(zip(filas, data['resultados']), 1):
+            folder = row['folder_name']
+            sujeto_modelo = resultado.get('detalles', {}).get('sujeto_modelo', 'N/A')
             
             resultados.append({
                 'folder_name': folder,
-                'content': content,
+                'content': row['content'],
                 'sujeto_modelo': sujeto_modelo
             })
             
-            print(f"✅ Sujeto: '{sujeto_modelo}'")
-            
-        except requests.exceptions.RequestException as e:
-            error_msg = str(e)
-            errores.append({
-                'folder_name': folder,
-                'error': error_msg
-            })
-            print(f"❌ Error: {error_msg}")
-        except Exception as e:
-            error_msg = str(e)
-            errores.append({
-                'folder_name': folder,
-                'error': error_msg
-            })
-            print(f"❌ Error inesperado: {error_msg}")
+            print(f"[{idx}/{len(filas)}] {folder}... ✅ Sujeto: '{sujeto_modelo}'")
+        
+    except requests.exceptions.RequestException as e:
+        error_msg = str(e)
+        errores.extend({'folder_name': row['folder_name'], 'error': error_msg} for row in filas)
+        print(f"❌ Error: {error_msg}")
+    except Exception as e:
+        error_msg = str(e)
+        errores.extend({'folder_name': row['folder_name'], 'error': error_msg} for row in filas)
+        print(f"❌ Error inesperado: {error_msg}")
     
     # Guardar resultados en CSV
     print("\n" + "=" * 80)
@@ -143,8 +140,8 @@ def analizar_sujetos():
     print("\n" + "=" * 80)
     print("📊 ESTADÍSTICAS")
     print("=" * 80)
-    print(f"✅ Procesadas exitosamente: {len(resultados)}/44")
-    print(f"❌ Errores: {len(errores)}/44")
+    print(f"✅ Procesadas exitosamente: {len(resultados)}/{len(filas)}")
+    print(f"❌ Errores: {len(errores)}/{len(filas)}")
     
     if errores:
         print("\n⚠️ Descripciones con error:")
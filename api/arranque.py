@@ -0,0 +1,257 @@
+# arranque.py - Carga y calentamiento de todos los modelos al iniciar la API
+"""
+Orquestador de arranque de la API.
+
+Antes solo el modelo de captions se precargaba en `startup_event`. El modelo
+de características, spaCy y el SentenceTransformer se cargaban en la primera
+llamada a /validar-caracteristicas, /evaluate o /validar-reto, que tardaba
+decenas de segundos.
+
+Este módulo:
+- Carga todos los modelos EN PARALELO en hilos de fondo (el servidor acepta
+  peticiones mientras tanto; /ping y /health responden)
+- Corre una inferencia sintética por cada modelo (calentamiento); con spaCy
+  además precalcula los sujetos de los captions del catálogo
+- Lleva el estado de cada modelo: pendiente -> cargando -> calentando -> listo | error
+- Expone ese estado para GET /ready (503 hasta que todos estén listos), para
+  que el gateway y la app solo envíen tráfico cuando el servidor está caliente
+
+Configuración desde .env:
+    API_WARMUP_MODELS: Modelos a cargar al arrancar, separados por coma
+                       (default: todos; ver TAREAS)
+
+Uso:
+    orquestador = get_orquestador()
+    orquestador.iniciar()     # no bloquea
+    orquestador.estado()      # {"listo": False, "modelos": {...}}
+"""
+
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+PENDIENTE = "pendiente"
+CARGANDO = "cargando"
+CALENTANDO = "calentando"
+LISTO = "listo"
+ERROR = "error"
+
+
+# ============================================
+# 🧩 Carga y calentamiento de cada modelo
+# ============================================
+
+def _cargar_caption():
+    from blip.generation import get_global_generator
+    return get_global_generator()
+
+
+def _cargar_caracteristicas():
+    from blip.generation import get_global_characteristics_generator
+    return get_global_characteristics_generator()
+
+
+def _calentar_blip(generador):
+    # Primera inferencia (y compilación del encoder si BLIP_COMPILE_VISION está activo)
+    generador.calentar()
+
+
+def _cargar_spacy():
+    # Compartido por /evaluate, /validar-reto y las actividades (registro_modelos.py)
+    from registro_modelos import get_nlp
+    return get_nlp("arranque")
+
+
+def _calentar_spacy(nlp):
+    nlp("El perro es un animal doméstico que vive en la casa.")
+    # Sujetos de los captions del catálogo (el `texto_modelo` habitual) ya en cache
+    from cache_sujetos import precalcular_sujetos_catalogo
+    n = precalcular_sujetos_catalogo()
+    print(f"📚 Sujetos de {n} captions del catálogo precalculados")
+
+
+def _cargar_sentence_transformer():
+    from registro_modelos import get_sentence_transformer
+    return get_sentence_transformer("arranque")
+
+
+def _calentar_sentence_transformer(modelo):
+    modelo.encode(["Perro: animal doméstico.", "El perro vive en la casa."], convert_to_tensor=True)
+
+
+# nombre -> (cargar, calentar)
+TAREAS = {
+    "caption": (_cargar_caption, _calentar_blip),
+    "caracteristicas": (_cargar_caracteristicas, _calentar_blip),
+    "spacy": (_cargar_spacy, _calentar_spacy),
+    "sentence_transformer": (_cargar_sentence_transformer, _calentar_sentence_transformer),
+}
+
+
+class EstadoModelo:
+    """Estado de carga de un modelo."""
+
+    __slots__ = ("estado", "error", "ms_carga", "ms_calentamiento")
+
+    def __init__(self):
+        self.estado = PENDIENTE
+        self.error = None
+        self.ms_carga = None
+        self.ms_calentamiento = None
+
+    def a_dict(self):
+        return {
+            "estado": self.estado,
+            "error": self.error,
+            "ms_carga": self.ms_carga,
+            "ms_calentamiento": self.ms_calentamiento,
+        }
+
+
+class OrquestadorArranque:
+    """
+    Carga y calienta un conjunto de modelos en hilos de fondo.
+    """
+
+    def __init__(self, tareas):
+        """
+        Args:
+            tareas: Dict {nombre: (cargar, calentar)}. `cargar()` devuelve el
+                    modelo y `calentar(modelo)` corre una inferencia sintética.
+        """
+        self.tareas = dict(tareas)
+        self._estados = {nombre: EstadoModelo() for nombre in self.tareas}
+        self._lock = threading.Lock()
+        self._terminado = threading.Event()
+        self._pool = None
+        self._pendientes = 0
+        self._inicio = None
+        self._fin = None
+
+    def iniciar(self):
+        """Lanza la carga de todos los modelos en paralelo (no bloquea)."""
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._inicio = time.perf_counter()
+            if not self.tareas:
+                self._terminar()
+                return
+            self._pool = ThreadPoolExecutor(
+                max_workers=len(self.tareas),
+                thread_name_prefix="arranque"
+            )
+            self._pendientes = len(self.tareas)
+
+        print(f"🚦 Cargando modelos en paralelo: {', '.join(self.tareas)}")
+        for nombre in self.tareas:
+            self._pool.submit(self._ejecutar, nombre)
+        # Los hilos terminan solos; no hace falta esperar al pool
+        self._pool.shutdown(wait=False)
+
+    def _cambiar(self, nombre, estado, **campos):
+        with self._lock:
+            registro = self._estados[nombre]
+            registro.estado = estado
+            for campo, valor in campos.items():
+                setattr(registro, campo, valor)
+
+    def _terminar(self):
+        self._fin = time.perf_counter()
+        self._terminado.set()
+
+    def _ejecutar(self, nombre):
+        cargar, calentar = self.tareas[nombre]
+        try:
+            self._cambiar(nombre, CARGANDO)
+            inicio = time.perf_counter()
+            modelo = cargar()
+            self._cambiar(nombre, CALENTANDO, ms_carga=round(1000 * (time.perf_counter() - inicio), 1))
+
+            inicio = time.perf_counter()
+            if calentar is not None:
+                calentar(modelo)
+            self._cambiar(nombre, LISTO, ms_calentamiento=round(1000 * (time.perf_counter() - inicio), 1))
+            print(f"✅ Modelo '{nombre}' listo")
+        except Exception as e:
+            traceback.print_exc()
+            print(f"❌ Error cargando el modelo '{nombre}': {e}")
+            self._cambiar(nombre, ERROR, error=str(e))
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+                ultimo = self._pendientes == 0
+            if ultimo:
+                self._terminar()
+                if self.listo():
+                    print(f"🟢 Todos los modelos listos en {self._fin - self._inicio:.1f} s")
+                else:
+                    print("⚠️ Arranque terminado con modelos en error (ver GET /ready)")
+
+    def listo(self):
+        """True si todos los modelos están cargados y calientes."""
+        with self._lock:
+            return all(registro.estado == LISTO for registro in self._estados.values())
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que terminen todas las cargas (con éxito o error)."""
+        return self._terminado.wait(timeout)
+
+    def estado(self):
+        """Estado de cada modelo para GET /ready."""
+        with self._lock:
+            modelos = {nombre: registro.a_dict() for nombre, registro in self._estados.items()}
+            if self._inicio is None:
+                segundos = 0.0
+            else:
+                segundos = (self._fin or time.perf_counter()) - self._inicio
+        return {
+            "listo": all(m["estado"] == LISTO for m in modelos.values()),
+            "terminado": self._terminado.is_set(),
+            "segundos": round(segundos, 1),
+            "modelos": modelos,
+        }
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_orquestador = None
+_global_orquestador_lock = threading.Lock()
+
+
+def modelos_configurados():
+    """
+    Modelos a cargar al arrancar.
+
+    Configuración desde .env:
+        API_WARMUP_MODELS: Nombres de TAREAS separados por coma (default: todos)
+    """
+    valor = os.getenv('API_WARMUP_MODELS')
+    if valor is None:
+        return list(TAREAS)
+    nombres = [nombre.strip() for nombre in valor.split(",") if nombre.strip()]
+    desconocidos = [nombre for nombre in nombres if nombre not in TAREAS]
+    if desconocidos:
+        raise ValueError(f"API_WARMUP_MODELS: modelos desconocidos {desconocidos} (usa {', '.join(TAREAS)})")
+    return nombres
+
+
+def get_orquestador():
+    """
+    Obtiene o crea el orquestador global de arranque.
+
+    Returns:
+        OrquestadorArranque
+    """
+    global _global_orquestador
+    if _global_orquestador is None:
+        with _global_orquestador_lock:
+            if _global_orquestador is None:
+                _global_orquestador = OrquestadorArranque(
+                    {nombre: TAREAS[nombre] for nombre in modelos_configurados()}
+                )
+    return _global_orquestador
@@ -0,0 +1,110 @@
+"""
+Benchmark de los caminos de generación de BlipEspanol contra el CSV de referencia.
+
+Para cada imagen de predicciones_test4-compromiso.csv ejecuta los modos
+"full", "hybrid" y "catalog" directamente sobre el modelo (sin cache ni
+índice perceptual) y reporta:
+- Latencia promedio por modo y speedup respecto a "full"
+- Qué camino se tomó (generacion / hibrido / catalogo)
+- Coincidencia de cada modo con la predicción de referencia
+
+Uso:
+    python benchmark_caminos.py <carpeta_imagenes> [csv_referencia]
+
+Las rutas del CSV (ej: derechos\\alimentacion\\alimentacion_1.png) se
+resuelven relativas a <carpeta_imagenes>.
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+
+from PIL import Image
+
+from blip.catalogo import obtener_catalogo
+from blip.generation import BlipEspanol
+
+CSV_REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "predicciones_test4-compromiso.csv")
+MODOS = ("full", "hybrid", "catalog")
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y sin espacios antes de puntuación (como la referencia cruda)."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"\s+([.,;:!?])", r"\1", texto)
+    return " ".join(texto.split())
+
+
+def leer_referencia(ruta_csv, carpeta_imagenes):
+    filas = []
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            ruta = os.path.join(carpeta_imagenes, *fila["imagen"].replace("\\", "/").split("/"))
+            if os.path.exists(ruta):
+                filas.append((ruta, fila["prediccion"]))
+    return filas
+
+
+def benchmark(carpeta_imagenes, ruta_csv=CSV_REFERENCIA):
+    filas = leer_referencia(ruta_csv, carpeta_imagenes)
+    if not filas:
+        print(f"❌ No se encontró ninguna imagen del CSV en {carpeta_imagenes}")
+        return
+
+    print(f"📂 {len(filas)} imágenes de referencia")
+    modelo = BlipEspanol.from_pretrained()
+    modelo.cargar_catalogo(obtener_catalogo())
+
+    # Calentamiento (la primera inferencia es más lenta)
+    modelo.predict(filas[0][0])
+
+    tiempos = {modo: [] for modo in MODOS}
+    caminos = {modo: Counter() for modo in MODOS}
+    aciertos = Counter()
+    iguales_a_full = Counter()
+
+    for i, (ruta, referencia) in enumerate(filas, 1):
+        imagen = Image.open(ruta)
+        imagen.load()
+        referencia = normalizar(referencia)
+
+        captions = {}
+        for modo in MODOS:
+            inicio = time.perf_counter()
+            resultado = modelo.predict_batch_detallado([imagen.copy()], mode=modo)[0]
+            tiempos[modo].append(time.perf_counter() - inicio)
+            caminos[modo][resultado["camino"]] += 1
+            captions[modo] = normalizar(resultado["caption"])
+            aciertos[modo] += captions[modo] == referencia
+
+        for modo in MODOS:
+            iguales_a_full[modo] += captions[modo] == captions["full"]
+
+        print(f"   [{i}/{len(filas)}] {os.path.basename(ruta)}: "
+              + ", ".join(f"{m}={tiempos[m][-1]:.2f}s" for m in MODOS))
+
+    total = len(filas)
+    base = sum(tiempos["full"]) / total
+
+    print("\n" + "=" * 60)
+    print("📊 RESULTADOS")
+    print("=" * 60)
+    for modo in MODOS:
+        promedio = sum(tiempos[modo]) / total
+        print(f"\n🔹 {modo}")
+        print(f"   Latencia promedio: {promedio:.3f}s (speedup x{base / promedio:.2f})")
+        print(f"   Caminos: {dict(caminos[modo])}")
+        print(f"   Igual a la referencia: {aciertos[modo]}/{total} ({aciertos[modo] / total:.1%})")
+        print(f"   Igual a 'full':        {iguales_a_full[modo]}/{total} ({iguales_a_full[modo] / total:.1%})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else CSV_REFERENCIA)
@@ -0,0 +1,112 @@
+"""
+Benchmark del encoder de visión compilado: eager vs. torch.jit.trace vs. torch.compile.
+
+Para cada modo de BLIP_COMPILE_VISION carga el modelo en un proceso nuevo
+(para que la compilación de un modo no beneficie al siguiente) y reporta
+por etapa:
+- carga:       from_pretrained, incluida la compilación del encoder
+- primera:     primera inferencia completa (lo que pagaría la primera petición
+               si no hubiera calentamiento en el startup)
+- encoder:     encoder de visión ya caliente, lote de 1 y lote de 4
+- generacion:  generación del caption (no depende del modo, como control)
+
+Uso:
+    python benchmark_compilacion.py [--repeticiones 10] [--modos off,trace,compile]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+MODOS = ("off", "trace", "compile")
+
+
+def _ms(inicio):
+    return round(1000 * (time.perf_counter() - inicio), 1)
+
+
+def medir(modo, repeticiones):
+    """Mide un modo en ESTE proceso (lo llama el proceso hijo)."""
+    os.environ['BLIP_FEATURE_CACHE_ENABLED'] = '0'
+    import torch
+    from blip.generation import BlipEspanol
+    from imagenes_prueba import imagenes_sinteticas
+
+    inicio = time.perf_counter()
+    modelo = BlipEspanol.from_pretrained(compilar=modo)
+    resultado = {"modo": modo, "activo": modelo.modo_compilacion, "carga": _ms(inicio)}
+
+    imagenes = imagenes_sinteticas()
+    config = modelo._config_generacion()
+    inicio = time.perf_counter()
+    with torch.inference_mode():
+        embeds = modelo._codificar_imagen(modelo._pixel_values(imagenes[:1]))
+        modelo._generar_desde_embeds(embeds, config)
+    resultado["primera"] = _ms(inicio)
+
+    with torch.inference_mode():
+        for nombre, lote in (("encoder", imagenes[:1]), ("encoder_lote4", imagenes[:4])):
+            pixel_values = modelo._pixel_values(lote)
+            modelo._codificar_imagen(pixel_values)
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                modelo._codificar_imagen(pixel_values)
+            resultado[nombre] = round(_ms(inicio) / repeticiones, 1)
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            modelo._generar_desde_embeds(embeds, config)
+        resultado["generacion"] = round(_ms(inicio) / repeticiones, 1)
+
+    return resultado
+
+
+def benchmark(modos=MODOS, repeticiones=10):
+    resultados = []
+    for modo in modos:
+        print(f"⏳ Midiendo modo {modo}...")
+        salida = subprocess.run(
+            [sys.executable, __file__, "--hijo", modo, str(repeticiones)],
+            capture_output=True, text=True
+        )
+        if salida.returncode != 0:
+            print(f"❌ El modo {modo} falló:\n{salida.stderr[-2000:]}")
+            continue
+        resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    if not resultados:
+        return
+    etapas = ("carga", "primera", "encoder", "encoder_lote4", "generacion")
+    print("\n" + "=" * 80)
+    print(f"{'modo':9s}" + "".join(f"{etapa:>14s}" for etapa in etapas))
+    print("-" * 80)
+    base = resultados[0]
+    for r in resultados:
+        nombre = r["modo"] if r["activo"] == r["modo"] else f"{r['modo']}*"
+        print(f"{nombre:9s}" + "".join(f"{r[etapa]:>11.1f} ms" for etapa in etapas))
+    print("-" * 80)
+    for r in resultados[1:]:
+        speedup = base["encoder"] / max(r["encoder"], 1e-6)
+        print(f"⚡ encoder {r['modo']} vs. {base['modo']}: x{speedup:.2f}")
+    if any(r["activo"] != r["modo"] for r in resultados):
+        print("* la compilación falló y el modo quedó en eager")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--hijo":
+        print(json.dumps(medir(sys.argv[2], int(sys.argv[3]))))
+        sys.exit(0)
+
+    argumentos = sys.argv[1:]
+    repeticiones = 10
+    modos = MODOS
+    if "--repeticiones" in argumentos:
+        i = argumentos.index("--repeticiones")
+        repeticiones = int(argumentos[i + 1])
+    if "--modos" in argumentos:
+        i = argumentos.index("--modos")
+        modos = tuple(argumentos[i + 1].split(","))
+    benchmark(modos, repeticiones)
@@ -0,0 +1,120 @@
+"""
+Benchmark de decodificación de imágenes: completa + LANCZOS vs. draft mode.
+
+Compara, para cada imagen:
+- "completa": Image.open + convert("RGB") + thumbnail LANCZOS (camino anterior)
+- "reducida": blip.decodificacion.decodificar_imagen (draft JPEG + BILINEAR)
+
+Reporta el tiempo promedio de decodificación y el pico de memoria (RSS)
+de cada método. Cada medición de memoria corre en un proceso nuevo para
+que un método no herede el pico del otro.
+
+Uso:
+    python benchmark_decodificacion.py foto1.jpg [foto2.jpg ...] [--repeticiones 10]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from PIL import Image
+
+METODOS = ("completa", "reducida")
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _pico_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def decodificar_completa(datos, lado):
+    import io
+    imagen = Image.open(io.BytesIO(datos))
+    # Decodificación completa (como al hashear la imagen para la cache)
+    imagen.load()
+    if imagen.mode != "RGB":
+        imagen = imagen.convert("RGB")
+    if max(imagen.size) > lado:
+        imagen.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    return imagen
+
+
+def decodificar_reducida(datos, lado):
+    from blip.decodificacion import decodificar_imagen
+    return decodificar_imagen(datos, lado=lado)
+
+
+def medir(metodo, ruta, repeticiones):
+    """Mide un método en ESTE proceso (lo llama el proceso hijo)."""
+    lado = int(os.getenv('BLIP_IMAGE_SIZE', '384'))
+    funcion = decodificar_completa if metodo == "completa" else decodificar_reducida
+    with open(ruta, "rb") as f:
+        datos = f.read()
+
+    # Importaciones fuera de la medición (sin decodificar nada todavía)
+    import blip.decodificacion  # noqa: F401
+    rss_base = _rss_mb()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        imagen = funcion(datos, lado)
+        tiempos.append(time.perf_counter() - inicio)
+
+    return {
+        "metodo": metodo,
+        "tamano_salida": list(imagen.size),
+        "ms_promedio": round(1000 * sum(tiempos) / len(tiempos), 2),
+        "ms_min": round(1000 * min(tiempos), 2),
+        "pico_rss_mb": round(_pico_rss_mb(), 1),
+        # Cuánto creció el pico por encima de lo residente antes de decodificar
+        "pico_extra_mb": round(max(0.0, _pico_rss_mb() - rss_base), 1),
+    }
+
+
+def benchmark(rutas, repeticiones=10):
+    for ruta in rutas:
+        with Image.open(ruta) as imagen:
+            print(f"\n🖼️ {os.path.basename(ruta)} ({imagen.format}, {imagen.size[0]}x{imagen.size[1]})")
+
+        resultados = {}
+        for metodo in METODOS:
+            salida = subprocess.run(
+                [sys.executable, __file__, "--hijo", metodo, ruta, str(repeticiones)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            resultados[metodo] = json.loads(salida.strip().splitlines()[-1])
+
+        for metodo, r in resultados.items():
+            print(f"   {metodo:9s} -> {r['tamano_salida'][0]}x{r['tamano_salida'][1]} | "
+                  f"{r['ms_promedio']:.1f} ms (min {r['ms_min']:.1f}) | "
+                  f"pico RSS {r['pico_rss_mb']:.1f} MB (+{r['pico_extra_mb']:.1f} MB)")
+
+        speedup = resultados["completa"]["ms_promedio"] / max(resultados["reducida"]["ms_promedio"], 1e-6)
+        print(f"   ⚡ Speedup de decodificación: x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--hijo":
+        print(json.dumps(medir(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+        sys.exit(0)
+
+    argumentos = sys.argv[1:]
+    repeticiones = 10
+    if "--repeticiones" in argumentos:
+        i = argumentos.index("--repeticiones")
+        repeticiones = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+
+    if not argumentos:
+        print(__doc__)
+        sys.exit(1)
+    benchmark(argumentos, repeticiones)
@@ -0,0 +1,116 @@
+"""
+Benchmark de tiempo de importación de los módulos de la API.
+
+Para cada módulo corre `python -X importtime -c "import <modulo>"` en un
+proceso nuevo y reporta:
+- Tiempo acumulado de importación del módulo (según -X importtime)
+- Si al importarlo se cargaron torch / transformers / spaCy /
+  sentence_transformers (deberían cargarse solo al usar un modelo)
+- Con --detalle, los paquetes que más tiempo aportan
+
+Uso:
+    python benchmark_importacion.py [modulo1 modulo2 ...] [--detalle 15]
+
+Sin módulos se miden los de MODULOS.
+"""
+
+import os
+import subprocess
+import sys
+
+MODULOS = (
+    "main",
+    "blip",
+    "ingesta",
+    "arranque",
+    "evaluador",
+    "activities",
+    "blip.generation",
+)
+PESADOS = ("torch", "transformers", "spacy", "sentence_transformers")
+DIRECTORIO_API = os.path.dirname(os.path.abspath(__file__))
+
+
+def perfilar(modulo):
+    """
+    Importa un módulo con -X importtime en un proceso nuevo.
+
+    Returns:
+        list de (nivel, paquete, self_us, acumulado_us) en orden de importación
+    """
+    codigo = f"import {modulo}" if modulo else "pass"
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=DIRECTORIO_API, capture_output=True, text=True
+    )
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1])
+
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        propio, acumulado, nombre = linea.split(":", 1)[1].split("|", 2)
+        nivel = (len(nombre) - len(nombre.lstrip())) // 2
+        filas.append((nivel, nombre.strip(), int(propio), int(acumulado)))
+    return filas
+
+
+def resumen(modulo, filas, del_interprete):
+    # Se descuentan los módulos que importa el intérprete al iniciar (site, encodings...)
+    total = sum(
+        acumulado for nivel, nombre, _, acumulado in filas
+        if nivel == 0 and nombre not in del_interprete
+    )
+    cargados = {nombre for _, nombre, _, _ in filas}
+    return {
+        "modulo": modulo,
+        "ms": total / 1000,
+        "pesados": [paquete for paquete in PESADOS if paquete in cargados],
+    }
+
+
+def detalle(filas, del_interprete, n):
+    # Acumulado por paquete raíz (torch.nn -> torch)
+    por_paquete = {}
+    for _, nombre, propio, _ in filas:
+        if nombre in del_interprete:
+            continue
+        raiz = nombre.split(".")[0]
+        por_paquete[raiz] = por_paquete.get(raiz, 0) + propio
+    return sorted(por_paquete.items(), key=lambda par: par[1], reverse=True)[:n]
+
+
+def benchmark(modulos=MODULOS, n_detalle=0):
+    print("=" * 72)
+    print(f"{'Módulo':20s} {'Importación':>12s}   Librerías pesadas cargadas")
+    print("-" * 72)
+    del_interprete = {nombre for _, nombre, _, _ in perfilar(None)}
+    perfiles = {}
+    for modulo in modulos:
+        try:
+            filas = perfilar(modulo)
+        except RuntimeError as e:
+            print(f"{modulo:20s} {'error':>12s}   {e}")
+            continue
+        perfiles[modulo] = filas
+        r = resumen(modulo, filas, del_interprete)
+        pesados = ", ".join(r["pesados"]) or "ninguna ✅"
+        print(f"{modulo:20s} {r['ms']:>9.1f} ms   {pesados}")
+    print("=" * 72)
+
+    if n_detalle:
+        for modulo, filas in perfiles.items():
+            print(f"\n📦 {modulo}: paquetes con más tiempo propio de importación")
+            for paquete, us in detalle(filas, del_interprete, n_detalle):
+                print(f"   {paquete:30s} {us / 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    n_detalle = 0
+    if "--detalle" in argumentos:
+        i = argumentos.index("--detalle")
+        n_detalle = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+    benchmark(tuple(argumentos) or MODULOS, n_detalle)
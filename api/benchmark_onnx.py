@@ -0,0 +1,115 @@
+"""
+Benchmark de latencia: backend PyTorch vs. ONNX Runtime de BlipEspanol.
+
+Para cada backend mide, sobre las mismas imágenes:
+- Carga del modelo (con el artefacto INT8 / export ONNX ya generados)
+- Encoder de visión
+- Generación greedy del caption completo (modo "full")
+- Puntaje teacher-forced del catálogo (modo "catalog" / /validar-reto)
+
+Uso:
+    python benchmark_onnx.py [carpeta_imagenes] [--repeticiones 5]
+
+Con carpeta se usan las imágenes de predicciones_test4-compromiso.csv;
+sin ella, imágenes sintéticas. Conviene correr antes `python exportar_onnx.py`
+para no medir el export dentro de la carga.
+"""
+
+import os
+import sys
+import time
+
+# Medir siempre el encoder (sin cache de embeddings entre repeticiones)
+os.environ['BLIP_FEATURE_CACHE_ENABLED'] = '0'
+
+import torch
+from PIL import Image
+
+from benchmark_caminos import CSV_REFERENCIA, leer_referencia
+from blip.catalogo import obtener_catalogo
+from blip.generation import BlipEspanol
+from imagenes_prueba import imagenes_sinteticas
+
+BACKENDS = ("torch", "onnx")
+ETAPAS = ("encoder", "generacion", "catalogo")
+
+
+def medir_backend(backend, imagenes, repeticiones):
+    os.environ['BLIP_BACKEND'] = backend
+    inicio = time.perf_counter()
+    modelo = BlipEspanol.from_pretrained()
+    carga = time.perf_counter() - inicio
+    if backend == "onnx" and not modelo.onnx:
+        return None
+    modelo.cargar_catalogo(obtener_catalogo())
+
+    config = modelo._config_generacion()
+    pixel_values = [modelo._pixel_values([imagen]) for imagen in imagenes]
+
+    # Calentamiento (la primera inferencia es más lenta)
+    with torch.inference_mode():
+        embeds = modelo._codificar_imagen(pixel_values[0])
+        modelo._generar_desde_embeds(embeds, config)
+        modelo.puntuar_catalogo(embeds)
+
+    tiempos = {etapa: [] for etapa in ETAPAS}
+    with torch.inference_mode():
+        for _ in range(repeticiones):
+            for valores in pixel_values:
+                t0 = time.perf_counter()
+                embeds = modelo._codificar_imagen(valores)
+                t1 = time.perf_counter()
+                modelo._generar_desde_embeds(embeds, config)
+                t2 = time.perf_counter()
+                modelo.puntuar_catalogo(embeds)
+                t3 = time.perf_counter()
+                tiempos["encoder"].append(t1 - t0)
+                tiempos["generacion"].append(t2 - t1)
+                tiempos["catalogo"].append(t3 - t2)
+
+    return {
+        "carga_s": carga,
+        **{etapa: 1000 * sum(t) / len(t) for etapa, t in tiempos.items()},
+    }
+
+
+def benchmark(carpeta_imagenes=None, repeticiones=5):
+    if carpeta_imagenes:
+        imagenes = [Image.open(ruta) for ruta, _ in leer_referencia(CSV_REFERENCIA, carpeta_imagenes)]
+    else:
+        imagenes = imagenes_sinteticas()
+    if not imagenes:
+        print(f"❌ No se encontró ninguna imagen del CSV en {carpeta_imagenes}")
+        return
+    print(f"📂 {len(imagenes)} imágenes x {repeticiones} repeticiones")
+
+    resultados = {}
+    for backend in BACKENDS:
+        print(f"\n⏳ Midiendo backend {backend}...")
+        resultados[backend] = medir_backend(backend, imagenes, repeticiones)
+        if resultados[backend] is None:
+            print(f"❌ No se pudo cargar el backend {backend}")
+            return
+
+    print("\n" + "=" * 60)
+    print(f"{'Etapa':12s} {'torch':>12s} {'onnx':>12s} {'speedup':>9s}")
+    print("-" * 60)
+    print(f"{'carga':12s} {resultados['torch']['carga_s']:>10.2f} s {resultados['onnx']['carga_s']:>10.2f} s")
+    for etapa in ETAPAS:
+        t_torch, t_onnx = resultados["torch"][etapa], resultados["onnx"][etapa]
+        print(f"{etapa:12s} {t_torch:>9.1f} ms {t_onnx:>9.1f} ms {t_torch / max(t_onnx, 1e-6):>8.2f}x")
+    total_torch = sum(resultados["torch"][e] for e in ETAPAS[:2])
+    total_onnx = sum(resultados["onnx"][e] for e in ETAPAS[:2])
+    print("-" * 60)
+    print(f"{'/predict':12s} {total_torch:>9.1f} ms {total_onnx:>9.1f} ms {total_torch / max(total_onnx, 1e-6):>8.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    repeticiones = 5
+    if "--repeticiones" in argumentos:
+        i = argumentos.index("--repeticiones")
+        repeticiones = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+    benchmark(argumentos[0] if argumentos else None, repeticiones)
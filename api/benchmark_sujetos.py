@@ -0,0 +1,128 @@
+"""
+Benchmark de extracción de sujetos (obtener_sujeto de evaluador.py).
+
+Mide sujetos extraídos por segundo sobre una carga parecida a la de
+/evaluate: los captions del catálogo (texto_modelo) y respuestas cortas de
+niños, repetidos y mezclados. Modos:
+- antes:        pipeline de spaCy completo (con NER), sin cache, con la traza
+                de debug (a /dev/null)
+- slim:         spaCy sin los componentes no usados (SPACY_SLIM), sin cache
+- slim + pipe:  slim, frases distintas analizadas en lote con nlp.pipe
+- slim + cache: slim con el memo de cache_sujetos.py y los captions del
+                catálogo precalculados (como al arrancar la API)
+
+También verifica que todos los modos devuelvan los mismos sujetos.
+
+Uso:
+    python benchmark_sujetos.py [repeticiones]
+"""
+
+import contextlib
+import os
+import random
+import sys
+import time
+
+import evaluador
+from cache_sujetos import CacheSujetos, captions_catalogo
+from registro_modelos import componentes_spacy_excluidos
+
+REPETICIONES = 5
+PLANTILLAS_RESPUESTA = (
+    "es un {}",
+    "veo un {}",
+    "Un {} en la imagen",
+    "creo que es {}",
+)
+
+
+def carga_de_trabajo(repeticiones):
+    """Captions del catálogo + respuestas de niños, repetidos y mezclados."""
+    from blip.catalogo import obtener_catalogo
+
+    frases = captions_catalogo()
+    sujetos = dict.fromkeys(entrada["sujeto"].lower() for entrada in obtener_catalogo())
+    frases += [plantilla.format(sujeto) for sujeto in sujetos for plantilla in PLANTILLAS_RESPUESTA]
+    carga = frases * repeticiones
+    random.Random(0).shuffle(carga)
+    return carga
+
+
+def cargar_spacy(exclude):
+    import spacy
+    return spacy.load(os.getenv('SPACY_MODEL', 'es_core_news_sm'), exclude=exclude)
+
+
+def modo_sin_cache(nlp, frases):
+    return [evaluador._sujeto_de_doc(nlp(frase)) for frase in frases]
+
+
+def modo_pipe(nlp, frases):
+    unicas = list(dict.fromkeys(frases))
+    sujetos = {frase: evaluador._sujeto_de_doc(doc) for frase, doc in zip(unicas, nlp.pipe(unicas))}
+    return [sujetos[frase] for frase in frases]
+
+
+def cache_precalculada(nlp):
+    """Cache con los captions del catálogo ya extraídos (como al arrancar la API)."""
+    cache = CacheSujetos()
+    for caption in captions_catalogo():
+        cache.guardar(caption, evaluador._sujeto_de_doc(nlp(caption)))
+    return cache
+
+
+def modo_cache(nlp, frases, cache):
+    return [cache.memo(frase, lambda: evaluador._sujeto_de_doc(nlp(frase))) for frase in frases]
+
+
+def medir(nombre, fn, n):
+    inicio = time.perf_counter()
+    resultado = fn()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:16s} {n / segundos:>10.1f} sujetos/s   {1000 * segundos / n:>8.2f} ms/frase")
+    return resultado, n / segundos
+
+
+def benchmark(repeticiones=REPETICIONES):
+    frases = carga_de_trabajo(repeticiones)
+    n = len(frases)
+    print(f"📄 {n} frases ({len(set(frases))} distintas)")
+
+    print("⏳ Cargando spaCy completo y slim...")
+    nlp_completo = cargar_spacy([])
+    nlp_slim = cargar_spacy(componentes_spacy_excluidos() or ["ner"])
+    print(f"   completo: {', '.join(nlp_completo.pipe_names)}")
+    print(f"   slim:     {', '.join(nlp_slim.pipe_names)}")
+
+    # Calentamiento de ambos pipelines
+    modo_sin_cache(nlp_completo, frases[:5])
+    modo_sin_cache(nlp_slim, frases[:5])
+
+    print("=" * 64)
+    evaluador.DEBUG_SUJETOS = True
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        referencia = modo_sin_cache(nlp_completo, frases)
+        segundos = time.perf_counter() - inicio
+    evaluador.DEBUG_SUJETOS = False
+    base = n / segundos
+    print(f"{'antes':16s} {base:>10.1f} sujetos/s   {1000 * segundos / n:>8.2f} ms/frase")
+
+    resultados = {}
+    resultados["slim"] = medir("slim", lambda: modo_sin_cache(nlp_slim, frases), n)
+    resultados["slim + pipe"] = medir("slim + pipe", lambda: modo_pipe(nlp_slim, frases), n)
+    # El precálculo del arranque se hace antes de medir (no entra en el tiempo)
+    cache = cache_precalculada(nlp_slim)
+    resultados["slim + cache"] = medir("slim + cache", lambda: modo_cache(nlp_slim, frases, cache), n)
+    print("=" * 64)
+
+    print(f"💾 Cache: {cache.stats()}")
+    for nombre, (sujetos, por_segundo) in resultados.items():
+        iguales = sum(a == b for a, b in zip(referencia, sujetos))
+        estado = "✅" if iguales == n else "❌"
+        print(f"{estado} {nombre:14s} x{por_segundo / base:.1f} vs antes, sujetos iguales: {iguales}/{n}")
+
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else REPETICIONES
+    benchmark(repeticiones)
@@ -1,9 +1,34 @@
 """
 Módulo BLIP para generación de captions con corrección ortográfica integrada
+
+Los nombres se resuelven de forma perezosa (PEP 562): `import blip` o
+`from blip.decodificacion import ...` no cargan torch ni transformers;
+solo el primer acceso a BlipEspanol, quick_generate, etc. importa
+blip.generation.
 """
-from .generation import BlipEspanol, quick_generate, get_global_generator
+import importlib
+
+# nombre exportado -> (submódulo, atributo)
+_EXPORTADOS = {
+    'BlipEspanol': ('.generation', 'BlipEspanol'),
+    # Alias para compatibilidad (BlipGenerator ahora es BlipEspanol)
+    'BlipGenerator': ('.generation', 'BlipEspanol'),
+    'quick_generate': ('.generation', 'quick_generate'),
+    'get_global_generator': ('.generation', 'get_global_generator'),
+}
+
+__all__ = ['BlipEspanol', 'BlipGenerator', 'quick_generate', 'get_global_generator']
+
+
+def __getattr__(nombre):
+    if nombre not in _EXPORTADOS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    modulo, atributo = _EXPORTADOS[nombre]
+    valor = getattr(importlib.import_module(modulo, __name__), atributo)
+    # Cachear en el módulo: los siguientes accesos no pasan por __getattr__
+    globals()[nombre] = valor
+    return valor
 
-# Alias para compatibilidad (BlipGenerator ahora es BlipEspanol)
-BlipGenerator = BlipEspanol
 
-__all__ = ['BlipEspanol', 'BlipGenerator', 'quick_generate', 'get_global_generator']
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,231 @@
+"""
+============================================
+💾 Artefacto INT8 precompilado de BlipEspanol
+============================================
+
+BlipEspanol.from_pretrained() carga los pesos float32 y luego ejecuta
+quantize_dynamic sobre todas las capas nn.Linear en CADA arranque (para el
+modelo de captions y para el de características). Esto hace lento el
+arranque en frío.
+
+Este módulo cuantiza una sola vez y guarda un "artefacto" con:
+- modelo_int8.pt   -> modelo ya cuantizado (torch.save del módulo completo)
+- processor        -> BlipProcessor (save_pretrained)
+- diccionario.json -> correcciones y vocabulario del corrector ortográfico
+- manifest.json    -> huella del checkpoint de origen + versiones
+
+Al arrancar se compara la huella (sha256 de cada archivo del checkpoint y del
+diccionario) con la del manifest; si algo cambió el artefacto se reconstruye
+automáticamente.
+
+Configuración desde .env:
+    BLIP_QUANTIZED_ARTIFACTS: 1/0 para usar o no los artefactos (default: 1)
+    BLIP_ARTIFACTS_DIR: Carpeta donde se guardan (default: blip-artifacts)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import torch
+
+from .diccionario_es import obtener_correcciones, obtener_vocabulario
+
+VERSION_FORMATO = 1
+ARCHIVO_MODELO = "modelo_int8.pt"
+ARCHIVO_DICCIONARIO = "diccionario.json"
+ARCHIVO_MANIFEST = "manifest.json"
+
+
+def artefactos_habilitados():
+    """True si se deben usar artefactos INT8 persistidos."""
+    return os.getenv('BLIP_QUANTIZED_ARTIFACTS', '1') == '1'
+
+
+def ruta_artefacto(model_path):
+    """
+    Carpeta del artefacto para un checkpoint.
+
+    Se usa el nombre del checkpoint + un hash corto de su ruta absoluta, así
+    dos checkpoints con el mismo nombre en carpetas distintas no se pisan.
+    """
+    base = os.getenv('BLIP_ARTIFACTS_DIR', 'blip-artifacts')
+    ruta_abs = os.path.abspath(model_path)
+    sufijo = hashlib.sha256(ruta_abs.encode()).hexdigest()[:10]
+    nombre = os.path.basename(os.path.normpath(ruta_abs)) or "modelo"
+    return os.path.join(base, f"{nombre}-{sufijo}")
+
+
+def _sha256_archivo(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _hash_diccionario():
+    contenido = json.dumps(
+        {
+            "correcciones": obtener_correcciones(),
+            "vocabulario": sorted(obtener_vocabulario()),
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def huella_checkpoint(model_path, archivos_previos=None):
+    """
+    Calcula la huella de un checkpoint local.
+
+    Para no releer ~1 GB de pesos en cada arranque, se reutiliza el sha256
+    guardado en el manifest anterior si el archivo tiene el mismo tamaño y
+    fecha de modificación.
+
+    Args:
+        model_path: Carpeta del checkpoint
+        archivos_previos: Dict {archivo: {tamano, mtime_ns, sha256}} del manifest anterior
+
+    Returns:
+        tuple (huella, archivos) o (None, None) si model_path no es una carpeta local
+    """
+    if not os.path.isdir(model_path):
+        return None, None
+
+    archivos_previos = archivos_previos or {}
+    archivos = {}
+    for raiz, _dirs, nombres in os.walk(model_path):
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            relativa = os.path.relpath(ruta, model_path).replace(os.sep, "/")
+            info = os.stat(ruta)
+
+            previo = archivos_previos.get(relativa)
+            if (previo and previo["tamano"] == info.st_size
+                    and previo["mtime_ns"] == info.st_mtime_ns):
+                digest = previo["sha256"]
+            else:
+                digest = _sha256_archivo(ruta)
+
+            archivos[relativa] = {
+                "tamano": info.st_size,
+                "mtime_ns": info.st_mtime_ns,
+                "sha256": digest,
+            }
+
+    h = hashlib.sha256()
+    h.update(f"formato={VERSION_FORMATO}".encode())
+    h.update(f"diccionario={_hash_diccionario()}".encode())
+    for relativa in sorted(archivos):
+        h.update(f"{relativa}={archivos[relativa]['sha256']}".encode())
+    return h.hexdigest(), archivos
+
+
+def _leer_manifest(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cargar_artefacto(model_path):
+    """
+    Carga el artefacto INT8 de un checkpoint si existe y está al día.
+
+    Returns:
+        tuple (model, processor, correcciones, vocabulario) o None si hay que
+        (re)construirlo (o si el checkpoint no es una carpeta local)
+    """
+    directorio = ruta_artefacto(model_path)
+    manifest = _leer_manifest(directorio)
+
+    huella, _ = huella_checkpoint(
+        model_path,
+        manifest.get("archivos") if manifest else None
+    )
+    if huella is None or manifest is None:
+        return None
+
+    import transformers
+    if (manifest.get("huella") != huella
+            or manifest.get("torch_version") != torch.__version__
+            or manifest.get("transformers_version") != transformers.__version__):
+        print(f"♻️ Artefacto INT8 desactualizado en {directorio}, se reconstruirá")
+        return None
+
+    try:
+        from transformers import BlipProcessor
+
+        processor = BlipProcessor.from_pretrained(directorio)
+        model = torch.load(
+            os.path.join(directorio, ARCHIVO_MODELO),
+            map_location="cpu",
+            weights_only=False  # Es un módulo completo, generado localmente
+        )
+        with open(os.path.join(directorio, ARCHIVO_DICCIONARIO), encoding="utf-8") as f:
+            diccionario = json.load(f)
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar el artefacto INT8 ({e}), se reconstruirá")
+        return None
+
+    print(f"⚡ Artefacto INT8 cargado desde {directorio} (sin re-cuantizar)")
+    return (
+        model,
+        processor,
+        diccionario["correcciones"],
+        set(diccionario["vocabulario"]),
+    )
+
+
+def guardar_artefacto(model_path, model, processor, correcciones, vocabulario):
+    """
+    Guarda el modelo cuantizado, su processor y el diccionario.
+
+    Se escribe en una carpeta temporal y se renombra al final para que un
+    arranque interrumpido nunca deje un artefacto a medias.
+    """
+    huella, archivos = huella_checkpoint(model_path)
+    if huella is None:
+        return None
+
+    directorio = ruta_artefacto(model_path)
+    padre = os.path.dirname(directorio) or "."
+    os.makedirs(padre, exist_ok=True)
+
+    temporal = tempfile.mkdtemp(prefix=".tmp-", dir=padre)
+    try:
+        torch.save(model, os.path.join(temporal, ARCHIVO_MODELO))
+        processor.save_pretrained(temporal)
+        with open(os.path.join(temporal, ARCHIVO_DICCIONARIO), "w", encoding="utf-8") as f:
+            json.dump(
+                {"correcciones": correcciones, "vocabulario": sorted(vocabulario)},
+                f,
+                ensure_ascii=False
+            )
+
+        import transformers
+        manifest = {
+            "formato": VERSION_FORMATO,
+            "model_path": os.path.abspath(model_path),
+            "huella": huella,
+            "archivos": archivos,
+            "torch_version": torch.__version__,
+            "transformers_version": transformers.__version__,
+        }
+        with open(os.path.join(temporal, ARCHIVO_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.isdir(directorio):
+            shutil.rmtree(directorio)
+        os.replace(temporal, directorio)
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    print(f"💾 Artefacto INT8 guardado en {directorio}")
+    return directorio
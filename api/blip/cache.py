@@ -0,0 +1,238 @@
+"""
+============================================
+🗄️ Cache de captions direccionado por contenido
+============================================
+
+Los niños vuelven a enviar la misma foto y los scripts de prueba repiten
+las mismas imágenes, pero cada /predict corría la generación BLIP completa.
+
+Este módulo guarda los captions ya generados con una clave que depende de:
+- Los píxeles decodificados de la imagen (modo + tamaño + bytes)
+- La ruta del modelo que los generó
+- La configuración de generación
+
+Niveles:
+1. LRU en memoria acotado (BLIP_CACHE_MAX_ITEMS)
+2. SQLite opcional que sobrevive reinicios (BLIP_CACHE_DB)
+
+Si cambia la ruta de un modelo (ej: BLIP_MODEL_PATH), las entradas
+persistidas de ese modelo se invalidan automáticamente.
+
+Uso:
+    cache = get_cache_captions()
+    clave = cache.clave(imagen, "caption", modelo.model_path, modelo.generation_config)
+    caption = cache.obtener(clave)
+    if caption is None:
+        caption = modelo.predict(imagen)
+        cache.guardar(clave, caption)
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+
+class CacheCaptions:
+    """
+    Cache de dos niveles (LRU en memoria + SQLite opcional) para captions.
+
+    Es thread-safe: se usa desde los hilos del ejecutor de inferencia.
+    """
+
+    def __init__(self, max_items=512, db_path=None):
+        """
+        Args:
+            max_items: Máximo de entradas en memoria
+            db_path: Ruta del archivo SQLite (None = solo memoria)
+        """
+        self.max_items = max_items
+        self.db_path = db_path
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._modelos_verificados = {}
+
+        # Contadores
+        self._hits_memoria = 0
+        self._hits_disco = 0
+        self._misses = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS captions ("
+                " clave TEXT PRIMARY KEY,"
+                " tipo TEXT NOT NULL,"
+                " caption TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS modelos ("
+                " tipo TEXT PRIMARY KEY,"
+                " model_path TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def hash_imagen(imagen):
+        """
+        Hash de los píxeles decodificados de una imagen PIL.
+
+        Se usan los píxeles (no los bytes del archivo) para que la misma foto
+        re-codificada con distinto contenedor/metadata tenga la misma clave.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{imagen.mode}|{imagen.size[0]}x{imagen.size[1]}|".encode())
+        h.update(imagen.tobytes())
+        return h.hexdigest()
+
+    def clave(self, imagen, tipo, model_path, generation_config):
+        """
+        Calcula la clave de cache para una imagen y un modelo.
+
+        Args:
+            imagen: PIL Image (ya decodificada)
+            tipo: "caption" o "caracteristicas"
+            model_path: Ruta del modelo que genera el caption
+            generation_config: Diccionario de configuración de generación
+
+        Returns:
+            tuple: (tipo, clave hexadecimal)
+        """
+        self._verificar_modelo(tipo, str(model_path))
+
+        h = hashlib.blake2b(digest_size=20)
+        h.update(tipo.encode())
+        h.update(str(model_path).encode())
+        h.update(json.dumps(generation_config, sort_keys=True, default=str).encode())
+        h.update(self.hash_imagen(imagen).encode())
+        return (tipo, h.hexdigest())
+
+    def _verificar_modelo(self, tipo, model_path):
+        """Invalida las entradas persistidas si cambió la ruta del modelo."""
+        if self._modelos_verificados.get(tipo) == model_path:
+            return
+
+        with self._lock:
+            if self._db is not None:
+                fila = self._db.execute(
+                    "SELECT model_path FROM modelos WHERE tipo = ?", (tipo,)
+                ).fetchone()
+                if fila is not None and fila[0] != model_path:
+                    borradas = self._db.execute(
+                        "DELETE FROM captions WHERE tipo = ?", (tipo,)
+                    ).rowcount
+                    print(f"🗑️ Cache '{tipo}' invalidada ({borradas} entradas): el modelo cambió")
+                self._db.execute(
+                    "INSERT OR REPLACE INTO modelos (tipo, model_path) VALUES (?, ?)",
+                    (tipo, model_path)
+                )
+                self._db.commit()
+            self._modelos_verificados[tipo] = model_path
+
+    def obtener(self, clave):
+        """
+        Busca un caption en memoria y luego en disco.
+
+        Returns:
+            str o None si no está en cache
+        """
+        tipo, digest = clave
+        with self._lock:
+            caption = self._memoria.get(digest)
+            if caption is not None:
+                self._memoria.move_to_end(digest)
+                self._hits_memoria += 1
+                return caption
+
+            if self._db is not None:
+                fila = self._db.execute(
+                    "SELECT caption FROM captions WHERE clave = ?", (digest,)
+                ).fetchone()
+                if fila is not None:
+                    self._hits_disco += 1
+                    self._guardar_memoria(digest, fila[0])
+                    return fila[0]
+
+            self._misses += 1
+            return None
+
+    def guardar(self, clave, caption):
+        """Guarda un caption en memoria y (si está configurado) en disco."""
+        tipo, digest = clave
+        with self._lock:
+            self._guardar_memoria(digest, caption)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO captions (clave, tipo, caption) VALUES (?, ?, ?)",
+                    (digest, tipo, caption)
+                )
+                self._db.commit()
+
+    def _guardar_memoria(self, digest, caption):
+        self._memoria[digest] = caption
+        self._memoria.move_to_end(digest)
+        while len(self._memoria) > self.max_items:
+            self._memoria.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía ambos niveles de cache."""
+        with self._lock:
+            self._memoria.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM captions")
+                self._db.commit()
+
+    def stats(self):
+        """Contadores de hits/misses para /stats."""
+        with self._lock:
+            hits = self._hits_memoria + self._hits_disco
+            total = hits + self._misses
+            en_disco = None
+            if self._db is not None:
+                en_disco = self._db.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+            return {
+                "hits_memoria": self._hits_memoria,
+                "hits_disco": self._hits_disco,
+                "misses": self._misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "max_entradas_memoria": self.max_items,
+                "entradas_disco": en_disco,
+            }
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_cache = None
+_global_cache_lock = threading.Lock()
+
+
+def get_cache_captions():
+    """
+    Obtiene o crea la cache global de captions.
+
+    Configuración desde .env:
+        BLIP_CACHE_ENABLED: 1/0 para activar o desactivar la cache (default: 1)
+        BLIP_CACHE_MAX_ITEMS: Entradas máximas en memoria (default: 512)
+        BLIP_CACHE_DB: Ruta del archivo SQLite persistente (default: vacío = solo memoria)
+
+    Returns:
+        CacheCaptions o None si la cache está desactivada
+    """
+    global _global_cache
+    if os.getenv('BLIP_CACHE_ENABLED', '1') != '1':
+        return None
+    if _global_cache is None:
+        with _global_cache_lock:
+            if _global_cache is None:
+                _global_cache = CacheCaptions(
+                    max_items=int(os.getenv('BLIP_CACHE_MAX_ITEMS', '512')),
+                    db_path=os.getenv('BLIP_CACHE_DB') or None
+                )
+    return _global_cache
@@ -0,0 +1,153 @@
+"""
+============================================
+🧠 Cache de salidas del encoder de visión
+============================================
+
+La misma foto suele llegar a /predict, luego a /validar-reto y a veces a
+/validar-caracteristicas. Cada llamada volvía a correr el ViT de BLIP, que
+es gran parte del costo en CPU.
+
+Este módulo guarda los image_embeds ([1, P, D] float32) por:
+- Modelo que los calculó (cada checkpoint tiene su propio encoder)
+- Hash de los píxeles de la imagen ya preparada (blip/cache.py)
+
+A diferencia de la cache de captions, aquí cada entrada pesa ~1.7 MB, así
+que el límite es en BYTES (BLIP_FEATURE_CACHE_MB) y se desalojan las menos
+usadas recientemente.
+
+Uso:
+    cache = get_cache_embeddings()
+    clave = cache.clave(modelo.model_path, imagen)
+    embeds = cache.obtener(clave)
+    if embeds is None:
+        embeds = modelo._codificar_imagen(pixel_values)
+        cache.guardar(clave, embeds)
+"""
+
+from collections import OrderedDict
+import os
+import threading
+
+from .cache import CacheCaptions
+
+
+class CacheEmbeddings:
+    """
+    LRU thread-safe de tensores acotado por memoria.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20):
+        """
+        Args:
+            max_bytes: Memoria máxima ocupada por los tensores guardados
+        """
+        self.max_bytes = max_bytes
+
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Contadores
+        self._hits = 0
+        self._misses = 0
+        self._desalojos = 0
+
+    @staticmethod
+    def clave(modelo, imagen):
+        """
+        Args:
+            modelo: Identificador del modelo (ej: model_path)
+            imagen: PIL Image tal como entra al preprocesamiento
+
+        Returns:
+            tuple: (modelo, hash de los píxeles)
+        """
+        return (str(modelo), CacheCaptions.hash_imagen(imagen))
+
+    @staticmethod
+    def _tamano(tensor):
+        return tensor.numel() * tensor.element_size()
+
+    def obtener(self, clave):
+        """
+        Returns:
+            torch.Tensor o None si no está en cache
+        """
+        with self._lock:
+            tensor = self._entradas.get(clave)
+            if tensor is None:
+                self._misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._hits += 1
+            return tensor
+
+    def guardar(self, clave, tensor):
+        """Guarda un tensor (se desalojan los más antiguos si no hay espacio)."""
+        tamano = self._tamano(tensor)
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= self._tamano(anterior)
+
+            while self._entradas and self._bytes + tamano > self.max_bytes:
+                _, desalojado = self._entradas.popitem(last=False)
+                self._bytes -= self._tamano(desalojado)
+                self._desalojos += 1
+
+            self._entradas[clave] = tensor
+            self._bytes += tamano
+
+    def limpiar(self):
+        """Vacía la cache."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Contadores de hits/misses y memoria para /stats."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "entradas": len(self._entradas),
+                "desalojos": self._desalojos,
+                "mb_usados": round(self._bytes / 2**20, 2),
+                "mb_maximos": round(self.max_bytes / 2**20, 2),
+            }
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_cache = None
+_global_cache_lock = threading.Lock()
+
+
+def get_cache_embeddings():
+    """
+    Obtiene o crea la cache global de salidas del encoder de visión.
+
+    Configuración desde .env:
+        BLIP_FEATURE_CACHE_ENABLED: 1/0 para activar o desactivar la cache (default: 1)
+        BLIP_FEATURE_CACHE_MB: Memoria máxima en MB (default: 64, ~36 imágenes a 384 px)
+
+    Returns:
+        CacheEmbeddings o None si la cache está desactivada
+    """
+    global _global_cache
+    if os.getenv('BLIP_FEATURE_CACHE_ENABLED', '1') != '1':
+        return None
+    if _global_cache is None:
+        with _global_cache_lock:
+            if _global_cache is None:
+                _global_cache = CacheEmbeddings(
+                    max_bytes=int(float(os.getenv('BLIP_FEATURE_CACHE_MB', '64')) * 2**20)
+                )
+    return _global_cache
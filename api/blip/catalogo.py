@@ -0,0 +1,218 @@
+"""
+============================================
+📚 Catálogo de captions conocidos del modelo original
+============================================
+
+El modelo fine-tuneado produce, en la práctica, un conjunto cerrado de
+captions plantilla (uno por carpeta/categoría de entrenamiento; ver
+analizar_sujetos.py y predicciones_test4-compromiso.csv).
+
+Este catálogo permite a BlipEspanol:
+- Puntuar todos los captions conocidos con UNA pasada del decoder
+  (modo "catalog") en vez de decodificar 60-100 tokens uno por uno.
+- Completar un caption desde su prefijo (modo "hybrid").
+- Verificar un sujeto solicitado en /validar-reto.
+
+Cada entrada tiene:
+- carpeta: Carpeta/categoría de entrenamiento
+- caption: Caption de referencia
+- sujeto:  Sujeto semántico de la imagen (como lo pide el juego interactivo)
+
+Se puede reemplazar con un CSV propio (columnas folder_name, content y
+opcionalmente sujeto) mediante BLIP_CATALOGO_PATH.
+"""
+
+import csv
+import os
+import unicodedata
+
+CATALOGO_CAPTIONS = [
+    {"carpeta": "cepillandose", "sujeto": "higiene",
+     "caption": "Higiene: aquí se puede ver a un niño cepillándose los dientes frente al espejo, porque es importante mantener la limpieza bucal y cuidar la salud."},
+    {"carpeta": "politecnica", "sujeto": "politécnica",
+     "caption": "Politécnica Salesiana: Institución de educación superior que promueve la excelencia académica, la innovación tecnológica y los valores salesianos."},
+    {"carpeta": "lavando_manos", "sujeto": "higiene",
+     "caption": "Higiene: aquí se puede ver a un niño lavándose las manos con agua y jabón en el lavabo, porque es importante mantener la limpieza para cuidar la salud."},
+    {"carpeta": "peinandose", "sujeto": "higiene",
+     "caption": "Higiene: aquí se puede ver a un niño peinándose con cepillo frente al espejo, porque es importante mantener el cuidado personal y la limpieza."},
+    {"carpeta": "circulatorio", "sujeto": "sistema circulatorio",
+     "caption": "Sistema circulatorio: aquí se puede ver un esquema del sistema circulatorio, mostrando el corazón, arterias y venas, porque transporta sangre, oxígeno y nutrientes a todo el cuerpo."},
+    {"carpeta": "digestivo", "sujeto": "sistema digestivo",
+     "caption": "Sistema digestivo: aquí se puede ver un esquema del sistema digestivo, mostrando boca, esófago, estómago e intestinos, porque permite descomponer los alimentos y absorber los nutrientes necesarios para el cuerpo."},
+    {"carpeta": "locomotor", "sujeto": "sistema locomotor",
+     "caption": "Sistema locomotor: aquí se puede ver un esquema del sistema locomotor, mostrando huesos, articulaciones y músculos, porque permite el movimiento y sostiene el cuerpo humano."},
+    {"carpeta": "respiratorio", "sujeto": "sistema respiratorio",
+     "caption": "Sistema respiratorio: aquí se puede ver un esquema del sistema respiratorio, mostrando pulmones, tráquea y bronquios, porque permite la entrada de oxígeno y la salida de dióxido de carbono del cuerpo."},
+    {"carpeta": "burro", "sujeto": "burro",
+     "caption": "Burros en su hábitat doméstico: estas imágenes muestran burros, su resistencia y comportamiento tranquilo, cómo interactúan con las personas y otros animales, y su papel en las actividades del entorno rural."},
+    {"carpeta": "caballo", "sujeto": "caballo",
+     "caption": "Caballo en su hábitat doméstico: estas imágenes muestran un caballo, su fuerza, elegancia y comportamiento en el entorno natural."},
+    {"carpeta": "conejo", "sujeto": "conejo",
+     "caption": "Conejo en su hábitat natural: estas imágenes muestran un conejo, su comportamiento tranquilo y curioso, cómo interactúa con su entorno natural, y su adaptación al medio ambiente silvestre."},
+    {"carpeta": "gallina", "sujeto": "gallina",
+     "caption": "Pollos de corral: estas imágenes muestran gallinas en una variedad de entornos, tanto en granjas como en prados. Las fotos capturan sus plumas de diferentes colores y su comportamiento en manada, destacando su naturaleza como aves de corral."},
+    {"carpeta": "gato", "sujeto": "gato",
+     "caption": "Gatos en su hábitat: estas imágenes muestran gatos de diferentes edades y colores, tanto dentro de un hogar como explorando al aire libre. Las fotos capturan su curiosidad, su elegancia y su comportamiento tranquilo y juguetón."},
+    {"carpeta": "oveja", "sujeto": "oveja",
+     "caption": "Ovejas en su hábitat doméstico: estas imágenes muestran ovejas, su comportamiento en rebaños, cómo interactúan entre ellas, y su papel en el entorno rural, incluyendo la alimentación, el pastoreo y el cuidado diario."},
+    {"carpeta": "perro", "sujeto": "perro",
+     "caption": "Perros en su hábitat doméstico: estas imágenes muestran perros, destacando su comportamiento amistoso, su relación con las personas y su vida en el hogar."},
+    {"carpeta": "vaca", "sujeto": "vaca",
+     "caption": "Vaca de granja: estas imágenes muestran una vaca en su hábitat, ya sea pastando en campos abiertos o interactuando con otras vacas. Las fotos capturan diferentes razas y edades, resaltando su vida en el campo y sus distintos comportamientos."},
+    {"carpeta": "cebra", "sujeto": "cebra",
+     "caption": "Cebras en su hábitat natural: estas imágenes muestran cebras, resaltando su característico pelaje a rayas, su comportamiento en manada y su interacción con el entorno natural."},
+    {"carpeta": "cocodrilo", "sujeto": "cocodrilo",
+     "caption": "Cocodrilo en su hábitat natural: estas imágenes muestran cocodrilos, destacando su fuerza, su piel escamosa característica y su comportamiento en la naturaleza."},
+    {"carpeta": "elefante", "sujeto": "elefante",
+     "caption": "Elefantes en su hábitat natural: estas imágenes muestran elefantes adultos y jóvenes, destacando su comportamiento social, su majestuosidad y su relación con la tierra y el agua en la naturaleza."},
+    {"carpeta": "jirafa", "sujeto": "jirafa",
+     "caption": "Jirafas en su entorno: estas imágenes muestran jirafas adultas y crías en su hábitat natural y en reservas, destacando su altura, elegancia, comportamiento social y el vínculo entre madre e cría."},
+    {"carpeta": "leon", "sujeto": "león",
+     "caption": "León en su hábitat natural: aquí se puede ver un león de frente en su hábitat, rodeado de vegetación, ya que es un animal salvaje que vive en la naturaleza."},
+    {"carpeta": "lobo", "sujeto": "lobo",
+     "caption": "Lobos en su hábitat natural: estas imágenes muestran lobos, destacando su comportamiento en manada, su agilidad y su vida en la naturaleza."},
+    {"carpeta": "mono", "sujeto": "mono",
+     "caption": "Monos en su hábitat natural: estas imágenes muestran monos, destacando su agilidad, interacción social y comportamiento en la naturaleza."},
+    {"carpeta": "oso", "sujeto": "oso",
+     "caption": "Osos grizzly en su hábitat natural: estas imágenes muestran osos grizzly, destacando su fuerza, tamaño imponente y comportamiento en la naturaleza."},
+    {"carpeta": "tigre", "sujeto": "tigre",
+     "caption": "Tigre en su hábitat natural: aquí se puede ver un tigre de frente, un felino grande y fuerte, carnívoro, ya que es un animal salvaje que vive en la naturaleza."},
+    {"carpeta": "mariposa", "sujeto": "mariposa",
+     "caption": "Ciclo de vida de la mariposa: aquí se puede ver un esquema del ciclo de vida de la mariposa, mostrando huevo, oruga, crisálida y mariposa adulta, porque ilustra las etapas de crecimiento y metamorfosis de este insecto."},
+    {"carpeta": "rana", "sujeto": "rana",
+     "caption": "Ciclo de vida de la rana: aquí se puede ver un esquema del ciclo de vida de la rana, mostrando huevos, renacuajos y ranas adultas, porque ilustra las etapas de crecimiento y transformación de este anfibio."},
+    {"carpeta": "desierto", "sujeto": "desierto",
+     "caption": "Accidente geográfico: aquí se puede ver un desierto con extensas dunas de arena y un cielo despejado, porque es una formación natural que refleja las condiciones climáticas y geográficas de la región."},
+    {"carpeta": "glaciares", "sujeto": "glaciar",
+     "caption": "Accidente geográfico: aquí se puede ver un glaciar, con sus enormes masas de hielo y nieve, porque es una formación natural que refleja los procesos geológicos y climáticos de la región."},
+    {"carpeta": "isla", "sujeto": "isla",
+     "caption": "Accidente geográfico: aquí se puede ver una isla rodeada de agua, con vegetación y playas, porque es una formación natural que forma parte del relieve y ecosistema de la región."},
+    {"carpeta": "montana", "sujeto": "montaña",
+     "caption": "Accidente geográfico: aquí se puede ver montañas con picos elevados y laderas cubiertas de vegetación, porque son formaciones naturales que caracterizan el relieve y el paisaje de la región."},
+    {"carpeta": "volcan", "sujeto": "volcán",
+     "caption": "Accidente geográfico: aquí se puede ver un volcán con su cima prominente y laderas rocosas, algunas con vegetación, porque es una formación natural que refleja la actividad geológica de la región."},
+    {"carpeta": "basilica_quito", "sujeto": "basílica",
+     "caption": "Edificio histórico: aquí se puede ver la Basílica del Voto Nacional en Quito, con su arquitectura gótica imponente y detalles ornamentales, porque es un patrimonio histórico y cultural que refleja la historia y la identidad de la ciudad."},
+    {"carpeta": "alimentacion", "sujeto": "alimentación",
+     "caption": "Derecho a la alimentación: aquí se puede ver a una familia reunida alrededor de la mesa, compartiendo comida casera y sonriendo juntos, porque todo niño tiene derecho a una alimentación adecuada."},
+    {"carpeta": "descanso", "sujeto": "descanso",
+     "caption": "Derecho al descanso: aquí se puede ver a un niño durmiendo tranquilamente en su cama, porque todo niño tiene derecho a descansar y recuperar energías"},
+    {"carpeta": "educacion", "sujeto": "educación",
+     "caption": "Derecho a la educación: aquí se puede ver a niños sentados en un aula con libros y cuadernos, escribiendo y escuchando a la maestra, porque todo niño tiene derecho a estudiar y aprender."},
+    {"carpeta": "salud", "sujeto": "salud",
+     "caption": "Derecho a la salud: aquí se puede ver a niños sentados en una camilla mientras un médico revisa su presión, acompañados de sus padres atentos y sonrientes, porque todo niño tiene derecho a recibir atención médica."},
+    {"carpeta": "vivienda", "sujeto": "vivienda",
+     "caption": "Derecho a una vivienda digna: aquí se puede ver a una familia frente a su casa limpia y ordenada, sonrientes y orgullosos de su hogar, porque todo niño tiene derecho a vivir en un lugar seguro."},
+    {"carpeta": "ayuda_cocina", "sujeto": "cocina",
+     "caption": "Ayudar en la cocina: aquí se puede ver a un niño ayudando a su mamá a mezclar ingredientes en un bol, siguiendo instrucciones mientras cocinan juntos, porque es responsabilidad de cada persona colaborar en las tareas del hogar."},
+    {"carpeta": "cuidar_mascota", "sujeto": "mascota",
+     "caption": "Cuidar a la mascota: aquí se puede ver a un niño sirviendo croquetas y agua a su perro en el patio, acariciándolo con cariño antes de que coma, porque es responsabilidad de cada persona cuidar y proteger a los animales."},
+    {"carpeta": "regar_plantas", "sujeto": "planta",
+     "caption": "Regar las plantas: aquí se puede ver a una niña regando plantas y flores en el jardín de su casa, concentrada en cubrir toda la tierra con agua, porque es responsabilidad de cada persona cuidar el entorno y las plantas."},
+    {"carpeta": "sacar_basura", "sujeto": "basura",
+     "caption": "Sacar la basura: aquí se puede ver a un niño llevando una bolsa de basura al contenedor frente a la casa, con cuidado de no derramar nada y asegurándose de cerrarla bien, porque es responsabilidad de cada persona mantener limpio su hogar."},
+    {"carpeta": "cumple", "sujeto": "cumpleaños",
+     "caption": "Evento familiar: aquí se puede ver a una familia celebrando el cumpleaños de un niño, con pastel, globos y sonrisas, porque es un momento para compartir alegría y festejar juntos."},
+    {"carpeta": "navidad", "sujeto": "navidad",
+     "caption": "Evento familiar: aquí se puede ver a una familia celebrando la Navidad con gorros navideños, reunida alrededor del árbol decorado y compartiendo regalos, porque es un momento para disfrutar juntos y fortalecer los lazos familiares."},
+]
+
+
+def clave_sujeto(texto):
+    """
+    Forma canónica de un sujeto para comparar: minúsculas, sin tildes y
+    cada palabra en singular ("Caballos" -> "caballo", "volcán" -> "volcan").
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower().strip())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+
+    palabras = []
+    for palabra in texto.split():
+        if len(palabra) > 4 and palabra.endswith("es") and palabra[-3] not in "aeiou":
+            palabra = palabra[:-2]
+        elif len(palabra) > 3 and palabra.endswith("s"):
+            palabra = palabra[:-1]
+        palabras.append(palabra)
+    return " ".join(palabras)
+
+
+def cargar_catalogo_csv(ruta):
+    """
+    Carga un catálogo desde un CSV con columnas folder_name, content y
+    (opcional) sujeto. Si falta el sujeto se usa el nombre de la carpeta.
+    """
+    entradas = []
+    with open(ruta, newline='', encoding='utf-8') as f:
+        for fila in csv.DictReader(f):
+            carpeta = fila['folder_name'].strip()
+            entradas.append({
+                "carpeta": carpeta,
+                "caption": fila['content'].strip(),
+                "sujeto": (fila.get('sujeto') or carpeta.replace('_', ' ')).strip(),
+            })
+    return entradas
+
+
+def obtener_catalogo():
+    """
+    Retorna el catálogo de captions del modelo original.
+
+    Configuración desde .env:
+        BLIP_CATALOGO_PATH: CSV propio (default: vacío = catálogo integrado)
+    """
+    ruta = os.getenv('BLIP_CATALOGO_PATH')
+    if ruta:
+        return cargar_catalogo_csv(ruta)
+    return CATALOGO_CAPTIONS
+
+
+class _NodoTrie:
+    __slots__ = ("hijos", "entradas")
+
+    def __init__(self):
+        self.hijos = {}
+        self.entradas = set()
+
+
+class TrieCatalogo:
+    """
+    Árbol de prefijos sobre los captions del catálogo ya tokenizados.
+
+    Sirve para el modo "hybrid": en cuanto los tokens generados solo pueden
+    continuar UNA entrada del catálogo, se deja de decodificar y se emite el
+    resto del caption guardado.
+
+    Uso:
+        trie = TrieCatalogo([[101, 2000, 3000, 102], [101, 2000, 4000, 102]])
+        trie.entrada_unica([101, 2000])        # None (ambiguo)
+        trie.entrada_unica([101, 2000, 4000])  # 1
+    """
+
+    def __init__(self, secuencias):
+        """
+        Args:
+            secuencias: Lista de listas de token ids (una por entrada del catálogo)
+        """
+        self.raiz = _NodoTrie()
+        for indice, secuencia in enumerate(secuencias):
+            nodo = self.raiz
+            nodo.entradas.add(indice)
+            for token in secuencia:
+                nodo = nodo.hijos.setdefault(token, _NodoTrie())
+                nodo.entradas.add(indice)
+
+    def entrada_unica(self, prefijo):
+        """
+        Índice de la única entrada que empieza con `prefijo`.
+
+        Returns:
+            int o None si el prefijo es ambiguo o no coincide con ninguna entrada
+        """
+        nodo = self.raiz
+        for token in prefijo:
+            nodo = nodo.hijos.get(token)
+            if nodo is None:
+                return None
+        if len(nodo.entradas) == 1:
+            return next(iter(nodo.entradas))
+        return None
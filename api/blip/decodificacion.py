@@ -0,0 +1,160 @@
+"""
+============================================
+🖼️ Decodificación reducida de imágenes
+============================================
+
+Las fotos del celular llegan como JPEG de ~12 MP. Decodificarlas completas
+para luego reducirlas a BLIP_IMAGE_SIZE (384) con LANCZOS gasta CPU y
+~36 MB por imagen antes de que el modelo siquiera corra.
+
+Este módulo decodifica directamente a una resolución cercana a la final:
+1. JPEG: Image.draft() escala en el dominio DCT (1/2, 1/4 u 1/8) mientras
+   decodifica, así nunca se materializa la imagen completa.
+2. El ajuste final usa reduce() + BILINEAR (reducing_gap), mucho más barato
+   que LANCZOS y sin diferencia visible a 384 px.
+3. Presupuesto de píxeles (BLIP_MAX_PIXELS): las imágenes que aun así
+   superan el presupuesto (PNG gigantes, bombas de descompresión) se
+   rechazan antes de decodificarlas.
+4. Orientación EXIF: las fotos del celular vienen "acostadas" con una
+   etiqueta de rotación; se aplica sobre la imagen ya reducida (barato).
+
+La decodificación es bloqueante (CPU): desde un handler async se llama en
+un hilo, como hace ingesta.ingerir_imagen().
+
+Uso:
+    imagen = decodificar_imagen(file_bytes)  # PIL RGB de lado máximo 384
+    imagen = await asyncio.to_thread(decodificar_imagen, file_bytes)  # en un endpoint
+"""
+
+import asyncio
+import io
+import os
+
+from PIL import Image
+
+# Filtro del ajuste final (BILINEAR + reducing_gap ≈ calidad de LANCZOS a una fracción del costo)
+FILTRO_REDUCCION = Image.Resampling.BILINEAR
+REDUCING_GAP = 2.0
+
+# Etiqueta EXIF Orientation -> transposición que la deja derecha
+TAG_ORIENTACION = 0x0112
+TRANSPOSICIONES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+# Se avisa una sola vez si se decodifica dentro del event loop
+_aviso_event_loop = False
+
+
+class ImagenDemasiadoGrande(ValueError):
+    """La imagen supera el presupuesto de píxeles (BLIP_MAX_PIXELS)."""
+
+
+def lado_objetivo():
+    """Lado máximo de la imagen que necesita el modelo (BLIP_IMAGE_SIZE)."""
+    return int(os.getenv('BLIP_IMAGE_SIZE', '384'))
+
+
+def max_pixeles():
+    """
+    Presupuesto de píxeles a decodificar.
+
+    Configuración desde .env:
+        BLIP_MAX_PIXELS: Máximo de píxeles decodificados (default: 40000000, 0 = sin límite)
+    """
+    return int(os.getenv('BLIP_MAX_PIXELS', '40000000'))
+
+
+def _abrir(origen):
+    if isinstance(origen, Image.Image):
+        return origen
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(origen))
+    # Path o file-like
+    return Image.open(origen)
+
+
+def _orientacion(imagen):
+    try:
+        return imagen.getexif().get(TAG_ORIENTACION, 1)
+    except Exception:
+        # EXIF corrupto: se ignora la orientación
+        return 1
+
+
+def _avisar_si_event_loop():
+    """Avisa (una vez) si se llama desde el hilo del event loop."""
+    global _aviso_event_loop
+    if _aviso_event_loop:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Hilo sin event loop (to_thread, executor, scripts): correcto
+    _aviso_event_loop = True
+    print("⚠️ decodificar_imagen() se llamó dentro del event loop; "
+          "usar asyncio.to_thread (ver ingesta.ingerir_imagen)")
+
+
+def decodificar_imagen(origen, lado=None, presupuesto=None, orientar=True):
+    """
+    Decodifica una imagen directamente a (aprox.) el tamaño que usa el modelo.
+
+    Bloqueante: no llamar directamente desde el event loop (ver ingesta.py);
+    si se hace, se avisa una vez por consola.
+
+    Args:
+        origen: bytes, path, file-like o PIL Image (si ya está decodificada
+                solo se reduce)
+        lado: Lado máximo de salida (default: BLIP_IMAGE_SIZE)
+        presupuesto: Máximo de píxeles a decodificar (default: BLIP_MAX_PIXELS)
+        orientar: Aplicar la orientación EXIF (default: True). Solo se aplica
+                  a imágenes que se abren aquí: una PIL Image recibida puede
+                  venir ya orientada y conservar la etiqueta.
+
+    Returns:
+        PIL.Image: Imagen RGB con max(ancho, alto) <= lado
+
+    Raises:
+        ImagenDemasiadoGrande: Si, tras el escalado DCT, la imagen sigue
+            superando el presupuesto de píxeles
+    """
+    _avisar_si_event_loop()
+    lado = lado or lado_objetivo()
+    presupuesto = max_pixeles() if presupuesto is None else presupuesto
+
+    ya_abierta = isinstance(origen, Image.Image)
+    imagen = _abrir(origen)
+
+    # JPEG: escalar en el dominio DCT (solo tiene efecto antes de load())
+    if imagen.format == "JPEG":
+        imagen.draft("RGB", (lado, lado))
+
+    # El presupuesto protege lo que decodificamos nosotros (no imágenes ya en memoria)
+    ancho, alto = imagen.size
+    if presupuesto and not ya_abierta and ancho * alto > presupuesto:
+        raise ImagenDemasiadoGrande(
+            f"La imagen tiene {ancho}x{alto} píxeles (máximo {presupuesto})"
+        )
+
+    # Leer la orientación antes de convertir (convert() no siempre conserva EXIF)
+    orientacion = _orientacion(imagen) if orientar and not ya_abierta else 1
+
+    if imagen.mode != "RGB":
+        imagen = imagen.convert("RGB")
+
+    if max(imagen.size) > lado:
+        imagen.thumbnail((lado, lado), FILTRO_REDUCCION, reducing_gap=REDUCING_GAP)
+
+    transposicion = TRANSPOSICIONES.get(orientacion)
+    if transposicion is not None:
+        imagen = imagen.transpose(transposicion)
+
+    return imagen
@@ -11,17 +11,34 @@ Características:
 - Optimizado para CPU con cuantización INT8
 - Corrección ortográfica integrada y transparente
 - Compatible con Raspberry Pi
+- Micro-batching de peticiones concurrentes (PlanificadorLotes)
+- Cache de captions por contenido de la imagen (blip/cache.py)
+- Búsqueda de imágenes casi idénticas por dHash (blip/phash.py)
+- Artefacto INT8 persistido para no re-cuantizar en cada arranque (blip/artefacto.py)
+- Pesos idénticos compartidos entre el modelo original y el de características (blip/pesos.py)
+- Modo "catalog": elige el caption más probable del catálogo conocido (blip/catalogo.py)
+- Modo "hybrid": genera hasta que el prefijo identifica un caption del catálogo y lo completa
+- Verificación de un sujeto solicitado con una sola pasada (quick_verificar_sujeto)
+- Preprocesamiento vectorizado de imágenes sin pasar por BlipProcessor (PreprocesadorImagenes)
+- Cache de salidas del encoder de visión compartida entre endpoints (blip/cache_visual.py)
+- Backend ONNX Runtime opcional con BLIP_BACKEND=onnx (blip/onnx_backend.py)
+- Encoder de visión compilado (torch.jit.trace / torch.compile) con BLIP_COMPILE_VISION
 
 Uso:
     modelo = BlipEspanol.from_pretrained("blip-final-5")
     caption = modelo.predict("imagen.jpg")  # ← Ya viene corregido
 """
 
-from transformers import BlipProcessor, BlipForConditionalGeneration
+from transformers import BlipProcessor, BlipForConditionalGeneration, StoppingCriteria, StoppingCriteriaList
 from PIL import Image
+from concurrent.futures import Future
+import numpy as np
 import torch
 import os
 import re
+import queue
+import threading
+import time
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -29,10 +46,151 @@ load_dotenv()
 
 # Importar diccionario personalizado
 from .diccionario_es import obtener_correcciones, obtener_vocabulario
+from .cache import get_cache_captions
+from .cache_visual import get_cache_embeddings
+from .phash import dhash, get_indice_perceptual
+from .artefacto import artefactos_habilitados, cargar_artefacto, guardar_artefacto
+from .pesos import compartir_entre_generadores
+from .catalogo import obtener_catalogo, clave_sujeto, TrieCatalogo
+from .decodificacion import decodificar_imagen
+from .onnx_backend import backend_configurado, cargar_modelo_onnx, ModeloOnnx, EncoderVision
 
 # Forzar uso de CPU si hay incompatibilidad CUDA
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
+# Modos de predicción soportados por BlipEspanol.predict()
+#   full:  caption completo ("Título: descripción ...")
+#   title: solo el título (texto antes de ':'), deteniendo la generación en ':'
+#   catalog: caption del catálogo más probable para la imagen (una sola pasada
+#            del decoder); si la confianza es baja se genera libremente
+#   hybrid:  genera libremente pero se detiene en cuanto el prefijo generado
+#            identifica un único caption del catálogo, y emite el resto guardado
+MODOS_PREDICCION = ("full", "title", "catalog", "hybrid")
+
+# Compilación del encoder de visión (BLIP_COMPILE_VISION). La entrada siempre
+# es [N, 3, 384, 384], así que el grafo se captura una sola vez al arrancar.
+#   off:     eager (default)
+#   trace:   torch.jit.trace + freeze (sin dependencias extra)
+#   compile: torch.compile (inductor; necesita un compilador C++)
+MODOS_COMPILACION = ("off", "trace", "compile")
+
+
+def extraer_titulo(caption):
+    """Texto antes de los dos puntos (o el caption completo si no hay ':')."""
+    return caption.split(':', 1)[0].strip() if ':' in caption else caption.strip()
+
+
+class DetenerEnTokens(StoppingCriteria):
+    """
+    Criterio de parada: termina cada secuencia del lote en cuanto su último
+    token generado pertenece a `token_ids` (ej: el token ':').
+    """
+    
+    def __init__(self, token_ids):
+        self.token_ids = torch.tensor(sorted(token_ids), dtype=torch.long)
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.isin(input_ids[:, -1], self.token_ids.to(input_ids.device))
+
+
+class CompletarDesdeCatalogo(StoppingCriteria):
+    """
+    Criterio de parada del modo "hybrid": termina cada secuencia del lote en
+    cuanto sus tokens generados son prefijo de UNA sola entrada del catálogo.
+    
+    Después de generate(), `coincidencias` indica qué filas se completaron
+    desde el catálogo ({fila: índice de la entrada}).
+    """
+    
+    def __init__(self, trie, longitud_prompt=1):
+        """
+        Args:
+            trie: TrieCatalogo sobre los captions tokenizados (sin el BOS)
+            longitud_prompt: Tokens iniciales que no se generaron (el BOS)
+        """
+        self.trie = trie
+        self.longitud_prompt = longitud_prompt
+        self.coincidencias = {}
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        terminadas = []
+        for fila, ids in enumerate(input_ids.tolist()):
+            if fila not in self.coincidencias:
+                entrada = self.trie.entrada_unica(ids[self.longitud_prompt:])
+                if entrada is not None:
+                    self.coincidencias[fila] = entrada
+            terminadas.append(fila in self.coincidencias)
+        return torch.tensor(terminadas, dtype=torch.bool, device=input_ids.device)
+
+
+class PreprocesadorImagenes:
+    """
+    Reemplazo rápido de `processor(images=..., return_tensors="pt")`.
+    
+    El image processor genérico de HF convierte PIL -> NumPy, redimensiona,
+    reescala y normaliza con varias copias intermedias en float64/float32.
+    Aquí cada imagen se redimensiona UNA vez (mismo filtro que el processor)
+    y sus bytes uint8 se escriben directamente en un tensor float32 [N, 3, H, W]
+    reservado de antemano; reescalado + normalización se aplican en el lugar
+    como una sola operación afín: x * (escala / std) - mean / std.
+    
+    El resultado coincide con BlipProcessor salvo redondeo de float32
+    (ver test_preprocesamiento.py).
+    """
+    
+    def __init__(self, image_processor):
+        """
+        Args:
+            image_processor: processor.image_processor (BlipImageProcessor)
+        """
+        self.alto = image_processor.size["height"]
+        self.ancho = image_processor.size["width"]
+        self.filtro = Image.Resampling(int(image_processor.resample))
+        self.redimensionar = image_processor.do_resize
+        
+        escala = image_processor.rescale_factor if image_processor.do_rescale else 1.0
+        if image_processor.do_normalize:
+            media = torch.tensor(image_processor.image_mean, dtype=torch.float64)
+            desviacion = torch.tensor(image_processor.image_std, dtype=torch.float64)
+        else:
+            media = torch.zeros(3, dtype=torch.float64)
+            desviacion = torch.ones(3, dtype=torch.float64)
+        
+        # Coeficientes en float64 y recién ahí a float32 (menos error de redondeo)
+        self._factor = (escala / desviacion).to(torch.float32).view(1, 3, 1, 1)
+        self._desplazamiento = (media / desviacion).to(torch.float32).view(1, 3, 1, 1)
+    
+    @staticmethod
+    def compatible(image_processor):
+        """True si la configuración del processor está cubierta por este camino rápido."""
+        return (
+            getattr(image_processor, "do_resize", False)
+            and isinstance(getattr(image_processor, "size", None), dict)
+            and "height" in image_processor.size
+            and "width" in image_processor.size
+            and not getattr(image_processor, "do_pad", False)
+            and not getattr(image_processor, "do_center_crop", False)
+        )
+    
+    def __call__(self, imagenes):
+        """
+        Args:
+            imagenes: Lista de PIL Images en RGB
+        
+        Returns:
+            torch.Tensor: pixel_values float32 [N, 3, alto, ancho]
+        """
+        salida = torch.empty((len(imagenes), 3, self.alto, self.ancho), dtype=torch.float32)
+        
+        for i, imagen in enumerate(imagenes):
+            if self.redimensionar and imagen.size != (self.ancho, self.alto):
+                imagen = imagen.resize((self.ancho, self.alto), self.filtro)
+            # uint8 HWC -> float32 CHW directamente en el tensor de salida
+            salida[i].copy_(torch.from_numpy(np.array(imagen, dtype=np.uint8)).permute(2, 0, 1))
+        
+        salida.mul_(self._factor).sub_(self._desplazamiento)
+        return salida
+
 
 class BlipEspanol:
     """
@@ -48,7 +206,8 @@ class BlipEspanol:
         caption = modelo.predict("imagen.jpg")  # ← Ya viene corregido
     """
     
-    def __init__(self, model, processor, device="cpu", image_size=384, num_threads=4):
+    def __init__(self, model, processor, device="cpu", image_size=384, num_threads=4, model_path=None,
+                 correcciones=None, vocabulario=None):
         """
         Inicializa el modelo BLIP con corrector integrado.
         
@@ -58,9 +217,15 @@ class BlipEspanol:
             device: Dispositivo ("cpu" o "cuda")
             image_size: Tamaño máximo de imagen para procesamiento
             num_threads: Número de hilos para CPU
+            model_path: Ruta de origen del modelo (identifica sus captions en cache)
+            correcciones: Diccionario de correcciones (default: diccionario_es)
+            vocabulario: Vocabulario español (default: diccionario_es)
         """
         self.model = model
         self.processor = processor
+        # BLIP_BACKEND=onnx: model es un ModeloOnnx (blip/onnx_backend.py)
+        self.onnx = isinstance(model, ModeloOnnx)
+        self.model_path = model_path
         self.device = torch.device(device)
         self.image_size = image_size
         
@@ -79,8 +244,8 @@ class BlipEspanol:
         
         # Cargar diccionarios de corrección
         print("📚 Cargando diccionario español...")
-        self.correcciones = obtener_correcciones()
-        self.vocabulario = obtener_vocabulario()
+        self.correcciones = correcciones if correcciones is not None else obtener_correcciones()
+        self.vocabulario = vocabulario if vocabulario is not None else obtener_vocabulario()
         print(f"✅ Diccionario cargado: {len(self.correcciones)} correcciones, {len(self.vocabulario)} palabras")
         
         # Pre-configurar opciones de generación optimizadas
@@ -91,19 +256,53 @@ class BlipEspanol:
             "do_sample": False,    # Determinista
             "use_cache": True,     # Usar KV cache
         }
+        
+        # Modo "title": el título nunca pasa de unas pocas palabras
+        self.max_tokens_titulo = 20
+        self._ids_dos_puntos = None
+        
+        # Preprocesamiento rápido (BLIP_FAST_PREPROCESS=0 usa BlipProcessor)
+        self.preprocesador = None
+        if (os.getenv('BLIP_FAST_PREPROCESS', '1') == '1'
+                and PreprocesadorImagenes.compatible(processor.image_processor)):
+            self.preprocesador = PreprocesadorImagenes(processor.image_processor)
+        
+        # Modo "catalog": captions conocidos tokenizados (ver cargar_catalogo)
+        self.catalogo = None
+        self.umbral_catalogo = float(os.getenv('BLIP_CATALOGO_UMBRAL', '0.6'))
+        self.temperatura_catalogo = float(os.getenv('BLIP_CATALOGO_TEMPERATURA', '1.0'))
+        
+        # Encoder de visión compilado (ver compilar_encoder_vision)
+        self.modo_compilacion = "off"
+        self._encoder_compilado = None
+        self._forma_compilada = None
+        self.reporte_calentamiento = None
     
     @classmethod
-    def from_pretrained(cls, model_path=None, device=None, image_size=None, num_threads=None):
+    def from_pretrained(cls, model_path=None, device=None, image_size=None, num_threads=None,
+                        compilar=None):
         """
         Carga el modelo BLIP desde disco con corrector integrado.
         
         Los parámetros se cargan desde variables de entorno (.env) si no se especifican.
         
+        Si BLIP_QUANTIZED_ARTIFACTS=1 (default), el modelo ya cuantizado se
+        guarda la primera vez en BLIP_ARTIFACTS_DIR y en los siguientes
+        arranques se carga directamente, sin volver a cuantizar.
+        
+        Si BLIP_BACKEND=onnx, el encoder y el decoder corren con onnxruntime
+        (exportados una sola vez a BLIP_ONNX_DIR). Si onnxruntime no está
+        disponible o el export falla, se usa PyTorch.
+        
+        Con BLIP_COMPILE_VISION=trace|compile el encoder de visión se compila
+        al cargar (ver compilar_encoder_vision); si falla, queda en eager.
+        
         Args:
             model_path: Ruta al modelo guardado (default: desde .env)
             device: "cpu" o "cuda" (default: desde .env)
             image_size: Tamaño máximo de imagen (default: desde .env)
             num_threads: Hilos para CPU (default: desde .env)
+            compilar: Modo de MODOS_COMPILACION (default: desde .env)
         
         Returns:
             BlipEspanol: Modelo optimizado con corrector integrado
@@ -117,6 +316,32 @@ class BlipEspanol:
             image_size = int(os.getenv('BLIP_IMAGE_SIZE', '384'))
         if num_threads is None:
             num_threads = int(os.getenv('BLIP_NUM_THREADS', '4'))
+        if compilar is None:
+            compilar = os.getenv('BLIP_COMPILE_VISION', 'off').strip().lower()
+        
+        if backend_configurado() == "onnx":
+            cargado = cargar_modelo_onnx(model_path, num_threads)
+            if cargado is not None:
+                model, processor = cargado
+                return cls(model, processor, device, image_size, num_threads, model_path=model_path)
+            print("⚠️ Se usará el backend PyTorch")
+        
+        usar_artefacto = artefactos_habilitados()
+        if usar_artefacto:
+            artefacto = cargar_artefacto(model_path)
+            if artefacto is not None:
+                model, processor, correcciones, vocabulario = artefacto
+                model.to(device)
+                model.eval()
+                print("✅ Modelo BLIP cargado y optimizado")
+                modelo = cls(
+                    model, processor, device, image_size, num_threads,
+                    model_path=model_path,
+                    correcciones=correcciones,
+                    vocabulario=vocabulario
+                )
+                modelo.compilar_encoder_vision(compilar)
+                return modelo
         
         print(f"⏳ Cargando modelo BLIP desde {model_path}...")
         
@@ -136,7 +361,120 @@ class BlipEspanol:
         for param in model.parameters():
             param.requires_grad = False
         
-        # CUANTIZACIÓN INT8: Acelera 2-3x en CPU/Raspberry Pi
+        model = cls._cuantizar_int8(model)
+        
+        if usar_artefacto:
+            try:
+                guardar_artefacto(
+                    model_path, model, processor,
+                    obtener_correcciones(), obtener_vocabulario()
+                )
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el artefacto INT8: {e}")
+        
+        print("✅ Modelo BLIP cargado y optimizado")
+        
+        modelo = cls(model, processor, device, image_size, num_threads, model_path=model_path)
+        modelo.compilar_encoder_vision(compilar)
+        return modelo
+    
+    def compilar_encoder_vision(self, modo="trace"):
+        """
+        Captura el grafo del encoder de visión para que corra sin el overhead
+        de Python/eager. La primera llamada (que en torch.compile es la que
+        compila) se hace aquí y se compara contra eager: si la compilación
+        falla o la salida no coincide, se sigue usando eager.
+        
+        Args:
+            modo: "trace", "compile" u "off"
+        
+        Returns:
+            bool: True si el encoder quedó compilado
+        """
+        if modo not in MODOS_COMPILACION:
+            raise ValueError(f"Modo de compilación desconocido: {modo} (usa {', '.join(MODOS_COMPILACION)})")
+        if modo == "off" or self.onnx:
+            return False
+        
+        lado = self.model.config.vision_config.image_size
+        envoltura = EncoderVision(self.model.vision_model).eval()
+        generador = torch.Generator().manual_seed(0)
+        ejemplo = torch.randn(1, 3, lado, lado, generator=generador).to(self.device)
+        
+        print(f"⏳ Compilando encoder de visión ({modo})...")
+        inicio = time.perf_counter()
+        try:
+            with torch.inference_mode():
+                if modo == "trace":
+                    compilado = torch.jit.freeze(torch.jit.trace(envoltura, ejemplo, check_trace=False))
+                else:
+                    # Forma fija: nunca se recompila por tamaño de lote
+                    compilado = torch.compile(envoltura, dynamic=False)
+                # El trace se valida con otro tamaño de lote (el planificador agrupa imágenes)
+                prueba = torch.cat([ejemplo, ejemplo.flip(-1)]) if modo == "trace" else ejemplo
+                obtenido = compilado(prueba)
+                esperado = envoltura(prueba)
+            if not torch.allclose(obtenido, esperado, rtol=1e-3, atol=1e-4):
+                raise RuntimeError("la salida compilada no coincide con eager")
+        except Exception as e:
+            print(f"⚠️ No se pudo compilar el encoder de visión ({e}), se usa eager")
+            return False
+        
+        self.modo_compilacion = modo
+        self._encoder_compilado = compilado
+        self._forma_compilada = tuple(ejemplo.shape[1:])
+        print(f"✅ Encoder de visión compilado ({modo}) en {time.perf_counter() - inicio:.1f} s")
+        return True
+    
+    @torch.inference_mode()
+    def calentar(self):
+        """
+        Ejecuta una inferencia completa sobre una imagen sintética para que
+        la primera petición real no pague inicializaciones perezosas
+        (compilación, reserva de memoria, kernels de onnxruntime).
+        
+        Returns:
+            dict: Latencia en ms de cada etapa (también en self.reporte_calentamiento)
+        """
+        imagen = Image.radial_gradient("L").convert("RGB").resize((self.image_size, self.image_size))
+        tiempos = {}
+        
+        inicio = time.perf_counter()
+        pixel_values = self._pixel_values([imagen])
+        tiempos["preprocesamiento"] = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        embeds = self._codificar_imagen(pixel_values)
+        tiempos["encoder"] = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        self._generar_desde_embeds(embeds, self._config_generacion())
+        tiempos["generacion"] = time.perf_counter() - inicio
+        
+        if self.catalogo is not None:
+            inicio = time.perf_counter()
+            self.puntuar_catalogo(embeds)
+            tiempos["catalogo"] = time.perf_counter() - inicio
+        
+        self.reporte_calentamiento = {
+            "compilacion": self.modo_compilacion,
+            "backend": "onnx" if self.onnx else "torch",
+            "ms": {etapa: round(1000 * t, 1) for etapa, t in tiempos.items()},
+        }
+        print(f"🔥 Calentamiento: {self.reporte_calentamiento['ms']}")
+        return self.reporte_calentamiento
+    
+    @staticmethod
+    def _cuantizar_int8(model):
+        """
+        CUANTIZACIÓN INT8: Acelera 2-3x en CPU/Raspberry Pi
+        
+        Args:
+            model: Modelo BLIP en float32
+        
+        Returns:
+            Modelo con todas las capas nn.Linear cuantizadas a INT8
+        """
         print("⏳ Aplicando cuantización INT8...")
         try:
             # Usar la nueva API de cuantización (torch.ao)
@@ -154,10 +492,7 @@ class BlipEspanol:
                 dtype=torch.qint8
             )
             print("✅ Modelo cuantizado a INT8 (API legacy)")
-        
-        print("✅ Modelo BLIP cargado y optimizado")
-        
-        return cls(model, processor, device, image_size, num_threads)
+        return model
     
     def _corregir_texto(self, texto):
         """
@@ -213,8 +548,277 @@ class BlipEspanol:
         
         return texto_corregido
     
+    def _preparar_imagen(self, image):
+        """
+        Carga la imagen (si es path), la convierte a RGB y la reduce a image_size.
+        
+        Args:
+            image: PIL Image o path a la imagen
+        
+        Returns:
+            PIL.Image: Imagen lista para el processor
+        """
+        # OPTIMIZACIÓN: Decodificar/reducir directamente a image_size (JPEG
+        # en draft mode + BILINEAR). Si la imagen ya viene reducida y en RGB
+        # no se hace nada.
+        return decodificar_imagen(image, lado=self.image_size)
+    
+    def _criterio_titulo(self):
+        """StoppingCriteria que detiene la generación al emitir ':'."""
+        if self._ids_dos_puntos is None:
+            vocabulario = self.processor.tokenizer.get_vocab()
+            self._ids_dos_puntos = {i for token, i in vocabulario.items() if ':' in token}
+        return DetenerEnTokens(self._ids_dos_puntos)
+    
+    def _config_generacion(self, max_new_tokens=None, num_beams=None, **kwargs):
+        """Combina la configuración por defecto con parámetros personalizados."""
+        gen_config = self.generation_config.copy()
+        if max_new_tokens is not None:
+            gen_config["max_new_tokens"] = max_new_tokens
+        if num_beams is not None:
+            gen_config["num_beams"] = num_beams
+        gen_config.update(kwargs)
+        return gen_config
+    
+    def cargar_catalogo(self, entradas):
+        """
+        Tokeniza el catálogo de captions conocidos para los modos "catalog" e "hybrid".
+        
+        Cada caption se tokeniza igual que lo que produce generate(): el
+        primer token ([CLS]) se reemplaza por el BOS del decoder. La salida
+        de cada entrada es el caption decodificado y corregido, es decir,
+        exactamente lo que predict() devolvería si generara esa secuencia.
+        
+        Args:
+            entradas: Lista de dicts {carpeta, caption, sujeto} (ver blip/catalogo.py)
+        """
+        captions = [entrada["caption"] for entrada in entradas]
+        tokens = self.processor.tokenizer(captions, padding=True, return_tensors="pt")
+        input_ids = tokens.input_ids.clone()
+        input_ids[:, 0] = self.model.config.text_config.bos_token_id
+        
+        salidas = [
+            self._corregir_texto(
+                self.processor.tokenizer.decode(ids, skip_special_tokens=True).strip()
+            )
+            for ids in input_ids
+        ]
+        
+        # Trie sobre los tokens que genera el decoder (sin BOS ni padding)
+        longitudes = tokens.attention_mask.sum(-1).tolist()
+        trie = TrieCatalogo([
+            ids[1:longitud].tolist() for ids, longitud in zip(input_ids, longitudes)
+        ])
+        
+        # Índices de las entradas de cada sujeto (para verificar_sujeto)
+        grupos = {}
+        for indice, entrada in enumerate(entradas):
+            grupos.setdefault(clave_sujeto(entrada["sujeto"]), []).append(indice)
+        
+        self.catalogo = {
+            "entradas": entradas,
+            "salidas": salidas,
+            "input_ids": input_ids.to(self.device),
+            "attention_mask": tokens.attention_mask.to(self.device),
+            # Tokens puntuados de cada caption (sin el BOS), para promediar
+            "tokens": tokens.attention_mask[:, 1:].sum(-1).clamp(min=1).to(torch.float32),
+            "trie": trie,
+            "sujetos": list(grupos),
+            "grupos": [torch.tensor(indices) for indices in grupos.values()],
+        }
+        print(f"📚 Catálogo cargado: {len(entradas)} captions conocidos")
+    
+    def _pixel_values(self, images):
+        """Prepara y apila las imágenes en un tensor [N, 3, H, W]."""
+        imagenes = [self._preparar_imagen(image) for image in images]
+        if self.preprocesador is not None:
+            pixel_values = self.preprocesador(imagenes)
+        else:
+            pixel_values = self.processor(images=imagenes, return_tensors="pt")["pixel_values"]
+        return pixel_values.to(self.device, non_blocking=True)
+    
+    @torch.inference_mode()
+    def _codificar_imagen(self, pixel_values):
+        """Ejecuta el encoder de visión UNA vez: [N, 3, H, W] -> [N, P, D]."""
+        if self.onnx:
+            return self.model.codificar(pixel_values)
+        if self._encoder_compilado is not None and tuple(pixel_values.shape[1:]) == self._forma_compilada:
+            if self.modo_compilacion == "trace" or pixel_values.shape[0] == 1:
+                return self._encoder_compilado(pixel_values)
+            # torch.compile con forma fija: una imagen por llamada
+            return torch.cat([self._encoder_compilado(fila.unsqueeze(0)) for fila in pixel_values])
+        return self.model.vision_model(pixel_values=pixel_values)[0]
+    
+    @torch.inference_mode()
+    def _embeds_imagenes(self, images):
+        """
+        Salida del encoder de visión de cada imagen, reutilizando la cache de
+        embeddings (la misma foto suele pasar por /predict y /validar-reto).
+        
+        Solo las imágenes que no están en cache se preprocesan y se codifican,
+        todas juntas en un solo lote.
+        
+        Returns:
+            torch.Tensor: image_embeds [N, P, D] en el orden de `images`
+        """
+        imagenes = [self._preparar_imagen(image) for image in images]
+        cache = get_cache_embeddings()
+        if cache is None:
+            return self._codificar_imagen(self._pixel_values(imagenes))
+        
+        identificador = self.model_path or f"blip-{id(self)}"
+        claves = [cache.clave(identificador, imagen) for imagen in imagenes]
+        embeds = [cache.obtener(clave) for clave in claves]
+        
+        faltantes = [i for i, embed in enumerate(embeds) if embed is None]
+        if faltantes:
+            nuevos = self._codificar_imagen(self._pixel_values([imagenes[i] for i in faltantes]))
+            for j, i in enumerate(faltantes):
+                # clone(): no retener en cache todo el tensor del lote por una vista
+                embeds[i] = nuevos[j:j + 1] if len(faltantes) == 1 else nuevos[j:j + 1].clone()
+                cache.guardar(claves[i], embeds[i])
+        
+        return embeds[0] if len(embeds) == 1 else torch.cat(embeds)
+    
     @torch.inference_mode()
-    def predict(self, image, max_new_tokens=None, num_beams=None, **kwargs):
+    def _generar_desde_embeds(self, image_embeds, gen_config):
+        """
+        Equivalente a BlipForConditionalGeneration.generate() pero partiendo de
+        la salida del encoder de visión (para no volver a calcularla).
+        
+        Returns:
+            torch.Tensor: Secuencias generadas [N, T]
+        """
+        if self.onnx:
+            return self.model.generar(image_embeds, gen_config)
+        
+        config = self.model.config.text_config
+        mascara_imagen = torch.ones(image_embeds.shape[:-1], dtype=torch.long, device=image_embeds.device)
+        input_ids = torch.full(
+            (image_embeds.shape[0], 1), config.bos_token_id,
+            dtype=torch.long, device=image_embeds.device
+        )
+        return self.model.text_decoder.generate(
+            input_ids=input_ids,
+            eos_token_id=config.sep_token_id,
+            pad_token_id=config.pad_token_id,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=mascara_imagen,
+            **gen_config
+        )
+    
+    @torch.inference_mode()
+    def _log_verosimilitudes(self, image_embeds, input_ids, attention_mask, trozo=8):
+        """
+        log P(secuencia | imagen) de N secuencias para UNA imagen, con una sola
+        pasada teacher-forced del decoder (todas las secuencias en lote).
+        
+        Args:
+            image_embeds: Salida del encoder de visión [1, P, D]
+            input_ids: Secuencias tokenizadas [N, T] (empiezan con BOS)
+            attention_mask: Máscara de padding [N, T]
+            trozo: Filas por bloque al proyectar al vocabulario (acota la RAM:
+                   los logits completos serían N x T x 30k floats)
+        
+        Returns:
+            torch.Tensor: Log-verosimilitud total de cada secuencia [N]
+        """
+        if self.onnx:
+            return self.model.log_verosimilitudes(image_embeds, input_ids, attention_mask, trozo)
+        
+        n = input_ids.shape[0]
+        embeds = image_embeds.expand(n, -1, -1)
+        mascara_imagen = torch.ones(embeds.shape[:-1], dtype=torch.long, device=embeds.device)
+        
+        decoder = self.model.text_decoder
+        ocultos = decoder.bert(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            encoder_hidden_states=embeds,
+            encoder_attention_mask=mascara_imagen,
+            is_decoder=True,
+            return_dict=True,
+        ).last_hidden_state
+        
+        # El token t se predice con el estado oculto t-1 (incluye el [SEP] final)
+        objetivos = input_ids[:, 1:]
+        mascara = attention_mask[:, 1:].to(torch.float32)
+        
+        total = torch.empty(n, dtype=torch.float32)
+        for ini in range(0, n, trozo):
+            fin = ini + trozo
+            logits = decoder.cls(ocultos[ini:fin, :-1]).float()
+            log_probs = logits.log_softmax(-1).gather(-1, objetivos[ini:fin].unsqueeze(-1)).squeeze(-1)
+            total[ini:fin] = (log_probs * mascara[ini:fin]).sum(-1).cpu()
+        return total
+    
+    @torch.inference_mode()
+    def puntuar_catalogo(self, image_embeds):
+        """
+        Log-probabilidad media por token de cada caption del catálogo para una imagen.
+        
+        La suma de log-probabilidades crece con el largo del caption (el
+        catálogo va de ~15 a ~40 palabras): entre captions difiere en decenas
+        de nats y favorece a los cortos. El promedio por token los deja en la
+        misma escala.
+        
+        Args:
+            image_embeds: Salida del encoder de visión de UNA imagen [1, P, D]
+        
+        Returns:
+            torch.Tensor: [N] en el orden de self.catalogo["entradas"]
+        """
+        if self.catalogo is None:
+            raise ValueError("No hay catálogo cargado (usa cargar_catalogo())")
+        totales = self._log_verosimilitudes(
+            image_embeds,
+            self.catalogo["input_ids"],
+            self.catalogo["attention_mask"]
+        )
+        return totales / self.catalogo["tokens"]
+    
+    def confianzas_catalogo(self, puntajes):
+        """
+        Probabilidad de cada caption del catálogo: softmax de los puntajes de
+        puntuar_catalogo() divididos por BLIP_CATALOGO_TEMPERATURA (calibrada
+        con calibrar_catalogo.py).
+        
+        Returns:
+            torch.Tensor: [N] que suma 1
+        """
+        return (puntajes / self.temperatura_catalogo).softmax(-1)
+    
+    @torch.inference_mode()
+    def probabilidades_sujetos(self, image):
+        """
+        P(sujeto | imagen) para cada sujeto del catálogo con UNA pasada del
+        encoder de visión y UNA pasada teacher-forced del decoder.
+        
+        La probabilidad de un sujeto es la suma de las confianzas calibradas
+        (confianzas_catalogo) de sus captions.
+        
+        Args:
+            image: PIL Image o path a la imagen
+        
+        Returns:
+            tuple: (dict {clave_sujeto: probabilidad}, índice de la entrada más probable)
+        """
+        if self.catalogo is None:
+            raise ValueError("No hay catálogo cargado (usa cargar_catalogo())")
+        
+        image_embeds = self._embeds_imagenes([image])
+        confianzas = self.confianzas_catalogo(self.puntuar_catalogo(image_embeds))
+        
+        probabilidades = [
+            confianzas[indices].sum().item() for indices in self.catalogo["grupos"]
+        ]
+        return (
+            dict(zip(self.catalogo["sujetos"], probabilidades)),
+            int(confianzas.argmax())
+        )
+    
+    @torch.inference_mode()
+    def predict(self, image, max_new_tokens=None, num_beams=None, mode="full", **kwargs):
         """
         Genera caption para una imagen CON corrección automática.
         
@@ -225,46 +829,128 @@ class BlipEspanol:
             image: PIL Image o path a la imagen
             max_new_tokens: Máximo de tokens (default: configuración interna)
             num_beams: Tamaño de beam search (default: configuración interna)
+            mode: "full" (caption completo), "title" (solo el título, se
+                  detiene al generar ':'), "catalog" (caption conocido más
+                  probable) o "hybrid" (genera hasta identificar un caption
+                  conocido y lo completa)
             **kwargs: Otros parámetros para generate()
         
         Returns:
-            str: Caption corregido ortográficamente en español
+            str: Caption (o título) corregido ortográficamente en español
+        """
+        return self.predict_batch(
+            [image], max_new_tokens=max_new_tokens, num_beams=num_beams, mode=mode, **kwargs
+        )[0]
+    
+    @torch.inference_mode()
+    def predict_batch(self, images, max_new_tokens=None, num_beams=None, mode="full", **kwargs):
         """
-        # Si es path, cargar imagen
-        if isinstance(image, str):
-            image = Image.open(image)
+        Genera captions para varias imágenes en lote (ver predict_batch_detallado).
         
-        # Conversión RGB solo si es necesario
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+        Returns:
+            list[str]: Captions corregidos, en el mismo orden que `images`
+        """
+        resultados = self.predict_batch_detallado(
+            images, max_new_tokens=max_new_tokens, num_beams=num_beams, mode=mode, **kwargs
+        )
+        return [resultado["caption"] for resultado in resultados]
+    
+    @torch.inference_mode()
+    def predict_batch_detallado(self, images, max_new_tokens=None, num_beams=None, mode="full", **kwargs):
+        """
+        Genera captions para varias imágenes con UNA sola pasada del encoder de visión.
         
-        # OPTIMIZACIÓN: Resize para reducir procesamiento
-        if max(image.size) > self.image_size:
-            image.thumbnail((self.image_size, self.image_size), Image.Resampling.LANCZOS)
+        El processor apila los pixel_values en un tensor [N, 3, H, W], se
+        decodifica el lote completo y cada resultado se corrige por separado.
         
-        # Procesar imagen
-        inputs = self.processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(self.device, non_blocking=True) for k, v in inputs.items()}
+        En modo "catalog" cada imagen se compara contra todos los captions del
+        catálogo con una pasada teacher-forced del decoder; solo las imágenes
+        con confianza menor a BLIP_CATALOGO_UMBRAL se generan libremente.
         
-        # Combinar configuración por defecto con parámetros personalizados
-        gen_config = self.generation_config.copy()
-        if max_new_tokens is not None:
-            gen_config["max_new_tokens"] = max_new_tokens
-        if num_beams is not None:
-            gen_config["num_beams"] = num_beams
-        gen_config.update(kwargs)
+        En modo "hybrid" se genera libremente, pero cada secuencia se detiene
+        en cuanto su prefijo identifica una única entrada del catálogo y se
+        emite el caption guardado (la cola plantilla "aquí se puede ver ...,
+        porque ..." no se decodifica).
         
-        # Generar caption
-        with torch.no_grad():
-            out = self.model.generate(**inputs, **gen_config)
+        Args:
+            images: Lista de PIL Images o paths
+            max_new_tokens: Máximo de tokens (default: configuración interna)
+            num_beams: Tamaño de beam search (default: configuración interna)
+            mode: "full", "title", "catalog" o "hybrid" (ver predict())
+            **kwargs: Otros parámetros para generate()
+        
+        Returns:
+            list[dict]: Por imagen {caption, camino, confianza}, donde camino es
+            "generacion", "catalogo" o "hibrido" y confianza la probabilidad
+            del mejor caption del catálogo (None si no se calculó)
+        """
+        if mode not in MODOS_PREDICCION:
+            raise ValueError(f"Modo no soportado: {mode}. Usa uno de {MODOS_PREDICCION}")
+        if mode in ("catalog", "hybrid") and self.catalogo is None:
+            raise ValueError(f"El modo '{mode}' requiere un catálogo cargado (usa cargar_catalogo())")
+        
+        if mode == "title":
+            # Detener en ':' en vez de decodificar hasta 100 tokens
+            kwargs.setdefault("stopping_criteria", StoppingCriteriaList([self._criterio_titulo()]))
+            kwargs.setdefault("min_new_tokens", 1)
+            if max_new_tokens is None:
+                max_new_tokens = self.max_tokens_titulo
+        
+        completar = None
+        if mode == "hybrid":
+            completar = CompletarDesdeCatalogo(self.catalogo["trie"])
+            kwargs.setdefault("stopping_criteria", StoppingCriteriaList([completar]))
+        
+        # Encoder de visión: una sola vez para todo el lote (o desde la cache)
+        image_embeds = self._embeds_imagenes(images)
         
-        # Decodificar
-        caption_raw = self.processor.decode(out[0], skip_special_tokens=True).strip()
+        resultados = [None] * len(images)
+        pendientes = list(range(len(images)))
+        confianzas = {}
         
-        # ✅ CORRECCIÓN AUTOMÁTICA (se hace internamente)
-        caption_corregido = self._corregir_texto(caption_raw)
+        if mode == "catalog":
+            pendientes = []
+            for i in range(len(images)):
+                probabilidades = self.confianzas_catalogo(self.puntuar_catalogo(image_embeds[i:i + 1]))
+                confianza, mejor = probabilidades.max(-1)
+                confianzas[i] = round(confianza.item(), 4)
+                if confianzas[i] >= self.umbral_catalogo:
+                    resultados[i] = {
+                        "caption": self.catalogo["salidas"][mejor.item()],
+                        "camino": "catalogo",
+                        "confianza": confianzas[i],
+                    }
+                else:
+                    pendientes.append(i)
+        
+        if pendientes:
+            gen_config = self._config_generacion(max_new_tokens, num_beams, **kwargs)
+            
+            # Generar captions (solo las imágenes que lo necesitan)
+            out = self._generar_desde_embeds(image_embeds[pendientes], gen_config)
+            
+            # Decodificar
+            captions_raw = self.processor.batch_decode(out, skip_special_tokens=True)
+            
+            if mode == "title":
+                captions_raw = [extraer_titulo(caption) for caption in captions_raw]
+            
+            # ✅ CORRECCIÓN AUTOMÁTICA (se hace internamente)
+            for fila, (i, caption) in enumerate(zip(pendientes, captions_raw)):
+                if completar is not None and fila in completar.coincidencias:
+                    resultados[i] = {
+                        "caption": self.catalogo["salidas"][completar.coincidencias[fila]],
+                        "camino": "hibrido",
+                        "confianza": None,
+                    }
+                    continue
+                resultados[i] = {
+                    "caption": self._corregir_texto(caption.strip()),
+                    "camino": "generacion",
+                    "confianza": confianzas.get(i),
+                }
         
-        return caption_corregido
+        return resultados
     
     def generate_caption(self, image):
         """
@@ -294,12 +980,239 @@ class BlipEspanol:
         return self
 
 
+# ============================================
+# 📦 Micro-batching de peticiones concurrentes
+# ============================================
+
+class _PeticionLote:
+    """Una imagen en espera de ser procesada dentro de un lote."""
+    
+    __slots__ = ("imagen", "kwargs", "clave", "futuro")
+    
+    def __init__(self, imagen, kwargs):
+        self.imagen = imagen
+        self.kwargs = kwargs
+        # Solo se agrupan peticiones con la misma configuración de generación
+        self.clave = tuple(sorted(kwargs.items()))
+        self.futuro = Future()
+
+
+class PlanificadorLotes:
+    """
+    Agrupa peticiones concurrentes en lotes para BlipEspanol.predict_batch_detallado().
+    
+    En el aula llegan ráfagas de 10-30 fotos en pocos segundos. En vez de
+    correr generate() con batch 1 para cada una, un hilo dedicado junta las
+    peticiones durante `ventana_ms` (o hasta `max_lote` imágenes), ejecuta
+    UNA sola generación y reparte cada caption al futuro de su llamador.
+    
+    Uso:
+        planificador = PlanificadorLotes(modelo, ventana_ms=25, max_lote=8)
+        caption = planificador.predict(imagen)  # bloquea hasta tener el resultado
+    """
+    
+    def __init__(self, generador, ventana_ms=25, max_lote=8):
+        """
+        Args:
+            generador: Instancia de BlipEspanol
+            ventana_ms: Tiempo máximo de espera para completar un lote
+            max_lote: Máximo de imágenes por lote
+        """
+        self.generador = generador
+        self.ventana = ventana_ms / 1000.0
+        self.max_lote = max(1, max_lote)
+        
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(
+            target=self._bucle,
+            name="blip-lotes",
+            daemon=True
+        )
+        self._hilo.start()
+        
+        # Métricas
+        self._lotes = 0
+        self._imagenes = 0
+        self._max_observado = 0
+        self._reintentos_individuales = 0
+    
+    def enviar(self, image, **kwargs):
+        """
+        Encola una imagen y devuelve un Future con su caption.
+        
+        Args:
+            image: PIL Image o path a la imagen
+            **kwargs: Parámetros de generación (deben ser hashables)
+        
+        Returns:
+            concurrent.futures.Future: Se resuelve con el dict
+            {caption, camino, confianza} de predict_batch_detallado()
+        """
+        peticion = _PeticionLote(image, kwargs)
+        self._cola.put(peticion)
+        return peticion.futuro
+    
+    def predict(self, image, **kwargs):
+        """Encola la imagen y espera su caption (bloqueante)."""
+        return self.predict_detallado(image, **kwargs)["caption"]
+    
+    def predict_detallado(self, image, **kwargs):
+        """Encola la imagen y espera su resultado detallado (bloqueante)."""
+        return self.enviar(image, **kwargs).result()
+    
+    def _bucle(self):
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.ventana
+            
+            # Juntar peticiones hasta llenar el lote o agotar la ventana
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            
+            grupos = {}
+            for peticion in lote:
+                grupos.setdefault(peticion.clave, []).append(peticion)
+            
+            for grupo in grupos.values():
+                self._ejecutar(grupo)
+    
+    def _ejecutar(self, grupo):
+        # Descartar peticiones canceladas mientras esperaban
+        vivas = [p for p in grupo if p.futuro.set_running_or_notify_cancel()]
+        if not vivas:
+            return
+        
+        try:
+            resultados = self.generador.predict_batch_detallado(
+                [p.imagen for p in vivas],
+                **vivas[0].kwargs
+            )
+        except Exception as e:
+            if len(vivas) == 1:
+                vivas[0].futuro.set_exception(e)
+                return
+            # Una imagen problemática (modo/tamaño raro, OOM) no debe tumbar
+            # al resto del lote: se reintenta cada petición por separado
+            print(f"⚠️ Lote de {len(vivas)} falló ({e}); reintentando una por una")
+            self._ejecutar_individual(vivas)
+            return
+        
+        self._lotes += 1
+        self._imagenes += len(vivas)
+        self._max_observado = max(self._max_observado, len(vivas))
+        
+        for peticion, resultado in zip(vivas, resultados):
+            peticion.futuro.set_result(resultado)
+    
+    def _ejecutar_individual(self, peticiones):
+        """Genera cada petición sola; el error queda solo en la que falla."""
+        for peticion in peticiones:
+            try:
+                resultado = self.generador.predict_batch_detallado(
+                    [peticion.imagen], **peticion.kwargs
+                )[0]
+            except Exception as e:
+                peticion.futuro.set_exception(e)
+                continue
+            self._lotes += 1
+            self._imagenes += 1
+            self._reintentos_individuales += 1
+            peticion.futuro.set_result(resultado)
+    
+    def stats(self):
+        """Métricas del planificador."""
+        return {
+            "ventana_ms": round(self.ventana * 1000),
+            "max_lote": self.max_lote,
+            "lotes": self._lotes,
+            "imagenes": self._imagenes,
+            "lote_promedio": round(self._imagenes / self._lotes, 2) if self._lotes else 0.0,
+            "lote_maximo": self._max_observado,
+            "reintentos_individuales": self._reintentos_individuales,
+            "en_cola": self._cola.qsize(),
+        }
+
+
 # ============================================
 # 🌍 API Global (compatibilidad con código existente)
 # ============================================
 
 _global_generator = None
 _global_characteristics_generator = None
+_global_generator_lock = threading.Lock()
+_global_characteristics_generator_lock = threading.Lock()
+
+# El banner se imprime al crear el primer modelo global, no al importar el
+# módulo (importar blip.generation no debe tener efectos visibles)
+_banner_impreso = False
+
+def _imprimir_banner():
+    global _banner_impreso
+    if _banner_impreso:
+        return
+    _banner_impreso = True
+    print("✅ Módulo BlipEspanol cargado correctamente")
+    print("💡 Corrector ortográfico integrado automáticamente")
+    print("🎯 Soporte para modelo original y modelo de características")
+
+# Reporte de pesos compartidos entre ambos modelos (None hasta que estén los dos)
+_reporte_pesos_compartidos = None
+_pesos_compartidos_lock = threading.Lock()
+
+def _compartir_pesos_globales():
+    """
+    Cuando ambos modelos globales están cargados, el de características
+    reutiliza los tensores idénticos del modelo original.
+    
+    Configuración desde .env:
+        BLIP_SHARE_WEIGHTS: 1/0 para activar o desactivar (default: 1)
+    """
+    global _reporte_pesos_compartidos
+    if os.getenv('BLIP_SHARE_WEIGHTS', '1') != '1':
+        return
+    if _global_generator is None or _global_characteristics_generator is None:
+        return
+    if _global_generator.onnx or _global_characteristics_generator.onnx:
+        # Los pesos viven dentro de las sesiones de onnxruntime
+        return
+    
+    with _pesos_compartidos_lock:
+        if _reporte_pesos_compartidos is not None:
+            return
+        print("🧬 Buscando pesos idénticos entre ambos modelos BLIP...")
+        try:
+            _reporte_pesos_compartidos = compartir_entre_generadores(
+                _global_generator,
+                _global_characteristics_generator
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudieron compartir pesos: {e}")
+            _reporte_pesos_compartidos = {"error": str(e)}
+            return
+        print(
+            f"✅ {_reporte_pesos_compartidos['tensores_compartidos']} tensores compartidos, "
+            f"{_reporte_pesos_compartidos['mb_liberados']} MB liberados"
+        )
+
+def get_reporte_pesos_compartidos():
+    """Reporte de memoria ahorrada al compartir pesos (para /stats)."""
+    return _reporte_pesos_compartidos
+
+def get_reportes_calentamiento():
+    """Latencias del calentamiento de cada modelo global cargado (para /stats)."""
+    return {
+        "original": _global_generator.reporte_calentamiento if _global_generator else None,
+        "caracteristicas": (
+            _global_characteristics_generator.reporte_calentamiento
+            if _global_characteristics_generator else None
+        ),
+    }
 
 def get_global_generator():
     """
@@ -313,10 +1226,17 @@ def get_global_generator():
     """
     global _global_generator
     if _global_generator is None:
-        print("🚀 Inicializando BlipEspanol global (modelo original)...")
-        # Cargar desde .env automáticamente
-        _global_generator = BlipEspanol.from_pretrained()
-        print("✅ BlipEspanol inicializado correctamente")
+        with _global_generator_lock:
+            if _global_generator is None:
+                _imprimir_banner()
+                print("🚀 Inicializando BlipEspanol global (modelo original)...")
+                # Cargar desde .env automáticamente
+                generador = BlipEspanol.from_pretrained()
+                # Los captions conocidos son del modelo original (no del de características)
+                generador.cargar_catalogo(obtener_catalogo())
+                _global_generator = generador
+                print("✅ BlipEspanol inicializado correctamente")
+        _compartir_pesos_globales()
     return _global_generator
 
 def get_global_characteristics_generator():
@@ -331,25 +1251,124 @@ def get_global_characteristics_generator():
     """
     global _global_characteristics_generator
     if _global_characteristics_generator is None:
-        print("🚀 Inicializando BlipEspanol global (modelo de características)...")
-        
-        # Cargar configuración desde .env
-        characteristics_model_path = os.getenv('BLIP_MODEL_CARACTERISTICAS_PATH', 'blip-characteristics')
-        device = os.getenv('BLIP_DEVICE', 'cpu')
-        image_size = int(os.getenv('BLIP_IMAGE_SIZE', '384'))
-        num_threads = int(os.getenv('BLIP_NUM_THREADS', '4'))
-        
-        # Cargar modelo de características
-        _global_characteristics_generator = BlipEspanol.from_pretrained(
-            model_path=characteristics_model_path,
-            device=device,
-            image_size=image_size,
-            num_threads=num_threads
-        )
-        print("✅ BlipEspanol de características inicializado correctamente")
+        with _global_characteristics_generator_lock:
+            if _global_characteristics_generator is None:
+                _imprimir_banner()
+                print("🚀 Inicializando BlipEspanol global (modelo de características)...")
+                
+                # Cargar configuración desde .env
+                characteristics_model_path = os.getenv('BLIP_MODEL_CARACTERISTICAS_PATH', 'blip-characteristics')
+                device = os.getenv('BLIP_DEVICE', 'cpu')
+                image_size = int(os.getenv('BLIP_IMAGE_SIZE', '384'))
+                num_threads = int(os.getenv('BLIP_NUM_THREADS', '4'))
+                
+                # Cargar modelo de características
+                _global_characteristics_generator = BlipEspanol.from_pretrained(
+                    model_path=characteristics_model_path,
+                    device=device,
+                    image_size=image_size,
+                    num_threads=num_threads
+                )
+                print("✅ BlipEspanol de características inicializado correctamente")
+        _compartir_pesos_globales()
     return _global_characteristics_generator
 
-def quick_generate(image: Image.Image) -> str:
+_planificadores = {}
+_planificadores_lock = threading.Lock()
+
+def get_planificador(generador):
+    """
+    Obtiene el planificador de lotes asociado a un generador.
+    
+    Configuración desde .env:
+        BLIP_BATCH_WINDOW_MS: Ventana de espera para formar un lote (default: 25)
+        BLIP_BATCH_MAX_SIZE: Máximo de imágenes por lote (default: 8, 1 = sin batching)
+    
+    Args:
+        generador: Instancia de BlipEspanol
+    
+    Returns:
+        PlanificadorLotes o None si el batching está deshabilitado
+    """
+    max_lote = int(os.getenv('BLIP_BATCH_MAX_SIZE', '8'))
+    if max_lote <= 1:
+        return None
+    
+    with _planificadores_lock:
+        planificador = _planificadores.get(id(generador))
+        if planificador is None:
+            planificador = PlanificadorLotes(
+                generador,
+                ventana_ms=float(os.getenv('BLIP_BATCH_WINDOW_MS', '25')),
+                max_lote=max_lote
+            )
+            _planificadores[id(generador)] = planificador
+        return planificador
+
+def get_planificadores_stats():
+    """Métricas de todos los planificadores de lotes activos."""
+    with _planificadores_lock:
+        planificadores = list(_planificadores.values())
+    return [
+        dict(planificador.stats(), model_path=planificador.generador.model_path)
+        for planificador in planificadores
+    ]
+
+def _generar(generador, image, tipo, mode="full"):
+    """
+    Genera el caption consultando primero la cache exacta, luego el índice
+    perceptual de imágenes casi idénticas, y pasando por el planificador de
+    lotes si está activo.
+    
+    Args:
+        generador: Instancia de BlipEspanol
+        image: PIL Image o path a la imagen
+        tipo: "caption" o "caracteristicas" (separa las entradas de cache)
+        mode: Modo de predicción (ver BlipEspanol.predict)
+    
+    Returns:
+        dict: {caption, camino, confianza}; camino es "cache", "duplicado" o
+        el de BlipEspanol.predict_batch_detallado()
+    """
+    if isinstance(image, str):
+        image = decodificar_imagen(image, lado=generador.image_size)
+    
+    # Cada modo tiene sus propias entradas de cache
+    if mode != "full":
+        tipo = f"{tipo}-{mode}"
+    
+    cache = get_cache_captions()
+    clave = None
+    if cache is not None:
+        clave = cache.clave(image, tipo, generador.model_path, generador.generation_config)
+        caption = cache.obtener(clave)
+        if caption is not None:
+            return {"caption": caption, "camino": "cache", "confianza": None}
+    
+    indice = get_indice_perceptual(tipo, generador.model_path)
+    hash_perceptual = None
+    resultado = None
+    if indice is not None:
+        hash_perceptual = dhash(image)
+        caption = indice.buscar(hash_perceptual)
+        if caption is not None:
+            resultado = {"caption": caption, "camino": "duplicado", "confianza": None}
+    
+    if resultado is None:
+        planificador = get_planificador(generador)
+        if planificador is None:
+            resultado = generador.predict_batch_detallado([image], mode=mode)[0]
+        else:
+            resultado = planificador.predict_detallado(image, mode=mode)
+        
+        if indice is not None:
+            indice.agregar(hash_perceptual, resultado["caption"])
+    
+    if cache is not None:
+        cache.guardar(clave, resultado["caption"])
+    return resultado
+
+def quick_generate(image: Image.Image, mode: str = "full") -> str:
     """
     Genera caption rápidamente usando la instancia global del modelo original.
     
@@ -358,11 +1377,76 @@ def quick_generate(image: Image.Image) -> str:
     
     Args:
         image: Imagen PIL
+        mode: "full" (caption completo), "title" (solo el título),
+              "catalog" (caption conocido más probable) o "hybrid"
+              (completa desde el catálogo en cuanto identifica el caption)
     
     Returns:
         str: Caption corregido en español
     """
-    return get_global_generator().generate_caption(image)
+    return quick_generate_detallado(image, mode=mode)["caption"]
+
+def quick_generate_detallado(image: Image.Image, mode: str = "full") -> dict:
+    """
+    Igual que quick_generate() pero indica cómo se obtuvo el caption.
+    
+    Returns:
+        dict: {caption, camino, confianza} (ver _generar)
+    """
+    return _generar(get_global_generator(), image, "caption", mode=mode)
+
+def quick_verificar_sujeto(image: Image.Image, sujeto_solicitado: str):
+    """
+    Verifica si la imagen corresponde al sujeto solicitado puntuando el
+    catálogo (sin generar texto).
+    
+    Solo decide cuando la probabilidad calibrada de un sujeto (ver
+    BlipEspanol.probabilidades_sujetos) supera BLIP_VERIFICACION_UMBRAL; si
+    el resultado es ambiguo, o el sujeto no está en el catálogo, devuelve
+    None y el llamador debe usar la generación libre.
+    
+    Configuración desde .env:
+        BLIP_VERIFICACION_ENABLED: 1/0 para activar o desactivar (default: 0,
+            hasta calibrar BLIP_CATALOGO_TEMPERATURA y el umbral con
+            calibrar_catalogo.py)
+        BLIP_VERIFICACION_UMBRAL: Probabilidad mínima del sujeto ganador (default: 0.8)
+    
+    Args:
+        image: Imagen PIL
+        sujeto_solicitado: Sujeto pedido al niño (ej: "caballo")
+    
+    Returns:
+        dict {es_correcto, sujeto_detectado, probabilidad, confianza, descripcion}
+        o None si hay que generar libremente. `probabilidad` es P(sujeto
+        solicitado) y `confianza` la probabilidad del sujeto ganador.
+    """
+    if os.getenv('BLIP_VERIFICACION_ENABLED', '0') != '1':
+        return None
+    
+    generador = get_global_generator()
+    if generador.catalogo is None:
+        return None
+    
+    objetivo = clave_sujeto(sujeto_solicitado)
+    if objetivo not in generador.catalogo["sujetos"]:
+        print(f"   ℹ️ '{sujeto_solicitado}' no está en el catálogo, se usa generación libre")
+        return None
+    
+    probabilidades, mejor_entrada = generador.probabilidades_sujetos(image)
+    ganador = max(probabilidades, key=probabilidades.get)
+    umbral = float(os.getenv('BLIP_VERIFICACION_UMBRAL', '0.8'))
+    
+    if probabilidades[ganador] < umbral:
+        print(f"   ⚖️ Verificación ambigua ({ganador}: {probabilidades[ganador]:.3f}), se usa generación libre")
+        return None
+    
+    return {
+        "es_correcto": ganador == objetivo,
+        "sujeto_detectado": generador.catalogo["entradas"][mejor_entrada]["sujeto"],
+        "probabilidad": probabilidades[objetivo],
+        "confianza": probabilidades[ganador],
+        "descripcion": generador.catalogo["salidas"][mejor_entrada],
+    }
 
 def quick_generate_characteristics(image: Image.Image) -> str:
     """
@@ -380,10 +1464,6 @@ def quick_generate_characteristics(image: Image.Image) -> str:
     Returns:
         str: Descripción en formato "nombre, característica1, característica2, ..."
     """
-    return get_global_characteristics_generator().generate_caption(image)
-
+    return _generar(get_global_characteristics_generator(), image, "caracteristicas")["caption"]
 
-print("✅ Módulo BlipEspanol cargado correctamente")
-print("💡 Corrector ortográfico integrado automáticamente")
-print("🎯 Soporte para modelo original y modelo de características")
 
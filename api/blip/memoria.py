@@ -0,0 +1,33 @@
+"""
+Memoria residente (RSS) del proceso, sin dependencias pesadas.
+
+La usan blip/pesos.py (memoria liberada al compartir pesos) y
+registro_modelos.py (RSS al cargar cada modelo). No importa torch, y
+`import blip` es perezoso (blip/__init__.py), así que importar este módulo
+desde fuera del paquete tampoco carga torch.
+
+Uso:
+    from blip.memoria import memoria_residente_bytes
+    rss = memoria_residente_bytes()  # None si no se puede medir
+"""
+
+import os
+
+
+def memoria_residente_bytes():
+    """
+    Memoria residente (RSS) actual del proceso en bytes.
+
+    Returns:
+        int o None si no se puede medir en este sistema
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
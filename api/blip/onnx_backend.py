@@ -0,0 +1,438 @@
+"""
+============================================
+⚙️ Backend ONNX Runtime para BlipEspanol
+============================================
+
+Con BLIP_BACKEND=onnx, BlipEspanol ejecuta el encoder de visión y el
+decoder de texto con onnxruntime (CPUExecutionProvider) en lugar de
+PyTorch. onnxruntime fusiona atención/LayerNorm/GELU (ORT_ENABLE_ALL) y usa
+kernels INT8 propios, lo que en CPU (y Raspberry Pi) suele ser más rápido
+que quantize_dynamic de torch.
+
+El export se hace una sola vez por checkpoint y queda en BLIP_ONNX_DIR:
+- vision.onnx / vision_int8.onnx    -> pixel_values [N,3,H,W] -> image_embeds [N,P,D]
+- decoder.onnx / decoder_int8.onnx  -> un paso del decoder con KV cache:
+      input_ids [N,T], attention_mask [N,pasado+T], encoder_hidden_states,
+      past.{capa}.key/value [N,cabezas,pasado,dim]
+      -> logits [N,T,V], present.{capa}.key/value [N,cabezas,pasado+T,dim]
+  El primer paso (y el puntaje teacher-forced del catálogo) usa un pasado
+  de longitud 0, así un solo grafo sirve para todo.
+- config.json + processor           -> para no depender del checkpoint al servir
+- onnx_manifest.json                -> huella del checkpoint (blip/artefacto.py)
+
+Solo se soporta decodificación greedy (la que usa la API): num_beams > 1 o
+do_sample lanzan ValueError.
+
+Configuración desde .env:
+    BLIP_BACKEND: torch (default) u onnx
+    BLIP_ONNX_DIR: Carpeta de los modelos exportados (default: blip-onnx)
+    BLIP_ONNX_INT8: 1/0 para usar los pesos INT8 o float32 (default: 1)
+
+Exportar a mano (también se exporta solo al arrancar si falta):
+    python exportar_onnx.py blip-final-5
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+
+from .artefacto import huella_checkpoint, ruta_artefacto
+
+VERSION_FORMATO = 1
+OPSET = 17
+ARCHIVO_VISION = "vision.onnx"
+ARCHIVO_DECODER = "decoder.onnx"
+ARCHIVO_MANIFEST = "onnx_manifest.json"
+
+
+def backend_configurado():
+    """Backend de inferencia pedido en BLIP_BACKEND ("torch" u "onnx")."""
+    return os.getenv('BLIP_BACKEND', 'torch').strip().lower()
+
+
+def ruta_onnx(model_path):
+    """Carpeta del export ONNX de un checkpoint (mismo nombre que su artefacto INT8)."""
+    base = os.getenv('BLIP_ONNX_DIR', 'blip-onnx')
+    return os.path.join(base, os.path.basename(ruta_artefacto(model_path)))
+
+
+def _con_sufijo_int8(archivo):
+    nombre, extension = os.path.splitext(archivo)
+    return f"{nombre}_int8{extension}"
+
+
+def _nombres_cache(num_capas, prefijo):
+    return [f"{prefijo}.{capa}.{tipo}" for capa in range(num_capas) for tipo in ("key", "value")]
+
+
+# ============================================
+# 📤 Export
+# ============================================
+
+class EncoderVision(torch.nn.Module):
+    """vision_model de BLIP devolviendo solo last_hidden_state."""
+
+    def __init__(self, vision_model):
+        super().__init__()
+        self.vision_model = vision_model
+
+    def forward(self, pixel_values):
+        return self.vision_model(pixel_values=pixel_values, return_dict=True).last_hidden_state
+
+
+class _DecoderConCache(torch.nn.Module):
+    """
+    text_decoder de BLIP con la KV cache aplanada en tensores sueltos
+    (ONNX no admite tuplas anidadas como entradas/salidas).
+    """
+
+    def __init__(self, text_decoder, num_capas):
+        super().__init__()
+        self.text_decoder = text_decoder
+        self.num_capas = num_capas
+
+    def forward(self, input_ids, attention_mask, encoder_hidden_states, *pasado):
+        past_key_values = tuple(
+            (pasado[2 * capa], pasado[2 * capa + 1]) for capa in range(self.num_capas)
+        )
+        salida = self.text_decoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            encoder_hidden_states=encoder_hidden_states,
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+        presentes = [tensor for capa in salida.past_key_values for tensor in capa]
+        return (salida.logits, *presentes)
+
+
+def exportar_onnx(model_path, destino=None, int8=True):
+    """
+    Exporta un checkpoint BLIP (float32) a ONNX y, opcionalmente, a INT8.
+
+    Se escribe en una carpeta temporal y se renombra al final (igual que el
+    artefacto INT8) para no dejar nunca un export a medias.
+
+    Args:
+        model_path: Carpeta del checkpoint fine-tuneado
+        destino: Carpeta de salida (default: ruta_onnx(model_path))
+        int8: Generar también las versiones con pesos INT8
+
+    Returns:
+        str: Carpeta con los modelos exportados
+    """
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+    destino = destino or ruta_onnx(model_path)
+    padre = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(padre, exist_ok=True)
+
+    print(f"📤 Exportando {model_path} a ONNX...")
+    processor = BlipProcessor.from_pretrained(model_path)
+    model = BlipForConditionalGeneration.from_pretrained(model_path, torch_dtype=torch.float32)
+    model.eval()
+
+    config = model.config
+    texto = config.text_config
+    num_capas = texto.num_hidden_layers
+    num_cabezas = texto.num_attention_heads
+    dim_cabeza = texto.hidden_size // num_cabezas
+    lado = config.vision_config.image_size
+
+    temporal = tempfile.mkdtemp(prefix=".tmp-", dir=padre)
+    try:
+        with torch.inference_mode():
+            # 1. Encoder de visión
+            pixel_values = torch.randn(2, 3, lado, lado)
+            torch.onnx.export(
+                EncoderVision(model.vision_model),
+                (pixel_values,),
+                os.path.join(temporal, ARCHIVO_VISION),
+                input_names=["pixel_values"],
+                output_names=["image_embeds"],
+                dynamic_axes={"pixel_values": {0: "lote"}, "image_embeds": {0: "lote"}},
+                opset_version=OPSET,
+                dynamo=False,
+            )
+
+            # 2. Decoder con KV cache (se traza con un pasado no vacío para que
+            #    la concatenación de la cache quede en el grafo)
+            image_embeds = model.vision_model(pixel_values=pixel_values)[0]
+            input_ids = torch.full((2, 3), texto.bos_token_id, dtype=torch.long)
+            pasado = [torch.zeros(2, num_cabezas, 2, dim_cabeza) for _ in range(2 * num_capas)]
+            attention_mask = torch.ones(2, 5, dtype=torch.long)
+
+            nombres_pasado = _nombres_cache(num_capas, "past")
+            nombres_presente = _nombres_cache(num_capas, "present")
+            ejes = {
+                "input_ids": {0: "lote", 1: "nuevos"},
+                "attention_mask": {0: "lote", 1: "total"},
+                "encoder_hidden_states": {0: "lote"},
+                "logits": {0: "lote", 1: "nuevos"},
+            }
+            ejes.update({nombre: {0: "lote", 2: "pasado"} for nombre in nombres_pasado})
+            ejes.update({nombre: {0: "lote", 2: "total"} for nombre in nombres_presente})
+
+            torch.onnx.export(
+                _DecoderConCache(model.text_decoder, num_capas),
+                (input_ids, attention_mask, image_embeds, *pasado),
+                os.path.join(temporal, ARCHIVO_DECODER),
+                input_names=["input_ids", "attention_mask", "encoder_hidden_states", *nombres_pasado],
+                output_names=["logits", *nombres_presente],
+                dynamic_axes=ejes,
+                opset_version=OPSET,
+                dynamo=False,
+            )
+
+        # 3. Pesos INT8 (solo MatMul/Gemm: lo mismo que quantize_dynamic de
+        #    torch hace con las nn.Linear)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            print("⏳ Cuantizando los grafos ONNX a INT8...")
+            for archivo in (ARCHIVO_VISION, ARCHIVO_DECODER):
+                quantize_dynamic(
+                    os.path.join(temporal, archivo),
+                    os.path.join(temporal, _con_sufijo_int8(archivo)),
+                    op_types_to_quantize=["MatMul", "Gemm"],
+                    weight_type=QuantType.QInt8,
+                )
+
+        config.save_pretrained(temporal)
+        processor.save_pretrained(temporal)
+
+        huella, archivos = huella_checkpoint(model_path)
+        with open(os.path.join(temporal, ARCHIVO_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "formato": VERSION_FORMATO,
+                    "origen": os.path.abspath(model_path),
+                    "huella": huella,
+                    "archivos": archivos,
+                    "opset": OPSET,
+                    "int8": int8,
+                    "torch_version": torch.__version__,
+                },
+                f,
+                indent=2,
+            )
+
+        if os.path.isdir(destino):
+            shutil.rmtree(destino)
+        os.replace(temporal, destino)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    print(f"✅ Export ONNX guardado en {destino}")
+    return destino
+
+
+def _export_al_dia(model_path, directorio, int8):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if manifest.get("formato") != VERSION_FORMATO or (int8 and not manifest.get("int8")):
+        return False
+
+    huella, _ = huella_checkpoint(model_path, manifest.get("archivos"))
+    # Checkpoint remoto (no es carpeta local): se confía en el export existente
+    return huella is None or manifest.get("huella") == huella
+
+
+# ============================================
+# 🏃 Inferencia
+# ============================================
+
+class ModeloOnnx:
+    """
+    Sustituto de BlipForConditionalGeneration para BlipEspanol con
+    BLIP_BACKEND=onnx. Expone `config`, `to()` y `eval()` como el modelo de
+    torch, más las tres operaciones que usa BlipEspanol: codificar(),
+    generar() y log_verosimilitudes().
+    """
+
+    def __init__(self, directorio, num_threads=4, int8=True):
+        """
+        Args:
+            directorio: Carpeta generada por exportar_onnx()
+            num_threads: Hilos intra-op de onnxruntime
+            int8: Cargar los grafos con pesos INT8
+        """
+        import onnxruntime as ort
+        from transformers import BlipConfig
+
+        self.directorio = directorio
+        self.int8 = int8
+        self.config = BlipConfig.from_pretrained(directorio)
+
+        texto = self.config.text_config
+        self.num_capas = texto.num_hidden_layers
+        self.num_cabezas = texto.num_attention_heads
+        self.dim_cabeza = texto.hidden_size // self.num_cabezas
+        self._nombres_pasado = _nombres_cache(self.num_capas, "past")
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opciones.intra_op_num_threads = num_threads
+        opciones.inter_op_num_threads = 1
+
+        def sesion(archivo):
+            if int8:
+                archivo = _con_sufijo_int8(archivo)
+            return ort.InferenceSession(
+                os.path.join(directorio, archivo),
+                sess_options=opciones,
+                providers=["CPUExecutionProvider"],
+            )
+
+        self.vision = sesion(ARCHIVO_VISION)
+        self.decoder = sesion(ARCHIVO_DECODER)
+
+    def to(self, device):
+        if torch.device(device).type != "cpu":
+            raise ValueError("El backend ONNX solo soporta CPU")
+        return self
+
+    def eval(self):
+        return self
+
+    def codificar(self, pixel_values):
+        """Encoder de visión: [N, 3, H, W] -> image_embeds [N, P, D]."""
+        entrada = np.ascontiguousarray(pixel_values.detach().cpu().numpy(), dtype=np.float32)
+        (image_embeds,) = self.vision.run(None, {"pixel_values": entrada})
+        return torch.from_numpy(image_embeds)
+
+    def _pasado_vacio(self, n):
+        vacio = np.zeros((n, self.num_cabezas, 0, self.dim_cabeza), dtype=np.float32)
+        return [vacio] * (2 * self.num_capas)
+
+    def _paso_decoder(self, input_ids, attention_mask, encoder_hidden_states, pasado):
+        """Una llamada al decoder. Returns: (logits [N,T,V], presentes)."""
+        entradas = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "encoder_hidden_states": encoder_hidden_states,
+        }
+        entradas.update(zip(self._nombres_pasado, pasado))
+        salidas = self.decoder.run(None, entradas)
+        return salidas[0], salidas[1:]
+
+    def generar(self, image_embeds, gen_config):
+        """
+        Generación greedy con KV cache, con la misma semántica que
+        text_decoder.generate(): min_new_tokens, eos = [SEP], relleno con
+        [PAD] de las filas terminadas y stopping_criteria.
+
+        Returns:
+            torch.Tensor: Secuencias [N, T] (empiezan con BOS)
+        """
+        if gen_config.get("num_beams", 1) != 1 or gen_config.get("do_sample", False):
+            raise ValueError("El backend ONNX solo soporta decodificación greedy (num_beams=1, do_sample=False)")
+
+        from transformers import StoppingCriteriaList
+
+        texto = self.config.text_config
+        eos, pad = texto.sep_token_id, texto.pad_token_id
+        max_nuevos = gen_config.get("max_new_tokens", 20)
+        min_nuevos = gen_config.get("min_new_tokens") or 0
+        criterios = gen_config.get("stopping_criteria")
+        if criterios is not None and not isinstance(criterios, StoppingCriteriaList):
+            criterios = StoppingCriteriaList(criterios)
+
+        embeds = np.ascontiguousarray(image_embeds.detach().cpu().numpy(), dtype=np.float32)
+        n = embeds.shape[0]
+        secuencias = np.full((n, 1), texto.bos_token_id, dtype=np.int64)
+        terminadas = np.zeros(n, dtype=bool)
+        entrada = secuencias
+        pasado = self._pasado_vacio(n)
+
+        for paso in range(max_nuevos):
+            mascara = np.ones(secuencias.shape, dtype=np.int64)
+            logits, pasado = self._paso_decoder(entrada, mascara, embeds, pasado)
+            siguientes_logits = logits[:, -1, :]
+            if paso < min_nuevos:
+                siguientes_logits[:, eos] = -np.inf
+
+            siguientes = siguientes_logits.argmax(-1).astype(np.int64)
+            siguientes[terminadas] = pad
+            secuencias = np.concatenate([secuencias, siguientes[:, None]], axis=1)
+
+            terminadas |= siguientes == eos
+            if criterios is not None:
+                terminadas |= criterios(torch.from_numpy(secuencias), None).numpy()
+            if terminadas.all():
+                break
+            entrada = siguientes[:, None]
+
+        return torch.from_numpy(secuencias)
+
+    def log_verosimilitudes(self, image_embeds, input_ids, attention_mask, trozo=8):
+        """
+        log P(secuencia | imagen) teacher-forced (ver
+        BlipEspanol._log_verosimilitudes). Se procesa de a `trozo` filas
+        porque el grafo devuelve los logits completos.
+
+        Returns:
+            torch.Tensor: [N]
+        """
+        embeds = np.ascontiguousarray(image_embeds.detach().cpu().numpy(), dtype=np.float32)
+        ids = input_ids.cpu().numpy().astype(np.int64)
+        mascara = attention_mask.cpu().numpy().astype(np.int64)
+
+        n = ids.shape[0]
+        total = np.empty(n, dtype=np.float32)
+        for ini in range(0, n, trozo):
+            fin = min(ini + trozo, n)
+            filas = fin - ini
+            logits, _ = self._paso_decoder(
+                ids[ini:fin], mascara[ini:fin],
+                np.repeat(embeds, filas, axis=0), self._pasado_vacio(filas)
+            )
+            # El token t se predice con la posición t-1
+            logits = torch.from_numpy(logits[:, :-1])
+            objetivos = torch.from_numpy(ids[ini:fin, 1:])
+            log_probs = logits.log_softmax(-1).gather(-1, objetivos.unsqueeze(-1)).squeeze(-1)
+            total[ini:fin] = (log_probs * torch.from_numpy(mascara[ini:fin, 1:]).float()).sum(-1).numpy()
+        return torch.from_numpy(total)
+
+
+def cargar_modelo_onnx(model_path, num_threads=4):
+    """
+    Carga (exportando si hace falta) el backend ONNX de un checkpoint.
+
+    Returns:
+        tuple (ModeloOnnx, BlipProcessor) o None si onnxruntime no está
+        instalado o el export falla (BlipEspanol vuelve a PyTorch)
+    """
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("⚠️ BLIP_BACKEND=onnx pero onnxruntime no está instalado")
+        return None
+
+    int8 = os.getenv('BLIP_ONNX_INT8', '1') == '1'
+    directorio = ruta_onnx(model_path)
+    try:
+        if not _export_al_dia(model_path, directorio, int8):
+            print(f"♻️ No hay export ONNX al día en {directorio}, exportando...")
+            exportar_onnx(model_path, directorio, int8=int8)
+
+        from transformers import BlipProcessor
+
+        processor = BlipProcessor.from_pretrained(directorio)
+        modelo = ModeloOnnx(directorio, num_threads=num_threads, int8=int8)
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar el backend ONNX ({e})")
+        return None
+
+    print(f"⚡ Backend ONNX Runtime cargado desde {directorio} ({'INT8' if int8 else 'float32'})")
+    return modelo, processor
@@ -0,0 +1,218 @@
+"""
+============================================
+🧬 Pesos compartidos entre los dos checkpoints BLIP
+============================================
+
+El servidor mantiene DOS modelos BLIP en memoria (captions y características).
+Ambos son fine-tunes del mismo modelo base, así que muchos tensores
+(embeddings del tokenizer, capas congeladas del encoder de visión, etc.)
+son idénticos byte a byte.
+
+Este módulo:
+1. Indexa los tensores de cada checkpoint *.safetensors leyendo el archivo
+   con mmap. El mmap solo se usa para calcular el hash de cada tensor sin
+   copiar el archivo al heap; los pesos NO se sirven desde el mapeo.
+2. Con ese índice detecta qué tensores son idénticos en ambos checkpoints.
+3. Después de cargar los dos modelos, hace que el segundo apunte a los
+   MISMOS tensores del primero (parámetros, buffers y pesos INT8
+   empaquetados de nn.Linear cuantizado) y libera la copia duplicada.
+4. Reporta la memoria ahorrada.
+
+Los dos modelos se cargan completos como siempre (from_pretrained + INT8),
+así que durante la carga el pico de memoria incluye ambas copias; el ahorro
+es en la memoria residente una vez compartidos. No se cargan los tensores
+compartidos con safe_open/mmap porque el modelo en memoria no es el del
+archivo: las nn.Linear se cuantizan a INT8 al cargar (o vienen del artefacto
+INT8, blip/artefacto.py), y esos pesos empaquetados no existen en el
+.safetensors en float32.
+
+Uso:
+    reporte = compartir_entre_generadores(generador_captions, generador_caracteristicas)
+    print(reporte["mb_liberados"])
+"""
+
+import gc
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import torch
+
+from .memoria import memoria_residente_bytes
+
+
+def _tensores_safetensors(ruta):
+    """
+    Recorre los tensores de un archivo .safetensors vía mmap.
+
+    Formato: [8 bytes: largo del header][header JSON][datos]
+
+    Yields:
+        tuple (nombre, huella) donde huella = (dtype, shape, blake2b de los bytes)
+    """
+    with open(ruta, "rb") as f:
+        largo_header = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(largo_header))
+        inicio_datos = 8 + largo_header
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            with memoryview(mapa) as vista:
+                for nombre, info in header.items():
+                    if nombre == "__metadata__":
+                        continue
+                    ini, fin = info["data_offsets"]
+                    with vista[inicio_datos + ini:inicio_datos + fin] as datos:
+                        digest = hashlib.blake2b(datos, digest_size=16).hexdigest()
+                    yield nombre, (info["dtype"], tuple(info["shape"]), digest)
+
+
+def indice_checkpoint(model_path):
+    """
+    Índice {nombre_tensor: huella} de un checkpoint local en formato safetensors.
+
+    Returns:
+        dict o None si el checkpoint no tiene archivos .safetensors
+    """
+    if not os.path.isdir(model_path):
+        return None
+    archivos = sorted(glob.glob(os.path.join(model_path, "*.safetensors")))
+    if not archivos:
+        return None
+
+    indice = {}
+    for archivo in archivos:
+        for nombre, huella in _tensores_safetensors(archivo):
+            indice[nombre] = huella
+    return indice
+
+
+def tensores_identicos(model_path_a, model_path_b):
+    """
+    Nombres de tensores idénticos entre dos checkpoints (comparando vía mmap).
+
+    Returns:
+        set o None si algún checkpoint no es safetensors local
+    """
+    indice_a = indice_checkpoint(model_path_a)
+    indice_b = indice_checkpoint(model_path_b)
+    if indice_a is None or indice_b is None:
+        return None
+    return {nombre for nombre, huella in indice_b.items() if indice_a.get(nombre) == huella}
+
+
+def _es_linear_cuantizado(modulo):
+    return hasattr(modulo, "_packed_params") and hasattr(modulo._packed_params, "_weight_bias")
+
+
+def _bytes_tensor(tensor):
+    if tensor is None:
+        return 0
+    return tensor.numel() * tensor.element_size()
+
+
+def _iguales(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    if a.shape != b.shape or a.dtype != b.dtype:
+        return False
+    if a.is_quantized:
+        return (torch.equal(a.int_repr(), b.int_repr())
+                and torch.equal(a.dequantize(), b.dequantize()))
+    return torch.equal(a, b)
+
+
+@torch.inference_mode()
+def compartir_pesos(base, otro, nombres_identicos=None):
+    """
+    Hace que `otro` reutilice los tensores idénticos de `base`.
+
+    Args:
+        base: nn.Module cuyos tensores se conservan
+        otro: nn.Module cuyos tensores duplicados se reemplazan
+        nombres_identicos: Conjunto de nombres de tensores candidatos
+            (de tensores_identicos()); None = comparar todos
+
+    Returns:
+        dict: Reporte con tensores compartidos y bytes liberados
+    """
+    def candidato(nombre):
+        return nombres_identicos is None or nombre in nombres_identicos
+
+    modulos_base = dict(base.named_modules())
+    compartidos = 0
+    liberados = 0
+
+    for nombre_mod, modulo in otro.named_modules():
+        modulo_base = modulos_base.get(nombre_mod)
+        if modulo_base is None or type(modulo_base) is not type(modulo):
+            continue
+        prefijo = f"{nombre_mod}." if nombre_mod else ""
+
+        # nn.Linear cuantizado: los pesos INT8 viven empaquetados
+        if _es_linear_cuantizado(modulo):
+            if not candidato(f"{prefijo}weight"):
+                continue
+            if modulo._packed_params is modulo_base._packed_params:
+                continue
+            peso, sesgo = modulo._packed_params._weight_bias()
+            peso_base, sesgo_base = modulo_base._packed_params._weight_bias()
+            if _iguales(peso_base, peso) and _iguales(sesgo_base, sesgo):
+                modulo._packed_params = modulo_base._packed_params
+                compartidos += 1
+                liberados += _bytes_tensor(peso) + _bytes_tensor(sesgo)
+            continue
+
+        for nombre, tensor in list(modulo.named_parameters(recurse=False)):
+            tensor_base = modulo_base._parameters.get(nombre)
+            if tensor_base is None or tensor_base is tensor or not candidato(prefijo + nombre):
+                continue
+            if _iguales(tensor_base, tensor):
+                modulo._parameters[nombre] = tensor_base
+                compartidos += 1
+                liberados += _bytes_tensor(tensor)
+
+        for nombre, tensor in list(modulo.named_buffers(recurse=False)):
+            tensor_base = modulo_base._buffers.get(nombre)
+            if tensor_base is None or tensor_base is tensor or not candidato(prefijo + nombre):
+                continue
+            if _iguales(tensor_base, tensor):
+                modulo._buffers[nombre] = tensor_base
+                compartidos += 1
+                liberados += _bytes_tensor(tensor)
+
+    return {"tensores_compartidos": compartidos, "bytes_liberados": liberados}
+
+
+def compartir_entre_generadores(base, otro):
+    """
+    Comparte los pesos idénticos entre dos instancias de BlipEspanol.
+
+    Usa el índice mmap de los checkpoints para limitar la comparación a los
+    tensores que ya se sabe que son idénticos en disco.
+
+    Returns:
+        dict: Reporte con tensores compartidos, MB liberados y RSS antes/después
+    """
+    rss_antes = memoria_residente_bytes()
+
+    nombres = None
+    if base.model_path and otro.model_path:
+        try:
+            nombres = tensores_identicos(base.model_path, otro.model_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ No se pudo indexar safetensors ({e}), se comparan todos los tensores")
+
+    reporte = compartir_pesos(base.model, otro.model, nombres)
+    gc.collect()
+    rss_despues = memoria_residente_bytes()
+
+    reporte.update({
+        "candidatos_en_disco": len(nombres) if nombres is not None else None,
+        "mb_liberados": round(reporte["bytes_liberados"] / 2**20, 1),
+        "rss_antes_mb": round(rss_antes / 2**20, 1) if rss_antes else None,
+        "rss_despues_mb": round(rss_despues / 2**20, 1) if rss_despues else None,
+    })
+    return reporte
@@ -0,0 +1,239 @@
+"""
+============================================
+👁️ Índice perceptual de imágenes casi idénticas
+============================================
+
+Las fotos de una misma tarjeta impresa tomadas con el celular difieren en
+unos pocos bytes, así que la cache exacta (blip/cache.py) no las reconoce.
+
+Este módulo calcula un dHash de 64 bits por imagen y lo guarda en un
+BK-tree (árbol métrico para distancia de Hamming). Si una imagen nueva está
+a `max_distancia` bits o menos de una ya descrita, se devuelve el caption
+guardado en vez de llamar a BlipEspanol.predict().
+
+Las métricas (consultas, hits, histograma de distancias) sirven para
+ajustar BLIP_PHASH_MAX_DISTANCE.
+
+Uso:
+    indice = get_indice_perceptual("caption", modelo.model_path)
+    h = dhash(imagen)
+    encontrado = indice.buscar(h)
+    if encontrado is None:
+        caption = modelo.predict(imagen)
+        indice.agregar(h, caption)
+"""
+
+import os
+import threading
+from PIL import Image
+
+
+def dhash(imagen, tamano=8):
+    """
+    Calcula el hash de diferencias (dHash) de una imagen.
+
+    Reduce la imagen a (tamano+1) x tamano en escala de grises y compara cada
+    píxel con su vecino de la derecha: 1 si es más brillante, 0 si no.
+
+    Args:
+        imagen: PIL Image
+        tamano: Lado del hash (8 -> 64 bits)
+
+    Returns:
+        int: Hash de tamano*tamano bits
+    """
+    gris = imagen.convert("L").resize((tamano + 1, tamano), Image.Resampling.BILINEAR)
+    pixeles = list(gris.getdata())
+
+    valor = 0
+    for fila in range(tamano):
+        inicio = fila * (tamano + 1)
+        for col in range(tamano):
+            valor = (valor << 1) | (pixeles[inicio + col] > pixeles[inicio + col + 1])
+    return valor
+
+
+def distancia_hamming(a, b):
+    """Número de bits distintos entre dos hashes."""
+    return (a ^ b).bit_count()
+
+
+class _NodoBK:
+    __slots__ = ("hash", "caption", "hijos")
+
+    def __init__(self, hash_, caption):
+        self.hash = hash_
+        self.caption = caption
+        self.hijos = {}
+
+
+class BKTree:
+    """
+    Árbol BK para búsqueda por distancia de Hamming.
+
+    Cada hijo se indexa por su distancia al padre; por la desigualdad
+    triangular solo hace falta visitar los hijos con distancia en
+    [d - radio, d + radio].
+    """
+
+    def __init__(self):
+        self.raiz = None
+        self.tamano = 0
+
+    def agregar(self, hash_, caption):
+        if self.raiz is None:
+            self.raiz = _NodoBK(hash_, caption)
+            self.tamano = 1
+            return
+
+        nodo = self.raiz
+        while True:
+            d = distancia_hamming(hash_, nodo.hash)
+            if d == 0:
+                # Mismo hash: conservar el caption más reciente
+                nodo.caption = caption
+                return
+            hijo = nodo.hijos.get(d)
+            if hijo is None:
+                nodo.hijos[d] = _NodoBK(hash_, caption)
+                self.tamano += 1
+                return
+            nodo = hijo
+
+    def mas_cercano(self, hash_, radio):
+        """
+        Busca el nodo más cercano dentro de `radio`.
+
+        Returns:
+            tuple (caption, distancia) o None si no hay ninguno
+        """
+        if self.raiz is None:
+            return None
+
+        mejor = None
+        pendientes = [self.raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            d = distancia_hamming(hash_, nodo.hash)
+            if d <= radio and (mejor is None or d < mejor[1]):
+                mejor = (nodo.caption, d)
+                if d == 0:
+                    break
+                # Reducir el radio acelera el resto de la búsqueda
+                radio = d
+            for distancia_hijo, hijo in nodo.hijos.items():
+                if d - radio <= distancia_hijo <= d + radio:
+                    pendientes.append(hijo)
+        return mejor
+
+
+class IndicePerceptual:
+    """
+    Índice thread-safe de captions por dHash con métricas de hit-rate.
+    """
+
+    def __init__(self, max_distancia=4, max_items=5000):
+        """
+        Args:
+            max_distancia: Distancia de Hamming máxima para considerar un duplicado
+            max_items: Máximo de hashes guardados (al llenarse ya no se agregan)
+        """
+        self.max_distancia = max_distancia
+        self.max_items = max_items
+
+        self._arbol = BKTree()
+        self._lock = threading.Lock()
+
+        self._consultas = 0
+        self._hits = 0
+        # distancia -> cantidad de hits con esa distancia
+        self._histograma = {}
+
+    def buscar(self, hash_):
+        """
+        Busca un caption guardado a `max_distancia` bits o menos.
+
+        Returns:
+            str o None si no hay una imagen casi idéntica
+        """
+        with self._lock:
+            self._consultas += 1
+            encontrado = self._arbol.mas_cercano(hash_, self.max_distancia)
+            if encontrado is None:
+                return None
+
+            caption, distancia = encontrado
+            self._hits += 1
+            self._histograma[distancia] = self._histograma.get(distancia, 0) + 1
+            return caption
+
+    def agregar(self, hash_, caption):
+        """Guarda el caption de una imagen recién descrita."""
+        with self._lock:
+            if self._arbol.tamano >= self.max_items:
+                return
+            self._arbol.agregar(hash_, caption)
+
+    def stats(self):
+        """Métricas para ajustar el umbral de distancia."""
+        with self._lock:
+            return {
+                "max_distancia": self.max_distancia,
+                "entradas": self._arbol.tamano,
+                "consultas": self._consultas,
+                "hits": self._hits,
+                "hit_rate": round(self._hits / self._consultas, 4) if self._consultas else 0.0,
+                "hits_por_distancia": dict(sorted(self._histograma.items())),
+            }
+
+
+# ============================================
+# 🌍 Índices globales (uno por modelo)
+# ============================================
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def get_indice_perceptual(tipo, model_path):
+    """
+    Obtiene el índice perceptual de un modelo.
+
+    Configuración desde .env:
+        BLIP_PHASH_ENABLED: 1/0 para activar o desactivar el índice (default: 0;
+            con 4 bits de 64 una foto distinta pero lisa o con poca textura
+            puede recibir el caption de otra, incluso en el respaldo de
+            /validar-reto donde el caption decide el resultado. Activar
+            después de ajustar BLIP_PHASH_MAX_DISTANCE con los hits de /stats)
+        BLIP_PHASH_MAX_DISTANCE: Distancia de Hamming máxima (default: 4 de 64 bits)
+        BLIP_PHASH_MAX_ITEMS: Hashes máximos por modelo (default: 5000)
+
+    Args:
+        tipo: "caption" o "caracteristicas"
+        model_path: Ruta del modelo (un índice distinto por modelo)
+
+    Returns:
+        IndicePerceptual o None si está desactivado
+    """
+    if os.getenv('BLIP_PHASH_ENABLED', '0') != '1':
+        return None
+
+    clave = (tipo, str(model_path))
+    with _indices_lock:
+        indice = _indices.get(clave)
+        if indice is None:
+            indice = IndicePerceptual(
+                max_distancia=int(os.getenv('BLIP_PHASH_MAX_DISTANCE', '4')),
+                max_items=int(os.getenv('BLIP_PHASH_MAX_ITEMS', '5000'))
+            )
+            _indices[clave] = indice
+        return indice
+
+
+def get_indices_stats():
+    """Métricas de todos los índices perceptuales activos."""
+    with _indices_lock:
+        return [
+            dict(indice.stats(), tipo=tipo, model_path=model_path)
+            for (tipo, model_path), indice in _indices.items()
+        ]
@@ -0,0 +1,156 @@
+# cache_sujetos.py - Memo acotado de sujetos extraídos con spaCy
+"""
+Cache de sujetos semánticos por frase.
+
+obtener_sujeto() corría el pipeline de spaCy completo en cada llamada, pero
+`texto_modelo` casi siempre es uno de los captions del catálogo y las
+respuestas de los niños se repiten mucho.
+
+Este módulo:
+- Guarda el sujeto extraído (o None) por frase normalizada (Unicode NFC +
+  espacios colapsados), con límite LRU. evaluador.py guarda la tupla
+  (sujeto, lemas de contenido), que también usa su nivel léxico
+- Lleva una cache por consumidor: evaluador.py y activities/evaluator_game.py
+  extraen el sujeto con reglas distintas
+- Permite precalcular los sujetos de los captions del catálogo al arrancar
+
+Configuración desde .env:
+    SUBJECT_CACHE_ITEMS: Máximo de frases por cache (default: 4096; 0 = sin cache)
+
+Uso:
+    cache = get_cache_sujetos("evaluador")
+    sujeto = cache.memo(frase, lambda: extraer(frase))
+"""
+
+from collections import OrderedDict
+import os
+import threading
+
+from embeddings_texto import normalizar_texto
+
+# Distingue "no está en cache" de un sujeto None cacheado
+_AUSENTE = object()
+
+
+class CacheSujetos:
+    """
+    LRU thread-safe de frase normalizada -> sujeto.
+    """
+
+    def __init__(self, max_items=4096):
+        """
+        Args:
+            max_items: Máximo de frases guardadas (0 = no guarda nada)
+        """
+        self.max_items = max_items
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self._hits = 0
+        self._misses = 0
+
+    def obtener(self, frase):
+        """
+        Returns:
+            tuple (encontrado, sujeto): `sujeto` puede ser None aunque
+            `encontrado` sea True (frase sin sujeto)
+        """
+        clave = normalizar_texto(frase)
+        with self._lock:
+            sujeto = self._memoria.get(clave, _AUSENTE)
+            if sujeto is _AUSENTE:
+                self._misses += 1
+                return False, None
+            self._memoria.move_to_end(clave)
+            self._hits += 1
+            return True, sujeto
+
+    def guardar(self, frase, sujeto):
+        if self.max_items <= 0:
+            return
+        clave = normalizar_texto(frase)
+        with self._lock:
+            self._memoria[clave] = sujeto
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_items:
+                self._memoria.popitem(last=False)
+
+    def memo(self, frase, calcular):
+        """Sujeto cacheado de `frase`, o `calcular()` (y se guarda) en un miss."""
+        encontrado, sujeto = self.obtener(frase)
+        if encontrado:
+            return sujeto
+        sujeto = calcular()
+        self.guardar(frase, sujeto)
+        return sujeto
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+
+    def stats(self):
+        """Contadores para /stats."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "entradas": len(self._memoria),
+                "max_items": self.max_items,
+            }
+
+
+# ============================================
+# 🌍 Instancias globales (una por consumidor)
+# ============================================
+
+_global_caches = {}
+_global_caches_lock = threading.Lock()
+
+
+def get_cache_sujetos(consumidor):
+    """
+    Obtiene o crea la cache de sujetos de un consumidor ("evaluador", "juegos").
+
+    Returns:
+        CacheSujetos
+    """
+    with _global_caches_lock:
+        cache = _global_caches.get(consumidor)
+        if cache is None:
+            cache = CacheSujetos(max_items=int(os.getenv('SUBJECT_CACHE_ITEMS', '4096')))
+            _global_caches[consumidor] = cache
+        return cache
+
+
+def get_caches_sujetos_stats():
+    """Stats de todas las caches de sujetos creadas (para /stats)."""
+    with _global_caches_lock:
+        caches = dict(_global_caches)
+    return {consumidor: cache.stats() for consumidor, cache in caches.items()}
+
+
+def captions_catalogo():
+    """Captions del catálogo de BLIP (el `texto_modelo` habitual)."""
+    from blip.catalogo import obtener_catalogo
+    return list(dict.fromkeys(entrada["caption"] for entrada in obtener_catalogo()))
+
+
+def precalcular_sujetos_catalogo():
+    """
+    Extrae y cachea los sujetos de todos los captions del catálogo en los
+    dos evaluadores (se llama al arrancar, con spaCy ya cargado).
+
+    Returns:
+        int: Captions precalculados
+    """
+    import evaluador
+    from activities import evaluator_game
+
+    captions = captions_catalogo()
+    evaluador.precalcular_sujetos(captions)
+    evaluator_game.precalcular_sujetos(captions)
+    return len(captions)
@@ -0,0 +1,182 @@
+"""
+Calibración de la confianza del modo "catalog" y de la verificación de
+sujetos de /validar-reto (quick_verificar_sujeto).
+
+La confianza de un caption del catálogo es el softmax de su log-probabilidad
+media por token dividida por BLIP_CATALOGO_TEMPERATURA; el caption se usa
+si la confianza es >= BLIP_CATALOGO_UMBRAL. Este script:
+1. Puntúa el catálogo para cada imagen de predicciones_test4-compromiso.csv
+   (imágenes que no se usaron en el fine-tuning); la entrada esperada es la
+   de la carpeta de la imagen
+2. Opcionalmente puntúa imágenes de fuera del catálogo (--fuera carpeta):
+   para ellas lo correcto es generar libremente
+3. Ajusta la temperatura que minimiza la log-verosimilitud negativa de la
+   entrada esperada
+4. Elige el umbral más bajo cuya precisión (aceptadas con el caption
+   correcto / aceptadas) alcanza la pedida, y reporta cobertura, imágenes de
+   fuera aceptadas y la confianza con la suma sin normalizar (antes)
+5. Repite la elección del umbral con la probabilidad de cada sujeto (suma
+   de las confianzas de sus captions), para BLIP_VERIFICACION_UMBRAL
+
+Uso:
+    python calibrar_catalogo.py <carpeta_imagenes> [--fuera carpeta] [--precision 0.98]
+
+Las rutas del CSV se resuelven relativas a <carpeta_imagenes>, como en
+benchmark_caminos.py.
+"""
+
+import os
+import sys
+
+import numpy as np
+import torch
+from PIL import Image
+
+from benchmark_caminos import CSV_REFERENCIA, leer_referencia
+from blip.catalogo import obtener_catalogo
+from blip.generation import BlipEspanol
+
+PRECISION = 0.98
+TEMPERATURAS = np.geomspace(0.01, 10.0, 121)
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def imagenes_de_carpeta(carpeta):
+    return sorted(
+        os.path.join(raiz, nombre)
+        for raiz, _, nombres in os.walk(carpeta)
+        for nombre in nombres if nombre.lower().endswith(EXTENSIONES)
+    )
+
+
+def puntuar(modelo, rutas):
+    """Log-probabilidad media por token del catálogo para cada imagen [M, N]."""
+    puntajes = []
+    for i, ruta in enumerate(rutas, 1):
+        imagen = Image.open(ruta)
+        imagen.load()
+        puntajes.append(modelo.puntuar_catalogo(modelo._embeds_imagenes([imagen])))
+        if i % 20 == 0:
+            print(f"   [{i}/{len(rutas)}]")
+    return torch.stack(puntajes) if puntajes else torch.zeros(0, len(modelo.catalogo["entradas"]))
+
+
+def ajustar_temperatura(puntajes, esperadas):
+    """Temperatura con menor NLL de la entrada esperada."""
+    objetivos = torch.tensor(esperadas)
+    mejor, mejor_nll = 1.0, float("inf")
+    for temperatura in TEMPERATURAS:
+        log_probs = (puntajes / float(temperatura)).log_softmax(-1)
+        nll = -log_probs[torch.arange(len(objetivos)), objetivos].mean().item()
+        if nll < mejor_nll:
+            mejor, mejor_nll = float(temperatura), nll
+    return mejor, mejor_nll
+
+
+def elegir_umbral(confianzas, correctas, precision):
+    """
+    Umbral más bajo con precisión >= `precision` entre las aceptadas.
+
+    Args:
+        confianzas: Confianza del caption ganador por imagen [M]
+        correctas: True si el ganador es la entrada esperada (False para
+                   imágenes de fuera del catálogo) [M]
+
+    Returns:
+        float: Umbral (1.01 si ninguno alcanza la precisión)
+    """
+    umbral = 1.01
+    orden = np.argsort(-confianzas)
+    aciertos = np.cumsum(correctas[orden])
+    for k, i in enumerate(orden, 1):
+        if aciertos[k - 1] / k >= precision:
+            umbral = float(confianzas[i])
+    return umbral
+
+
+def resumen(nombre, confianzas, correctas, dentro, umbral):
+    aceptadas = confianzas >= umbral
+    print(f"{nombre:16s} umbral {umbral:.3f}  confianza media del ganador {confianzas[dentro].mean():.3f}")
+    print(f"{'':16s} cobertura (catálogo): {aceptadas[dentro].mean():.1%}   "
+          f"precisión: {correctas[aceptadas].mean() if aceptadas.any() else float('nan'):.1%}   "
+          f"fuera aceptadas: {int(aceptadas[~dentro].sum())}/{int((~dentro).sum())}")
+
+
+def calibracion(carpeta_imagenes, carpeta_fuera=None, precision=PRECISION, ruta_csv=CSV_REFERENCIA):
+    modelo = BlipEspanol.from_pretrained()
+    modelo.cargar_catalogo(obtener_catalogo())
+    entradas = modelo.catalogo["entradas"]
+    por_carpeta = {entrada["carpeta"]: i for i, entrada in enumerate(entradas)}
+
+    filas = []
+    for ruta, _ in leer_referencia(ruta_csv, carpeta_imagenes):
+        carpeta = os.path.basename(os.path.dirname(ruta))
+        if carpeta in por_carpeta:
+            filas.append((ruta, por_carpeta[carpeta]))
+    fuera = imagenes_de_carpeta(carpeta_fuera) if carpeta_fuera else []
+    if not filas:
+        print(f"❌ No se encontró ninguna imagen del catálogo en {carpeta_imagenes}")
+        return None
+
+    print(f"📂 {len(filas)} imágenes del catálogo + {len(fuera)} de fuera")
+    puntajes = puntuar(modelo, [ruta for ruta, _ in filas] + fuera)
+    esperadas = [esperada for _, esperada in filas]
+    dentro = np.arange(len(puntajes)) < len(filas)
+
+    temperatura, nll = ajustar_temperatura(puntajes[dentro], esperadas)
+
+    def ganadores(confianzas):
+        confianza, mejor = confianzas.max(-1)
+        correctas = np.zeros(len(puntajes), dtype=bool)
+        correctas[:len(filas)] = mejor[:len(filas)].numpy() == np.array(esperadas)
+        return confianza.numpy(), correctas
+
+    # Antes: softmax de la suma de log-probabilidades (sin normalizar por largo)
+    confianzas_antes, correctas_antes = ganadores((puntajes * modelo.catalogo["tokens"]).softmax(-1))
+    confianzas, correctas = ganadores((puntajes / temperatura).softmax(-1))
+    umbral = elegir_umbral(confianzas, correctas, precision)
+
+    print("=" * 88)
+    print(f"🌡️ Temperatura: {temperatura:.4f} (NLL {nll:.4f})   "
+          f"aciertos del ganador: {correctas[dentro].mean():.1%}")
+    resumen("antes (suma)", confianzas_antes, correctas_antes, dentro, modelo.umbral_catalogo)
+    print("-" * 88)
+    resumen("calibrado", confianzas, correctas, dentro, umbral)
+    print("-" * 88)
+
+    # Verificación: probabilidad de cada sujeto con la misma temperatura
+    grupos = modelo.catalogo["grupos"]
+    sujeto_de = {int(indice): g for g, indices in enumerate(grupos) for indice in indices}
+    por_sujeto = torch.stack(
+        [(puntajes / temperatura).softmax(-1)[:, indices].sum(-1) for indices in grupos], dim=-1
+    )
+    confianzas_sujeto, ganador = por_sujeto.max(-1)
+    confianzas_sujeto = confianzas_sujeto.numpy()
+    correctas_sujeto = np.zeros(len(puntajes), dtype=bool)
+    correctas_sujeto[:len(filas)] = ganador[:len(filas)].numpy() == np.array(
+        [sujeto_de[esperada] for esperada in esperadas]
+    )
+    umbral_sujeto = elegir_umbral(confianzas_sujeto, correctas_sujeto, precision)
+    resumen("verificación", confianzas_sujeto, correctas_sujeto, dentro, umbral_sujeto)
+    print("=" * 88)
+    if not fuera:
+        print("⚠️ Sin imágenes de fuera del catálogo (--fuera) el umbral no mide los falsos positivos")
+    print("💡 Para usar la calibración en .env:")
+    print(f"   BLIP_CATALOGO_TEMPERATURA={temperatura:.4f}")
+    print(f"   BLIP_CATALOGO_UMBRAL={umbral:.3f}")
+    print(f"   BLIP_VERIFICACION_UMBRAL={umbral_sujeto:.3f}")
+    return temperatura, umbral, umbral_sujeto
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    opciones = {"--fuera": None, "--precision": PRECISION}
+    for opcion in opciones:
+        if opcion in argumentos:
+            i = argumentos.index(opcion)
+            opciones[opcion] = argumentos[i + 1]
+            del argumentos[i:i + 2]
+    if not argumentos:
+        print(__doc__)
+        sys.exit(1)
+    calibracion(argumentos[0], opciones["--fuera"], float(opciones["--precision"]))
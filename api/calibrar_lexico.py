@@ -0,0 +1,166 @@
+"""
+Calibración de las bandas del nivel léxico de evaluador.py.
+
+Con sujetos iguales, evaluar_respuesta() decide sin el encoder cuando el
+Jaccard de lemas es >= EVAL_LEXICO_ACEPTAR (copia casi literal) o
+<= EVAL_LEXICO_RECHAZAR (casi sin palabras en común). Este script:
+1. Arma pares (texto_modelo, texto_nino) desde un CSV propio o, sin CSV,
+   desde las descripciones de analizar_sujetos.py (copias, títulos,
+   fragmentos, respuestas cortas y las demás descripciones)
+2. Calcula para los pares con sujeto igual el Jaccard y la decisión del
+   modelo completo (encoder, similitud + 0.15 >= umbral). Los pares donde
+   solo una frase tiene negación se excluyen: siempre los decide el encoder
+3. Elige la banda de aceptar más baja y la de rechazar más alta que
+   mantienen el acuerdo pedido con el modelo completo
+4. Reporta cuántos pares decide cada nivel y el acuerdo, con las bandas
+   calibradas y con las configuradas en .env
+
+Uso:
+    python calibrar_lexico.py [pares.csv] [--umbral 0.6] [--acuerdo 1.0]
+
+El CSV necesita columnas texto_modelo y texto_nino.
+"""
+
+import csv
+import sys
+
+import numpy as np
+
+import evaluador
+from analizar_sujetos import csv_data
+from embeddings_texto import get_almacen_embeddings
+
+UMBRAL = 0.6
+ACUERDO = 1.0
+BONUS = 0.15
+PLANTILLAS_RESPUESTA = ("es un {}", "veo {}", "un {} en su casa")
+
+
+def pares_de_referencia():
+    """Pares sintéticos a partir de las descripciones de analizar_sujetos.py."""
+    filas = list(csv.DictReader(csv_data.strip().splitlines()))
+    descripciones = [fila['content'].strip() for fila in filas]
+
+    pares = []
+    for fila, descripcion in zip(filas, descripciones):
+        titulo, _, cuerpo = descripcion.partition(":")
+        clausulas = [c.strip() for c in cuerpo.split(",") if c.strip()]
+        respuestas = [descripcion, titulo, cuerpo.strip()]
+        respuestas += [", ".join(clausulas[:k]) for k in range(1, len(clausulas))]
+        carpeta = fila['folder_name'].strip().replace('_', ' ')
+        respuestas += [plantilla.format(carpeta) for plantilla in PLANTILLAS_RESPUESTA]
+        respuestas += [otra for otra in descripciones if otra != descripcion]
+        pares += [(descripcion, respuesta) for respuesta in respuestas if respuesta]
+    return pares
+
+
+def pares_de_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8') as f:
+        return [(fila['texto_modelo'], fila['texto_nino']) for fila in csv.DictReader(f)]
+
+
+def medir(pares, umbral):
+    """
+    Jaccard y decisión del modelo completo de los pares con sujeto igual.
+
+    Returns:
+        tuple (indices [N], aceptadas [N] bool, total de pares)
+    """
+    analisis = evaluador.analizar_frases([texto for par in pares for texto in par])
+    con_sujeto = [
+        (modelo, nino) for modelo, nino in pares
+        if analisis[modelo][0] is not None and analisis[modelo][0] == analisis[nino][0]
+        and not evaluador.negacion_distinta(analisis[modelo][1], analisis[nino][1])
+    ]
+    if not con_sujeto:
+        return np.zeros(0), np.zeros(0, dtype=bool), len(pares)
+
+    indices = np.array([
+        evaluador.jaccard(analisis[modelo][1], analisis[nino][1]) for modelo, nino in con_sujeto
+    ])
+
+    textos = list(dict.fromkeys(texto for par in con_sujeto for texto in par))
+    posicion = {texto: i for i, texto in enumerate(textos)}
+    vectores = get_almacen_embeddings().vectores(textos)
+    similitudes = np.einsum(
+        "ij,ij->i",
+        vectores[[posicion[modelo] for modelo, _ in con_sujeto]],
+        vectores[[posicion[nino] for _, nino in con_sujeto]],
+    )
+    aceptadas = np.minimum(similitudes + BONUS, 1.0) >= umbral
+    return indices, aceptadas, len(pares)
+
+
+def calibrar(indices, aceptadas, acuerdo):
+    """
+    Banda de aceptar más baja y de rechazar más alta con el acuerdo pedido.
+
+    Returns:
+        tuple (aceptar, rechazar); 1.01 / -1.0 si ninguna banda alcanza el acuerdo
+    """
+    aceptar = 1.01
+    for valor in sorted(set(indices.tolist()), reverse=True):
+        banda = indices >= valor
+        if aceptadas[banda].mean() < acuerdo:
+            break
+        aceptar = valor
+
+    rechazar = -1.0
+    for valor in sorted(set(indices.tolist())):
+        if valor >= aceptar:
+            break
+        banda = indices <= valor
+        if (~aceptadas[banda]).mean() < acuerdo:
+            break
+        rechazar = valor
+    return aceptar, rechazar
+
+
+def resumen(nombre, indices, aceptadas, aceptar, rechazar):
+    n = len(indices)
+    acepta = indices >= aceptar
+    rechaza = (indices <= rechazar) & ~acepta
+    encoder = ~(acepta | rechaza)
+    # El nivel léxico coincide con el encoder si acepta lo que el encoder acepta, etc.
+    coincide = np.where(acepta, aceptadas, np.where(rechaza, ~aceptadas, True))
+    lexicas = int(acepta.sum() + rechaza.sum())
+    acuerdo_lexico = coincide[~encoder].mean() if lexicas else float("nan")
+    print(f"{nombre:12s} aceptar >= {aceptar:.3f}  rechazar <= {rechazar:.3f}")
+    print(f"{'':12s} léxico acepta: {acepta.sum():4d} ({acepta.mean():.0%})   "
+          f"léxico rechaza: {rechaza.sum():4d} ({rechaza.mean():.0%})   "
+          f"encoder: {encoder.sum():4d} ({encoder.mean():.0%})")
+    print(f"{'':12s} acuerdo con el modelo completo: {coincide.mean():.2%} de {n} pares "
+          f"({acuerdo_lexico:.2%} en las {lexicas} decisiones léxicas)")
+
+
+def calibracion(pares, umbral=UMBRAL, acuerdo=ACUERDO):
+    print(f"📄 {len(pares)} pares, umbral {umbral}, acuerdo pedido {acuerdo:.0%}")
+    indices, aceptadas, total = medir(pares, umbral)
+    print(f"🎯 {len(indices)} de {total} pares con sujeto igual y sin negación distinta "
+          f"(los demás los deciden el sujeto o el encoder)")
+    if not len(indices):
+        return None
+
+    aceptar, rechazar = calibrar(indices, aceptadas, acuerdo)
+    print("=" * 88)
+    resumen("calibrado", indices, aceptadas, aceptar, rechazar)
+    print("-" * 88)
+    resumen(".env actual", indices, aceptadas, evaluador.LEXICO_ACEPTAR, evaluador.LEXICO_RECHAZAR)
+    print("=" * 88)
+    print("💡 Para usar las bandas calibradas en .env:")
+    print(f"   EVAL_LEXICO_ACEPTAR={aceptar:.3f}")
+    print(f"   EVAL_LEXICO_RECHAZAR={rechazar:.3f}")
+    print(f"   EVAL_LEXICO_UMBRAL={umbral}")
+    return aceptar, rechazar
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    opciones = {"--umbral": UMBRAL, "--acuerdo": ACUERDO}
+    for opcion in opciones:
+        if opcion in argumentos:
+            i = argumentos.index(opcion)
+            opciones[opcion] = float(argumentos[i + 1])
+            del argumentos[i:i + 2]
+    pares = pares_de_csv(argumentos[0]) if argumentos else pares_de_referencia()
+    calibracion(pares, opciones["--umbral"], opciones["--acuerdo"])
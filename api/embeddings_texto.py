@@ -0,0 +1,271 @@
+# embeddings_texto.py - Cache de embeddings de texto para la similitud semántica
+"""
+Almacén de embeddings de texto para similitud_semantica().
+
+Antes cada comparación llamaba dos veces a model.encode (una por texto) y
+no recordaba nada, aunque `texto_modelo` casi siempre es uno de los captions
+o sujetos del catálogo.
+
+Este módulo:
+- Guarda los vectores YA NORMALIZADOS (norma 1) por texto normalizado
+  (Unicode NFC + espacios colapsados), con límite LRU
+- Opcionalmente carga un .npz con los embeddings del catálogo
+  (precalcular_embeddings.py), que nunca se desalojan. Se carga en el primer
+  uso, junto con el encoder: el .npz solo se acepta si fue calculado con el
+  backend que realmente se cargó (ver _preparar)
+- En un miss codifica todos los textos que faltan en UNA sola llamada a
+  encode (en lote)
+- La similitud coseno es un producto punto de vectores normalizados
+
+Configuración desde .env:
+    TEXT_EMBED_CACHE_ITEMS: Máximo de textos en el LRU (default: 2048)
+    TEXT_EMBEDDINGS_PATH: .npz con los embeddings del catálogo
+                          (default: embeddings_catalogo.npz; se ignora si no existe)
+
+Uso:
+    almacen = get_almacen_embeddings()
+    almacen.similitud("perro", "el perro come")  # float en [-1, 1]
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import unicodedata
+
+import numpy as np
+
+import registro_modelos
+
+
+def normalizar_texto(texto):
+    """Clave de cache: Unicode NFC y espacios colapsados (no cambia mayúsculas)."""
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+def textos_catalogo():
+    """Captions, sujetos y carpetas del catálogo de BLIP (los `texto_modelo` habituales)."""
+    from blip.catalogo import obtener_catalogo
+
+    textos = []
+    for entrada in obtener_catalogo():
+        textos.append(entrada["caption"])
+        textos.append(entrada["sujeto"].lower())
+        textos.append(entrada["carpeta"].lower())
+    # Sin repetidos, en orden estable
+    return list(dict.fromkeys(normalizar_texto(t) for t in textos if t))
+
+
+class AlmacenEmbeddings:
+    """
+    Cache thread-safe de embeddings normalizados por texto.
+    """
+
+    def __init__(self, obtener_modelo, max_items=2048, nombre_modelo=None, ruta_catalogo=None):
+        """
+        Args:
+            obtener_modelo: Función que devuelve el SentenceTransformer (se
+                            llama en el primer uso)
+            max_items: Máximo de textos en el LRU (el catálogo no cuenta)
+            nombre_modelo: Identificador del modelo, para no cargar un .npz
+                           calculado con otro modelo. Si el encoder cargado
+                           tiene `identificador` (encoder_texto.py), se usa ese
+            ruta_catalogo: .npz de embeddings del catálogo a cargar en el
+                           primer uso (None = ninguno)
+        """
+        self.obtener_modelo = obtener_modelo
+        self.max_items = max_items
+        self.nombre_modelo = nombre_modelo
+        self.ruta_catalogo = ruta_catalogo
+        self._preparado = False
+        self._preparar_lock = threading.Lock()
+
+        self._lru = OrderedDict()
+        self._catalogo = {}
+        self._lock = threading.Lock()
+
+        # Contadores
+        self._hits = 0
+        self._misses = 0
+        self._llamadas_encode = 0
+
+    def _preparar(self):
+        """
+        Primer uso: carga el encoder, toma su identificador (el backend que
+        realmente se cargó, ej: torch tras un fallo de ONNX) y recién entonces
+        carga el .npz del catálogo. Nunca se llama desde get_almacen_embeddings
+        ni desde stats(): crear el almacén o pedir /stats no carga modelos.
+        """
+        if self._preparado:
+            return
+        with self._preparar_lock:
+            if self._preparado:
+                return
+            modelo = self.obtener_modelo()
+            self.nombre_modelo = getattr(modelo, "identificador", None) or self.nombre_modelo
+            self.cargar_catalogo(self.ruta_catalogo)
+            self._preparado = True
+
+    def _codificar(self, textos):
+        modelo = self.obtener_modelo()
+        vectores = modelo.encode(
+            textos,
+            batch_size=max(len(textos), 1),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        with self._lock:
+            self._llamadas_encode += 1
+        return np.asarray(vectores, dtype=np.float32)
+
+    def vectores(self, textos):
+        """
+        Embeddings normalizados de varios textos.
+
+        Returns:
+            np.ndarray: [N, D] en el orden de `textos`
+        """
+        self._preparar()
+        claves = [normalizar_texto(texto) for texto in textos]
+        resultado = [None] * len(claves)
+
+        with self._lock:
+            for i, clave in enumerate(claves):
+                vector = self._catalogo.get(clave)
+                if vector is None:
+                    vector = self._lru.get(clave)
+                    if vector is not None:
+                        self._lru.move_to_end(clave)
+                if vector is not None:
+                    resultado[i] = vector
+                    self._hits += 1
+                else:
+                    self._misses += 1
+
+        # Todos los textos que faltan en una sola llamada a encode
+        faltantes = list(dict.fromkeys(c for c, v in zip(claves, resultado) if v is None))
+        if faltantes:
+            nuevos = dict(zip(faltantes, self._codificar(faltantes)))
+            with self._lock:
+                for clave, vector in nuevos.items():
+                    self._lru[clave] = vector
+                    self._lru.move_to_end(clave)
+                while len(self._lru) > self.max_items:
+                    self._lru.popitem(last=False)
+            resultado = [nuevos[c] if v is None else v for c, v in zip(claves, resultado)]
+
+        return np.stack(resultado)
+
+    def similitud(self, texto1, texto2):
+        """Similitud coseno entre dos textos (producto punto de vectores normalizados)."""
+        v1, v2 = self.vectores([texto1, texto2])
+        return float(np.dot(v1, v2))
+
+    def precalcular(self, textos, ruta=None):
+        """
+        Codifica textos que nunca se desalojan (el catálogo) y, si se indica
+        `ruta`, los guarda en un .npz.
+
+        Returns:
+            int: Cantidad de textos en el catálogo
+        """
+        self._preparar()
+        claves = list(dict.fromkeys(normalizar_texto(t) for t in textos))
+        vectores = self._codificar(claves)
+        with self._lock:
+            self._catalogo.update(zip(claves, vectores))
+
+        if ruta:
+            directorio = os.path.dirname(os.path.abspath(ruta))
+            os.makedirs(directorio, exist_ok=True)
+            np.savez(
+                ruta,
+                textos=np.array(claves),
+                vectores=vectores,
+                modelo=np.array(self.nombre_modelo or ""),
+            )
+        return len(self._catalogo)
+
+    def cargar_catalogo(self, ruta):
+        """
+        Carga embeddings precalculados desde un .npz.
+
+        Returns:
+            int: Textos cargados (0 si el archivo no existe o es de otro modelo)
+        """
+        if not ruta or not os.path.exists(ruta):
+            return 0
+        with np.load(ruta) as datos:
+            modelo = str(datos["modelo"]) if "modelo" in datos else ""
+            if self.nombre_modelo and modelo and modelo != self.nombre_modelo:
+                print(f"⚠️ {ruta} fue calculado con {modelo}, no con {self.nombre_modelo}; se ignora")
+                return 0
+            textos = [str(t) for t in datos["textos"]]
+            vectores = datos["vectores"].astype(np.float32)
+        with self._lock:
+            self._catalogo.update(zip(textos, vectores))
+        print(f"📚 {len(textos)} embeddings de texto precalculados cargados desde {ruta}")
+        return len(textos)
+
+    def limpiar(self):
+        """Vacía el LRU (el catálogo se conserva)."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        """Contadores para /stats."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "llamadas_encode": self._llamadas_encode,
+                "entradas_lru": len(self._lru),
+                "max_lru": self.max_items,
+                "entradas_catalogo": len(self._catalogo),
+                "modelo": self.nombre_modelo if self._preparado else None,
+            }
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_almacen = None
+_global_almacen_lock = threading.Lock()
+
+
+def ruta_embeddings_catalogo():
+    """Ruta del .npz de embeddings del catálogo (TEXT_EMBEDDINGS_PATH)."""
+    return os.getenv('TEXT_EMBEDDINGS_PATH', 'embeddings_catalogo.npz')
+
+
+def get_almacen_embeddings():
+    """
+    Obtiene o crea el almacén global de embeddings de texto (usa el
+    SentenceTransformer del registro compartido).
+
+    Crear el almacén no carga el encoder ni el .npz del catálogo: se cargan
+    en el primer vectores()/precalcular() (AlmacenEmbeddings._preparar).
+
+    Returns:
+        AlmacenEmbeddings
+    """
+    global _global_almacen
+    if _global_almacen is None:
+        with _global_almacen_lock:
+            if _global_almacen is None:
+                _global_almacen = AlmacenEmbeddings(
+                    lambda: registro_modelos.get_sentence_transformer("embeddings"),
+                    max_items=int(os.getenv('TEXT_EMBED_CACHE_ITEMS', '2048')),
+                    nombre_modelo=registro_modelos.nombre_sentence_transformer(),
+                    ruta_catalogo=ruta_embeddings_catalogo(),
+                )
+    return _global_almacen
+
+
+def get_almacen_embeddings_stats():
+    """Stats del almacén global para /stats (None si todavía no se creó)."""
+    almacen = _global_almacen
+    return almacen.stats() if almacen is not None else None
@@ -0,0 +1,382 @@
+# encoder_texto.py - Backends del encoder de frases (SentenceTransformer)
+"""
+Backends alternativos para el encoder de frases de la similitud semántica
+(paraphrase-multilingual-MiniLM-L12-v2 por defecto).
+
+Antes cada comparación de /evaluate y /validar-reto corría el encoder en
+float32 con PyTorch. Este módulo permite elegir, con SENTENCE_ENCODER_BACKEND:
+- torch: SentenceTransformer float32 (default, el comportamiento anterior)
+- int8:  SentenceTransformer con las nn.Linear cuantizadas a INT8
+         (torch quantize_dynamic, pesos INT8 y activaciones cuantizadas al vuelo)
+- onnx:  Transformer + mean pooling exportados a ONNX y ejecutados con
+         onnxruntime (ORT_ENABLE_ALL); con SENTENCE_ONNX_INT8=1 (default)
+         los MatMul se cuantizan a INT8 con onnxruntime.quantization
+
+Todos exponen `encode()` con los argumentos que usa la API, así que
+embeddings_texto.py y el registro de modelos no cambian. Si el backend
+pedido falla al cargar, se vuelve a torch.
+
+Antes de cambiar de backend, medir la deriva de los puntajes:
+    python reporte_deriva_encoder.py int8 onnx
+
+Configuración desde .env:
+    SENTENCE_ENCODER_BACKEND: torch (default), int8 u onnx
+    SENTENCE_ONNX_DIR: Carpeta de los exports ONNX (default: sentence-onnx)
+    SENTENCE_ONNX_INT8: 1/0 para usar el grafo INT8 o float32 (default: 1)
+    SENTENCE_ONNX_THREADS: Hilos de onnxruntime (default: 0 = todos los núcleos)
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+BACKENDS_ENCODER = ("torch", "int8", "onnx")
+
+VERSION_FORMATO = 1
+OPSET = 17
+ARCHIVO_ENCODER = "encoder.onnx"
+ARCHIVO_ENCODER_INT8 = "encoder_int8.onnx"
+ARCHIVO_MANIFEST = "onnx_manifest.json"
+
+
+def backend_encoder_configurado():
+    """Backend pedido en SENTENCE_ENCODER_BACKEND ("torch", "int8" u "onnx")."""
+    backend = os.getenv('SENTENCE_ENCODER_BACKEND', 'torch').strip().lower()
+    if backend not in BACKENDS_ENCODER:
+        raise ValueError(f"SENTENCE_ENCODER_BACKEND={backend!r} no válido (usa {', '.join(BACKENDS_ENCODER)})")
+    return backend
+
+
+def onnx_int8_configurado():
+    return os.getenv('SENTENCE_ONNX_INT8', '1') == '1'
+
+
+def identificador_encoder(nombre, backend, onnx_int8=None):
+    """
+    Nombre del modelo más su backend, para no mezclar embeddings precalculados
+    con uno y con otro (ej: "...MiniLM-L12-v2 [onnx-int8]").
+    """
+    if backend == "torch":
+        return nombre
+    if backend == "onnx":
+        if onnx_int8 is None:
+            onnx_int8 = onnx_int8_configurado()
+        backend = "onnx-int8" if onnx_int8 else "onnx-fp32"
+    return f"{nombre} [{backend}]"
+
+
+def ruta_onnx_encoder(nombre):
+    """Carpeta del export ONNX de un modelo (un nombre de Hub o una carpeta local)."""
+    base = os.getenv('SENTENCE_ONNX_DIR', 'sentence-onnx')
+    return os.path.join(base, nombre.rstrip("/\\").replace("/", "__").replace("\\", "__"))
+
+
+def _cargar_torch(nombre):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(nombre, device='cpu')
+
+
+def cuantizar_int8(modelo):
+    """Copia del SentenceTransformer con las nn.Linear cuantizadas a INT8."""
+    import torch
+
+    modelo.eval()
+    return torch.ao.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cargar_encoder(nombre, backend=None, onnx_int8=None, estricto=False):
+    """
+    Carga el encoder de frases con el backend pedido.
+
+    Args:
+        nombre: Modelo de sentence-transformers (Hub o carpeta local)
+        backend: "torch", "int8" u "onnx" (default: SENTENCE_ENCODER_BACKEND)
+        onnx_int8: Grafo INT8 o float32 con backend onnx (default: SENTENCE_ONNX_INT8)
+        estricto: Lanzar el error en vez de volver a torch float32 (para
+                  reporte_deriva_encoder.py)
+
+    Returns:
+        Objeto con encode() (SentenceTransformer o EncoderOnnx). Su atributo
+        `identificador` (identificador_encoder) corresponde al backend que
+        realmente se cargó: si el pedido falla y se vuelve a torch, es el de torch.
+    """
+    backend = backend or backend_encoder_configurado()
+    if onnx_int8 is None:
+        onnx_int8 = onnx_int8_configurado()
+
+    if backend == "onnx":
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            if estricto:
+                raise
+            print("⚠️ SENTENCE_ENCODER_BACKEND=onnx pero onnxruntime no está instalado; se usa torch")
+            return _identificado(_cargar_torch(nombre), nombre, "torch")
+        directorio = ruta_onnx_encoder(nombre)
+        try:
+            if not _export_al_dia(nombre, directorio, onnx_int8):
+                print(f"♻️ No hay export ONNX del encoder en {directorio}, exportando...")
+                exportar_encoder_onnx(_cargar_torch(nombre), nombre, directorio, int8=onnx_int8)
+            encoder = EncoderOnnx(directorio, int8=onnx_int8)
+        except Exception as e:
+            if estricto:
+                raise
+            print(f"⚠️ No se pudo cargar el encoder ONNX ({e}); se usa torch")
+            return _identificado(_cargar_torch(nombre), nombre, "torch")
+        print(f"⚡ Encoder de frases ONNX Runtime cargado desde {directorio} ({'INT8' if onnx_int8 else 'float32'})")
+        return _identificado(encoder, nombre, "onnx", onnx_int8)
+
+    modelo = _cargar_torch(nombre)
+    if backend == "int8":
+        try:
+            modelo = cuantizar_int8(modelo)
+            print("⚡ Encoder de frases cuantizado a INT8 (torch)")
+            return _identificado(modelo, nombre, "int8")
+        except Exception as e:
+            if estricto:
+                raise
+            print(f"⚠️ No se pudo cuantizar el encoder ({e}); se usa float32")
+    return _identificado(modelo, nombre, "torch")
+
+
+def _identificado(encoder, nombre, backend, onnx_int8=None):
+    """Anota en el encoder el identificador del backend con el que se cargó."""
+    encoder.identificador = identificador_encoder(nombre, backend, onnx_int8)
+    return encoder
+
+
+# ============================================
+# 📤 Export ONNX
+# ============================================
+
+def _transformer_y_pooling(modelo):
+    """
+    Transformer y pooling de un SentenceTransformer; solo se soporta la
+    arquitectura de los MiniLM de paráfrasis: Transformer + mean pooling
+    (+ Normalize opcional).
+    """
+    modulos = list(modelo)
+    nombres = [type(modulo).__name__ for modulo in modulos]
+    if nombres[:2] != ["Transformer", "Pooling"] or any(n != "Normalize" for n in nombres[2:]):
+        raise ValueError(f"Arquitectura no soportada para ONNX: {nombres}")
+    pooling = modulos[1]
+    if pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"Pooling no soportado para ONNX: {pooling.get_pooling_mode_str()}")
+    return modulos[0], len(modulos) > 2
+
+
+def _mean_pooling():
+    import torch
+
+    class TransformerConMeanPooling(torch.nn.Module):
+        """Transformer de HF + mean pooling enmascarado (como Pooling de sentence-transformers)."""
+
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask):
+            tokens = self.auto_model(
+                input_ids=input_ids, attention_mask=attention_mask, return_dict=True
+            ).last_hidden_state
+            mascara = attention_mask.unsqueeze(-1).to(tokens.dtype)
+            suma = (tokens * mascara).sum(dim=1)
+            return suma / mascara.sum(dim=1).clamp(min=1e-9)
+
+    return TransformerConMeanPooling
+
+
+def exportar_grafo_encoder(auto_model, archivo):
+    """Exporta un transformer de HF + mean pooling a `archivo` (.onnx)."""
+    import torch
+
+    envoltorio = _mean_pooling()(auto_model).eval()
+    input_ids = torch.ones(2, 8, dtype=torch.long)
+    attention_mask = torch.ones(2, 8, dtype=torch.long)
+    attention_mask[1, 5:] = 0
+    with torch.inference_mode():
+        torch.onnx.export(
+            envoltorio,
+            (input_ids, attention_mask),
+            archivo,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["embeddings"],
+            dynamic_axes={
+                "input_ids": {0: "lote", 1: "tokens"},
+                "attention_mask": {0: "lote", 1: "tokens"},
+                "embeddings": {0: "lote"},
+            },
+            opset_version=OPSET,
+            dynamo=False,
+        )
+
+
+def exportar_encoder_onnx(modelo, nombre, destino=None, int8=True):
+    """
+    Exporta un SentenceTransformer (Transformer + mean pooling) a ONNX y,
+    opcionalmente, a INT8. Se escribe en una carpeta temporal y se renombra
+    al final para no dejar nunca un export a medias.
+
+    Args:
+        modelo: SentenceTransformer float32 ya cargado
+        nombre: Nombre del modelo (se guarda en el manifest)
+        destino: Carpeta de salida (default: ruta_onnx_encoder(nombre))
+        int8: Generar también el grafo INT8
+
+    Returns:
+        str: Carpeta con el export
+    """
+    import torch
+
+    transformer, normalizar = _transformer_y_pooling(modelo)
+    destino = destino or ruta_onnx_encoder(nombre)
+    padre = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(padre, exist_ok=True)
+
+    print(f"📤 Exportando el encoder {nombre} a ONNX...")
+    temporal = tempfile.mkdtemp(prefix=".tmp-", dir=padre)
+    try:
+        exportar_grafo_encoder(transformer.auto_model, os.path.join(temporal, ARCHIVO_ENCODER))
+
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            print("⏳ Cuantizando el encoder ONNX a INT8...")
+            quantize_dynamic(
+                os.path.join(temporal, ARCHIVO_ENCODER),
+                os.path.join(temporal, ARCHIVO_ENCODER_INT8),
+                op_types_to_quantize=["MatMul", "Gemm"],
+                weight_type=QuantType.QInt8,
+            )
+
+        transformer.tokenizer.save_pretrained(temporal)
+        with open(os.path.join(temporal, ARCHIVO_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "formato": VERSION_FORMATO,
+                    "modelo": nombre,
+                    "max_seq_length": transformer.max_seq_length,
+                    "do_lower_case": bool(getattr(transformer, "do_lower_case", False)),
+                    "normalizar": normalizar,
+                    "opset": OPSET,
+                    "int8": int8,
+                    "torch_version": torch.__version__,
+                },
+                f,
+                indent=2,
+            )
+
+        if os.path.isdir(destino):
+            shutil.rmtree(destino)
+        os.replace(temporal, destino)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    print(f"✅ Export ONNX del encoder guardado en {destino}")
+    return destino
+
+
+def _export_al_dia(nombre, directorio, int8):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        manifest.get("formato") == VERSION_FORMATO
+        and manifest.get("modelo") == nombre
+        and (manifest.get("int8") or not int8)
+    )
+
+
+# ============================================
+# 🏃 Inferencia ONNX
+# ============================================
+
+class EncoderOnnx:
+    """
+    Sustituto de SentenceTransformer con onnxruntime: solo encode(), que es
+    lo que usan embeddings_texto.py y el calentamiento del arranque.
+    """
+
+    def __init__(self, directorio, num_threads=None, int8=True):
+        """
+        Args:
+            directorio: Carpeta generada por exportar_encoder_onnx()
+            num_threads: Hilos intra-op de onnxruntime (default: los de torch)
+            int8: Cargar el grafo INT8
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directorio, ARCHIVO_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.directorio = directorio
+        self.int8 = int8
+        self.max_seq_length = manifest["max_seq_length"]
+        self.do_lower_case = manifest.get("do_lower_case", False)
+        self.normalizar = manifest.get("normalizar", False)
+        self.tokenizer = AutoTokenizer.from_pretrained(directorio)
+
+        if num_threads is None:
+            num_threads = int(os.getenv('SENTENCE_ONNX_THREADS', '0')) or os.cpu_count() or 1
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opciones.intra_op_num_threads = num_threads
+        opciones.inter_op_num_threads = 1
+        self.sesion = ort.InferenceSession(
+            os.path.join(directorio, ARCHIVO_ENCODER_INT8 if int8 else ARCHIVO_ENCODER),
+            sess_options=opciones,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False,
+               convert_to_numpy=True, convert_to_tensor=False,
+               normalize_embeddings=False, **kwargs):
+        """
+        Embeddings de una o varias frases (misma firma que
+        SentenceTransformer.encode para los argumentos que usa la API).
+        """
+        import numpy as np
+
+        unica = isinstance(sentences, str)
+        frases = [sentences] if unica else list(sentences)
+        if self.do_lower_case:
+            frases = [frase.lower() for frase in frases]
+
+        # Por longitud, para rellenar lo mínimo en cada lote
+        orden = sorted(range(len(frases)), key=lambda i: -len(frases[i]))
+        vectores = [None] * len(frases)
+        for inicio in range(0, len(orden), max(batch_size, 1)):
+            indices = orden[inicio:inicio + batch_size]
+            tokens = self.tokenizer(
+                [frases[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            salida = self.sesion.run(
+                None,
+                {
+                    "input_ids": tokens["input_ids"].astype(np.int64),
+                    "attention_mask": tokens["attention_mask"].astype(np.int64),
+                },
+            )[0]
+            for i, vector in zip(indices, salida):
+                vectores[i] = vector
+
+        embeddings = np.stack(vectores).astype(np.float32) if vectores else np.zeros((0, 0), np.float32)
+        if self.normalizar or normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        if convert_to_tensor:
+            import torch
+            embeddings = torch.from_numpy(embeddings)
+        if unica:
+            return embeddings[0]
+        return embeddings
@@ -1,13 +1,61 @@
-from sentence_transformers import SentenceTransformer, util
-import spacy
 import os
+import random
+import threading
+
+import numpy as np
+
+import registro_modelos
+from cache_sujetos import get_cache_sujetos
+from embeddings_texto import get_almacen_embeddings
 
 # Forzar uso de CPU si hay incompatibilidad CUDA
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
-nlp = spacy.load("es_core_news_sm")
+# Traza de chunks y tokens en cada extracción de sujeto (EVALUADOR_DEBUG=1)
+DEBUG_SUJETOS = os.getenv('EVALUADOR_DEBUG', '0') == '1'
+
+# Nivel léxico antes del encoder (ver nivel_lexico). Las bandas se calibran
+# con calibrar_lexico.py para el umbral EVAL_LEXICO_UMBRAL; está apagado por
+# defecto hasta fijar EVAL_LEXICO_ACEPTAR con esa calibración. Rechazar está
+# apagado (-1) por defecto: una paráfrasis con sinónimos puede no compartir
+# ningún lema y aun así superar el umbral con el encoder.
+LEXICO_ACTIVO = os.getenv('EVAL_LEXICO', '0') == '1'
+LEXICO_ACEPTAR = float(os.getenv('EVAL_LEXICO_ACEPTAR', '0.8'))
+LEXICO_RECHAZAR = float(os.getenv('EVAL_LEXICO_RECHAZAR', '-1'))
+LEXICO_UMBRAL = float(os.getenv('EVAL_LEXICO_UMBRAL', '0.6'))
+# Fracción de decisiones léxicas que también se verifican con el encoder
+LEXICO_MUESTREO = float(os.getenv('EVAL_LEXICO_MUESTREO', '0'))
+
+# Negaciones: spaCy las marca como stopwords, pero cambian el sentido de la
+# frase ("el perro no come"); se conservan entre los lemas de contenido
+NEGACIONES = frozenset({"no", "ni", "nunca", "jamás", "tampoco", "nada", "nadie", "ninguno", "sin"})
+
+# Quién decidió cada evaluación
+NIVEL_SUJETO = "sujeto_distinto"
+NIVEL_ACEPTAR = "lexico_aceptar"
+NIVEL_RECHAZAR = "lexico_rechazar"
+NIVEL_ENCODER = "encoder"
+
 
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", device='cpu')
+# spaCy y el SentenceTransformer viven en el registro compartido del proceso
+# (registro_modelos.py): se cargan una sola vez, en el primer uso.
+def get_nlp():
+    """Pipeline de spaCy en español compartido."""
+    return registro_modelos.get_nlp("evaluador")
+
+
+def get_modelo_similitud():
+    """SentenceTransformer multilingüe compartido para similitud semántica."""
+    return registro_modelos.get_sentence_transformer("evaluador")
+
+
+def __getattr__(nombre):
+    # Compatibilidad con el código que usaba los globales `nlp` y `model`
+    if nombre == "nlp":
+        return get_nlp()
+    if nombre == "model":
+        return get_modelo_similitud()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 GENERICOS = {
     "animal", "cosa", "ser", "objeto", "elemento", "lugar",
@@ -27,9 +75,8 @@ def similitud_semantica(texto1: str, texto2: str) -> float:
     Calcula la similitud semántica entre dos textos usando Sentence Transformers.
     Devuelve un valor aproximado entre 0 y 1.
     """
-    emb1 = model.encode(texto1, convert_to_tensor=True, device='cpu')
-    emb2 = model.encode(texto2, convert_to_tensor=True, device='cpu')
-    return util.cos_sim(emb1, emb2).item()
+    # Embeddings cacheados y codificados en lote (embeddings_texto.py)
+    return get_almacen_embeddings().similitud(texto1, texto2)
 
 
 def obtener_sujeto(frase: str):
@@ -38,24 +85,104 @@ def obtener_sujeto(frase: str):
     el sustantivo importante (burro, avión, río, montaña, sistema circulatorio, etc.).
     Captura sustantivos compuestos completos (noun chunks).
     No se usa el sujeto gramatical (yo, tú, él).
+    El resultado se memoiza por frase normalizada (cache_sujetos.py).
+    """
+    return _analizar_frase(frase)[0]
+
+
+def _analizar_frase(frase):
+    """(sujeto, lemas de contenido) de una frase, memoizado."""
+    return get_cache_sujetos("evaluador").memo(frase, lambda: _analisis_de_doc(get_nlp()(frase)))
+
+
+def analizar_frases(frases):
+    """
+    Sujeto y lemas de contenido de varias frases con una sola pasada de
+    `nlp.pipe` (cada frase distinta y no cacheada se analiza una vez).
+
+    Returns:
+        dict {frase: (sujeto o None, frozenset de lemas)}
+    """
+    cache = get_cache_sujetos("evaluador")
+    analisis = {}
+    faltantes = []
+    for frase in dict.fromkeys(frases):
+        encontrado, resultado = cache.obtener(frase)
+        if encontrado:
+            analisis[frase] = resultado
+        else:
+            faltantes.append(frase)
+
+    if faltantes:
+        for frase, doc in zip(faltantes, get_nlp().pipe(faltantes)):
+            analisis[frase] = _analisis_de_doc(doc)
+            cache.guardar(frase, analisis[frase])
+    return analisis
+
+
+def obtener_sujetos(frases):
+    """
+    Sujetos semánticos de varias frases (ver analizar_frases).
+
+    Returns:
+        dict {frase: sujeto o None}
     """
-    doc = nlp(frase)
+    return {frase: sujeto for frase, (sujeto, _) in analizar_frases(frases).items()}
+
+
+def precalcular_sujetos(frases):
+    """Cachea los sujetos de `frases` (ej: los captions del catálogo al arrancar)."""
+    analizar_frases(frases)
+
+
+def _analisis_de_doc(doc):
+    return _sujeto_de_doc(doc), lemas_contenido(doc)
+
+
+def lemas_contenido(doc):
+    """
+    Lemas en minúsculas de las palabras con contenido (sin stopwords ni
+    puntuación, salvo las NEGACIONES).
+    """
+    lemas = set()
+    for token in doc:
+        if not token.is_alpha:
+            continue
+        lema = token.lemma_.lower()
+        if token.lower_ in NEGACIONES:
+            lemas.add(token.lower_)
+        elif lema in NEGACIONES or not token.is_stop:
+            lemas.add(lema)
+    return frozenset(lemas)
+
+
+def negacion_distinta(lemas1, lemas2):
+    """True si una frase tiene una negación que la otra no (no decide el nivel léxico)."""
+    return bool((lemas1 ^ lemas2) & NEGACIONES)
+
+
+def _sujeto_de_doc(doc):
+    """Sujeto semántico de un Doc de spaCy ya analizado (ver obtener_sujeto)."""
     candidatos = []
     
-    print(f"\n🔍 DEBUG - Analizando frase: '{frase}'")
+    if DEBUG_SUJETOS:
+        print(f"\n🔍 DEBUG - Analizando frase: '{doc.text}'")
 
     # Primero intentar con noun chunks completos (captura "sistema circulatorio", "aparato digestivo", etc.)
     for chunk in doc.noun_chunks:
-        print(f"  📦 Chunk detectado: '{chunk.text}' | root: {chunk.root.text} | root.pos_: {chunk.root.pos_}")
+        if DEBUG_SUJETOS:
+            print(f"  📦 Chunk detectado: '{chunk.text}' | root: {chunk.root.text} | root.pos_: {chunk.root.pos_}")
         
         # Filtrar palabras genéricas del chunk y limitar a las primeras palabras importantes
         palabras_importantes = []
         for token in chunk:
-            print(f"    - Token: '{token.text}' | lemma: '{token.lemma_}' | pos: {token.pos_} | is_stop: {token.is_stop}")
+            if DEBUG_SUJETOS:
+                print(f"    - Token: '{token.text}' | lemma: '{token.lemma_}' | pos: {token.pos_} | is_stop: {token.is_stop}")
             
             # Detener si encontramos preposición, verbo o puntuación (marca fin del sujeto)
             if token.pos_ in ("ADP", "VERB", "PUNCT") or token.text in (":", ",", "en", "de", "con", "para"):
-                print(f"    ⛔ Deteniendo en: '{token.text}' (pos: {token.pos_})")
+                if DEBUG_SUJETOS:
+                    print(f"    ⛔ Deteniendo en: '{token.text}' (pos: {token.pos_})")
                 break
             
             if token.pos_ in ("NOUN", "PROPN", "ADJ") and not token.is_stop:
@@ -70,12 +197,14 @@ def obtener_sujeto(frase: str):
         if palabras_importantes:
             # Unir palabras importantes del chunk (ej: "sistema circulatorio")
             sujeto_compuesto = " ".join(palabras_importantes)
-            print(f"  ✅ Candidato encontrado: '{sujeto_compuesto}'")
+            if DEBUG_SUJETOS:
+                print(f"  ✅ Candidato encontrado: '{sujeto_compuesto}'")
             candidatos.append((chunk.start, sujeto_compuesto))
 
     # Si no encontramos chunks, buscar sustantivos individuales
     if not candidatos:
-        print("  ⚠️ No se encontraron chunks, buscando sustantivos individuales...")
+        if DEBUG_SUJETOS:
+            print("  ⚠️ No se encontraron chunks, buscando sustantivos individuales...")
         for token in doc:
             if token.pos_ in ("NOUN", "PROPN") and not token.is_stop:
                 lema = token.lemma_.lower()
@@ -83,37 +212,96 @@ def obtener_sujeto(frase: str):
                     candidatos.append((token.i, lema))
 
     if not candidatos:
-        print("  ❌ No se encontraron candidatos")
+        if DEBUG_SUJETOS:
+            print("  ❌ No se encontraron candidatos")
         return None
 
     # Retornar el primer candidato (más a la izquierda en la frase)
     candidatos.sort(key=lambda x: x[0])
     resultado = candidatos[0][1]
-    print(f"  🎯 Sujeto extraído: '{resultado}'\n")
+    if DEBUG_SUJETOS:
+        print(f"  🎯 Sujeto extraído: '{resultado}'\n")
     return resultado
 
 
-def evaluar_respuesta(texto_modelo: str, texto_nino: str, umbral: float = 0.6):
+# ============================================
+# ⚖️ Nivel léxico (antes del encoder)
+# ============================================
+
+def jaccard(lemas1, lemas2):
+    """Jaccard entre dos conjuntos de lemas (0 si ambos están vacíos)."""
+    union = lemas1 | lemas2
+    return len(lemas1 & lemas2) / len(union) if union else 0.0
+
+
+def nivel_lexico(indice, umbral, aceptar=None, rechazar=None):
     """
-    Evalúa la respuesta del niño comparándola con el texto del modelo.
+    Decide con el Jaccard de lemas cuando el resultado ya es seguro:
+    - indice >= aceptar: copia casi literal -> correcta
+    - indice <= rechazar: casi sin palabras en común -> incorrecta
+    En la banda intermedia (o si el umbral pedido es más exigente/permisivo
+    que el de la calibración) devuelve None y decide el encoder.
 
-    Flujo:
-      1. Se obtiene el sujeto SEMÁNTICO de cada texto.
-      2. Si los sujetos son distintos (o falta alguno), la respuesta es incorrecta.
-      3. Si los sujetos son iguales, se calcula la similitud semántica.
-      4. Si la similitud >= umbral, se considera correcta.
+    Returns:
+        NIVEL_ACEPTAR, NIVEL_RECHAZAR o None
     """
+    if not LEXICO_ACTIVO:
+        return None
+    aceptar = LEXICO_ACEPTAR if aceptar is None else aceptar
+    rechazar = LEXICO_RECHAZAR if rechazar is None else rechazar
+    # Aceptar solo vale si el umbral no es más alto que el calibrado, y
+    # rechazar si no es más bajo
+    if indice >= aceptar and umbral <= LEXICO_UMBRAL:
+        return NIVEL_ACEPTAR
+    if indice <= rechazar and umbral >= LEXICO_UMBRAL:
+        return NIVEL_RECHAZAR
+    return None
 
-    sujeto_modelo = obtener_sujeto(texto_modelo)
-    sujeto_nino = obtener_sujeto(texto_nino)
 
-    sujeto_igual = (
-        sujeto_modelo is not None
-        and sujeto_nino is not None
-        and sujeto_modelo == sujeto_nino
-    )
+_niveles_lock = threading.Lock()
+_niveles = {NIVEL_SUJETO: 0, NIVEL_ACEPTAR: 0, NIVEL_RECHAZAR: 0, NIVEL_ENCODER: 0}
+_verificadas = 0
+_coincidencias = 0
 
-    if not sujeto_igual:
+
+def _contar_nivel(nivel):
+    with _niveles_lock:
+        _niveles[nivel] += 1
+
+
+def _contar_verificacion(coincide):
+    global _verificadas, _coincidencias
+    with _niveles_lock:
+        _verificadas += 1
+        _coincidencias += int(coincide)
+
+
+def stats_niveles():
+    """Cuántas evaluaciones decidió cada nivel y acuerdo del léxico con el encoder (para /stats)."""
+    with _niveles_lock:
+        total = sum(_niveles.values())
+        return {
+            "decisiones": dict(_niveles),
+            "fraccion": {nivel: round(n / total, 4) if total else 0.0 for nivel, n in _niveles.items()},
+            "bandas": {"aceptar": LEXICO_ACEPTAR, "rechazar": LEXICO_RECHAZAR,
+                       "umbral": LEXICO_UMBRAL, "activo": LEXICO_ACTIVO},
+            "verificadas_con_encoder": _verificadas,
+            "acuerdo_con_encoder": round(_coincidencias / _verificadas, 4) if _verificadas else None,
+        }
+
+
+def _resultado(texto_modelo, texto_nino, sujeto_modelo, sujeto_nino, sim, umbral, nivel, indice_lexico=None):
+    """
+    Arma el resultado de una evaluación.
+
+    `similitud` es siempre la del encoder (coseno + 0.15 por sujeto igual) y
+    es None si el encoder no corrió (decisión léxica sin muestreo);
+    `indice_lexico` es el Jaccard de lemas (None si no se calculó). En los
+    niveles léxicos la decisión es la del nivel.
+    """
+    _contar_nivel(nivel)
+
+    if nivel == NIVEL_SUJETO:
         return {
             "texto_modelo": texto_modelo,
             "texto_nino": texto_nino,
@@ -121,15 +309,22 @@ def evaluar_respuesta(texto_modelo: str, texto_nino: str, umbral: float = 0.6):
             "sujeto_nino": sujeto_nino,
             "sujeto_igual": False,
             "similitud": 0.0,
+            "indice_lexico": None,
             "umbral": umbral,
             "es_correcta": False,
+            "nivel": nivel,
         }
 
-    sim = similitud_semantica(texto_modelo, texto_nino)
-    
     # Bonus de 0.15 cuando los sujetos coinciden
-    sim_con_bonus = min(sim + 0.15, 1.0)
-    es_correcta = sim_con_bonus >= umbral
+    similitud = min(sim + 0.15, 1.0) if sim is not None else None
+    if nivel == NIVEL_ENCODER:
+        es_correcta = similitud >= umbral
+    else:
+        es_correcta = nivel == NIVEL_ACEPTAR
+
+        # Verificación por muestreo del nivel léxico contra el encoder
+        if similitud is not None:
+            _contar_verificacion((similitud >= umbral) == es_correcta)
 
     return {
         "texto_modelo": texto_modelo,
@@ -137,7 +332,108 @@ def evaluar_respuesta(texto_modelo: str, texto_nino: str, umbral: float = 0.6):
         "sujeto_modelo": sujeto_modelo,
         "sujeto_nino": sujeto_nino,
         "sujeto_igual": True,
-        "similitud": sim_con_bonus,
+        "similitud": similitud,
+        "indice_lexico": indice_lexico,
         "umbral": umbral,
         "es_correcta": es_correcta,
+        "nivel": nivel,
     }
+
+
+def _clasificar(analisis_modelo, analisis_nino, umbral):
+    """
+    Nivel que decide un par y su Jaccard de lemas.
+
+    Returns:
+        tuple (nivel, indice_lexico, usar_encoder)
+    """
+    sujeto_modelo, lemas_modelo = analisis_modelo
+    sujeto_nino, lemas_nino = analisis_nino
+    if sujeto_modelo is None or sujeto_modelo != sujeto_nino:
+        return NIVEL_SUJETO, None, False
+
+    indice = jaccard(lemas_modelo, lemas_nino)
+    # Una copia negada comparte casi todos los lemas: la decide el encoder
+    nivel = None if negacion_distinta(lemas_modelo, lemas_nino) else nivel_lexico(indice, umbral)
+    if nivel is None:
+        return NIVEL_ENCODER, indice, True
+    return nivel, indice, random.random() < LEXICO_MUESTREO
+
+
+def evaluar_respuesta(texto_modelo: str, texto_nino: str, umbral: float = 0.6):
+    """
+    Evalúa la respuesta del niño comparándola con el texto del modelo.
+
+    Flujo:
+      1. Se obtiene el sujeto SEMÁNTICO de cada texto.
+      2. Si los sujetos son distintos (o falta alguno), la respuesta es incorrecta.
+      3. Si los sujetos son iguales, el nivel léxico (Jaccard de lemas)
+         decide los casos seguros: copia casi literal o casi sin palabras
+         en común.
+      4. Si no, se calcula la similitud semántica con el encoder y se
+         considera correcta si similitud >= umbral.
+    """
+    analisis_modelo = _analizar_frase(texto_modelo)
+    analisis_nino = _analizar_frase(texto_nino)
+
+    nivel, indice, usar_encoder = _clasificar(analisis_modelo, analisis_nino, umbral)
+    sim = similitud_semantica(texto_modelo, texto_nino) if usar_encoder else None
+
+    return _resultado(
+        texto_modelo, texto_nino, analisis_modelo[0], analisis_nino[0],
+        sim, umbral, nivel, indice
+    )
+
+
+def evaluar_respuestas_lote(pares, umbral: float = 0.6):
+    """
+    Evalúa muchos pares (texto_modelo, texto_nino) a la vez, con el mismo
+    criterio que evaluar_respuesta().
+
+    En lugar de dos análisis de spaCy y dos encode por par:
+      1. Todas las frases distintas pasan por `nlp.pipe` una sola vez.
+      2. Los textos distintos de los pares que llegan al encoder se
+         codifican en una sola llamada a encode (los que ya están en cache
+         no se codifican).
+      3. Las similitudes salen de un solo producto de matrices entre los
+         vectores normalizados.
+
+    Args:
+        pares: Lista de tuplas (texto_modelo, texto_nino)
+        umbral: Umbral de similitud (con el bonus por sujeto igual)
+
+    Returns:
+        list de dicts con el mismo formato que evaluar_respuesta(), en el
+        orden de `pares`
+    """
+    if not pares:
+        return []
+
+    analisis = analizar_frases([texto for par in pares for texto in par])
+    clasificacion = [
+        _clasificar(analisis[texto_modelo], analisis[texto_nino], umbral)
+        for texto_modelo, texto_nino in pares
+    ]
+
+    # Solo se necesita la similitud de los pares que usan el encoder
+    con_encoder = [i for i, (_, _, usar_encoder) in enumerate(clasificacion) if usar_encoder]
+
+    similitudes = {}
+    if con_encoder:
+        textos = list(dict.fromkeys(texto for i in con_encoder for texto in pares[i]))
+        indice = {texto: j for j, texto in enumerate(textos)}
+        vectores = get_almacen_embeddings().vectores(textos)
+        # Vectores normalizados: la matriz de cosenos es un solo producto
+        cosenos = vectores @ vectores.T
+        filas = np.array([indice[pares[i][0]] for i in con_encoder])
+        columnas = np.array([indice[pares[i][1]] for i in con_encoder])
+        similitudes = dict(zip(con_encoder, cosenos[filas, columnas].tolist()))
+
+    return [
+        _resultado(
+            texto_modelo, texto_nino,
+            analisis[texto_modelo][0], analisis[texto_nino][0],
+            similitudes.get(i), umbral, nivel, indice_lexico
+        )
+        for i, ((texto_modelo, texto_nino), (nivel, indice_lexico, _)) in enumerate(zip(pares, clasificacion))
+    ]
@@ -0,0 +1,46 @@
+"""
+Exporta los checkpoints BLIP a ONNX (float32 + INT8) para BLIP_BACKEND=onnx.
+
+No es obligatorio: con BLIP_BACKEND=onnx el export se hace solo en el
+primer arranque. Este script permite hacerlo antes (ej: en la PC de
+desarrollo) y copiar BLIP_ONNX_DIR a la Raspberry Pi.
+
+Uso:
+    python exportar_onnx.py [checkpoint1 checkpoint2 ...] [--sin-int8]
+
+Sin checkpoints se exportan BLIP_MODEL_PATH y BLIP_MODEL_CARACTERISTICAS_PATH.
+"""
+
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from blip.onnx_backend import exportar_onnx, ruta_onnx
+
+load_dotenv()
+
+
+def main(argumentos):
+    int8 = "--sin-int8" not in argumentos
+    checkpoints = [a for a in argumentos if not a.startswith("--")] or [
+        os.getenv('BLIP_MODEL_PATH', 'blip-final-5'),
+        os.getenv('BLIP_MODEL_CARACTERISTICAS_PATH', 'blip-characteristics'),
+    ]
+
+    for checkpoint in checkpoints:
+        if not os.path.isdir(checkpoint):
+            print(f"⚠️ {checkpoint} no existe, se omite")
+            continue
+        inicio = time.perf_counter()
+        destino = exportar_onnx(checkpoint, ruta_onnx(checkpoint), int8=int8)
+        print(f"   ⏱️ {time.perf_counter() - inicio:.1f} s")
+        for archivo in sorted(os.listdir(destino)):
+            if archivo.endswith(".onnx"):
+                tamano = os.path.getsize(os.path.join(destino, archivo)) / 2**20
+                print(f"   📦 {archivo}: {tamano:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
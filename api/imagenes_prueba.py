@@ -0,0 +1,19 @@
+"""
+Imágenes sintéticas para los tests de paridad y los benchmarks del modelo.
+
+Se usan cuando no se pasan imágenes reales: cubren tamaños y proporciones
+distintos (apaisada, vertical, ya cuadrada a 384 y una grande con ruido).
+"""
+
+from PIL import Image
+
+
+def imagenes_sinteticas():
+    """Imágenes de distintos tamaños/proporciones para cuando no se pasan archivos."""
+    degradado = Image.radial_gradient("L").convert("RGB")
+    return [
+        degradado.resize((640, 480)),
+        degradado.resize((300, 500)),
+        Image.new("RGB", (384, 384), (30, 200, 90)),
+        Image.effect_noise((1024, 768), 60).convert("RGB"),
+    ]
@@ -0,0 +1,204 @@
+# inference_executor.py - Ejecutor de inferencia fuera del event loop
+"""
+Ejecutor dedicado para correr la inferencia BLIP fuera del event loop de uvicorn.
+
+Los handlers de FastAPI son `async def`, así que una llamada directa a
+`quick_generate` (varios segundos de CPU) congela el event loop y todas las
+demás peticiones (incluso /ping y /health) esperan detrás de ella.
+
+Este módulo ofrece:
+- Un pool de hilos acotado (BLIP_INFERENCE_WORKERS)
+- Una cola de espera acotada (BLIP_INFERENCE_MAX_PENDING) -> 503 si se llena
+- Una API `await executor.submit(fn, *args)` para los handlers
+- Deadline por petición (BLIP_INFERENCE_TIMEOUT) -> 504
+- Cancelación si el cliente se desconecta antes de que empiece la inferencia
+
+Uso:
+    from inference_executor import get_inference_executor
+    caption = await get_inference_executor().submit(quick_generate, imagen, request=request)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceError(Exception):
+    """Error base del ejecutor de inferencia."""
+
+
+class ExecutorSaturado(InferenceError):
+    """La cola de inferencia está llena; el cliente debe reintentar."""
+
+
+class InferenceTimeout(InferenceError):
+    """La inferencia superó el deadline de la petición."""
+
+
+class ClienteDesconectado(InferenceError):
+    """El cliente cerró la conexión antes de terminar la inferencia."""
+
+
+class InferenceExecutor:
+    """
+    Pool de hilos acotado con API awaitable para la inferencia de modelos.
+
+    Los modelos (PyTorch) liberan el GIL durante el cómputo, así que varios
+    dispositivos del aula se atienden en paralelo mientras el event loop
+    sigue libre para /ping y /health.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, timeout=120.0, poll_interval=0.5):
+        """
+        Args:
+            max_workers: Número de hilos de inferencia
+            max_pending: Máximo de peticiones en curso (ejecutando + en cola)
+            timeout: Deadline por defecto en segundos (None = sin límite)
+            poll_interval: Cada cuántos segundos se revisa si el cliente se desconectó
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="blip-inferencia"
+        )
+        self._lock = threading.Lock()
+        self._pendientes = 0
+
+        # Métricas simples
+        self._completadas = 0
+        self._rechazadas = 0
+        self._timeouts = 0
+        self._canceladas = 0
+
+    async def submit(self, fn, *args, timeout=None, request=None, **kwargs):
+        """
+        Ejecuta `fn(*args, **kwargs)` en el pool y espera su resultado.
+
+        Args:
+            fn: Función síncrona a ejecutar (ej: quick_generate)
+            timeout: Deadline en segundos (default: el del ejecutor)
+            request: Request de FastAPI para detectar desconexión del cliente
+
+        Returns:
+            El valor retornado por `fn`
+
+        Raises:
+            ExecutorSaturado: Si ya hay `max_pending` peticiones en curso
+            InferenceTimeout: Si se supera el deadline
+            ClienteDesconectado: Si el cliente cerró la conexión
+        """
+        with self._lock:
+            if self._pendientes >= self.max_pending:
+                self._rechazadas += 1
+                raise ExecutorSaturado(
+                    f"Cola de inferencia llena ({self.max_pending} peticiones en curso)"
+                )
+            self._pendientes += 1
+
+        if timeout is None:
+            timeout = self.timeout
+
+        loop = asyncio.get_running_loop()
+        futuro = self._pool.submit(fn, *args, **kwargs)
+        futuro.add_done_callback(self._liberar)
+        resultado = asyncio.wrap_future(futuro, loop=loop)
+
+        tareas = {resultado}
+        vigilante = None
+        if request is not None:
+            vigilante = asyncio.ensure_future(self._esperar_desconexion(request))
+            tareas.add(vigilante)
+
+        try:
+            hechas, _ = await asyncio.wait(
+                tareas,
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if resultado in hechas:
+                self._completadas += 1
+                return resultado.result()
+
+            # Si la inferencia aún no empezó, cancel() la saca de la cola.
+            # Si ya está corriendo no se puede interrumpir el hilo, pero su
+            # resultado se descarta y el slot se libera al terminar.
+            futuro.cancel()
+
+            if vigilante is not None and vigilante in hechas:
+                self._canceladas += 1
+                raise ClienteDesconectado("El cliente cerró la conexión")
+
+            self._timeouts += 1
+            raise InferenceTimeout(f"La inferencia superó el límite de {timeout:g}s")
+        finally:
+            if vigilante is not None:
+                vigilante.cancel()
+
+    async def _esperar_desconexion(self, request):
+        """Termina cuando el cliente se desconecta."""
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.poll_interval)
+
+    def _liberar(self, _futuro):
+        with self._lock:
+            self._pendientes -= 1
+
+    def stats(self):
+        """Estado actual del ejecutor (para /health)."""
+        with self._lock:
+            pendientes = self._pendientes
+        return {
+            "workers": self.max_workers,
+            "max_pendientes": self.max_pending,
+            "en_curso": pendientes,
+            "completadas": self._completadas,
+            "rechazadas": self._rechazadas,
+            "timeouts": self._timeouts,
+            "canceladas": self._canceladas,
+        }
+
+    def shutdown(self, wait=False):
+        """Cierra el pool (se llama al apagar el servidor)."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_executor = None
+_global_executor_lock = threading.Lock()
+
+
+def get_inference_executor():
+    """
+    Obtiene o crea el ejecutor global de inferencia.
+
+    Configuración desde .env:
+        BLIP_INFERENCE_WORKERS: Hilos de inferencia (default: max(2, BLIP_BATCH_MAX_SIZE))
+        BLIP_INFERENCE_MAX_PENDING: Peticiones en curso máximas (default: 16)
+        BLIP_INFERENCE_TIMEOUT: Deadline por petición en segundos (default: 120, 0 = sin límite)
+
+    Returns:
+        InferenceExecutor: Ejecutor compartido por todos los endpoints
+    """
+    global _global_executor
+    if _global_executor is None:
+        with _global_executor_lock:
+            if _global_executor is None:
+                timeout = float(os.getenv('BLIP_INFERENCE_TIMEOUT', '120'))
+                # Con micro-batching los hilos solo esperan su lote: hacen falta
+                # al menos BLIP_BATCH_MAX_SIZE hilos para poder llenar un lote
+                workers_por_defecto = max(2, int(os.getenv('BLIP_BATCH_MAX_SIZE', '8')))
+                _global_executor = InferenceExecutor(
+                    max_workers=int(os.getenv('BLIP_INFERENCE_WORKERS', str(workers_por_defecto))),
+                    max_pending=int(os.getenv('BLIP_INFERENCE_MAX_PENDING', '16')),
+                    timeout=timeout if timeout > 0 else None,
+                )
+    return _global_executor
@@ -0,0 +1,141 @@
+"""
+============================================
+📥 Ingesta unificada de imágenes
+============================================
+
+/predict, /validar-reto y /validar-caracteristicas reciben una foto subida
+por la app. Antes cada endpoint hacía su propio `await image.read()` +
+`Image.open(...)`, con validaciones distintas, sin límite de tamaño y sin
+respetar la orientación EXIF.
+
+Este módulo hace todo en un solo lugar:
+1. Lectura acotada del upload (BLIP_MAX_UPLOAD_MB) -> 413 si se pasa
+2. Detección del formato por sus bytes mágicos (no por content-type ni
+   extensión, que la app no siempre manda bien) -> 415 si no es imagen
+3. Decodificación UNA sola vez en un hilo (no bloquea el event loop),
+   directamente a la resolución del modelo (blip/decodificacion.py)
+4. Orientación EXIF y conversión a RGB
+5. Tiempos por etapa (lectura / decodificación) para ver cuánto de cada
+   petición es I/O, decodificación o inferencia
+
+Uso:
+    ingesta = await ingerir_imagen(image)
+    caption = quick_generate(ingesta.imagen)
+    ingesta.tiempos_ms  # {"lectura": 3.1, "decodificacion": 14.2}
+"""
+
+import asyncio
+import os
+import time
+
+from fastapi import HTTPException, UploadFile
+
+from blip.decodificacion import decodificar_imagen, ImagenDemasiadoGrande
+
+# Firma de bytes -> formato
+FIRMAS = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+)
+
+
+def detectar_formato(datos):
+    """
+    Detecta el formato de imagen por sus bytes mágicos.
+
+    Returns:
+        str ("JPEG", "PNG", "WEBP", "GIF", "BMP") o None si no es una imagen soportada
+    """
+    if datos[:4] == b"RIFF" and datos[8:12] == b"WEBP":
+        return "WEBP"
+    for firma, formato in FIRMAS:
+        if datos.startswith(firma):
+            return formato
+    return None
+
+
+def max_bytes_upload():
+    """
+    Tamaño máximo de un upload.
+
+    Configuración desde .env:
+        BLIP_MAX_UPLOAD_MB: Megabytes máximos por imagen (default: 10)
+    """
+    return int(float(os.getenv('BLIP_MAX_UPLOAD_MB', '10')) * 2**20)
+
+
+class ImagenIngerida:
+    """Imagen lista para el modelo + información de la ingesta."""
+
+    __slots__ = ("imagen", "formato", "bytes", "tiempos_ms")
+
+    def __init__(self, imagen, formato, num_bytes, tiempos_ms):
+        self.imagen = imagen          # PIL Image RGB, ya decodificada y orientada
+        self.formato = formato
+        self.bytes = num_bytes
+        self.tiempos_ms = tiempos_ms
+
+
+def _decodificar(datos):
+    imagen = decodificar_imagen(datos)
+    # Forzar la decodificación aquí (en el hilo), no en el modelo
+    imagen.load()
+    return imagen
+
+
+async def ingerir_imagen(upload: UploadFile) -> ImagenIngerida:
+    """
+    Lee, valida y decodifica una imagen subida.
+
+    Args:
+        upload: Archivo recibido por FastAPI
+
+    Returns:
+        ImagenIngerida
+
+    Raises:
+        HTTPException: 413 (muy grande), 415 (no es una imagen soportada)
+            o 400 (imagen corrupta)
+    """
+    limite = max_bytes_upload()
+
+    # 1. Lectura acotada: nunca se lee más de limite + 1 bytes
+    inicio = time.perf_counter()
+    datos = await upload.read(limite + 1)
+    fin_lectura = time.perf_counter()
+
+    if len(datos) > limite:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Imagen demasiado grande (máximo {limite / 2**20:g} MB)",
+        )
+
+    # 2. Formato por bytes mágicos
+    formato = detectar_formato(datos)
+    if formato is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Formato no soportado: {upload.content_type or 'desconocido'}",
+        )
+
+    # 3-4. Decodificar una sola vez, fuera del event loop
+    try:
+        imagen = await asyncio.to_thread(_decodificar, datos)
+    except ImagenDemasiadoGrande as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Imagen inválida")
+    fin_decodificacion = time.perf_counter()
+
+    return ImagenIngerida(
+        imagen,
+        formato,
+        len(datos),
+        {
+            "lectura": round(1000 * (fin_lectura - inicio), 2),
+            "decodificacion": round(1000 * (fin_decodificacion - fin_lectura), 2),
+        },
+    )
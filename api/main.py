@@ -3,13 +3,17 @@ import os
 # Forzar uso de CPU (GPU RTX 5070 Ti no compatible con PyTorch actual)
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from PIL import Image
-import io
-from blip import quick_generate
+from ingesta import ingerir_imagen
+from inference_executor import (
+    get_inference_executor,
+    ExecutorSaturado,
+    InferenceTimeout,
+    ClienteDesconectado,
+)
 
 app = FastAPI(
     title="BLIP Caption API", 
@@ -28,21 +32,46 @@ app.add_middleware(
 
 print("🚀 BLIP Caption API iniciada")
 print("📋 Configuración: Python 3.11.9 + Transformers 4.53.2")
-print("🎯 El modelo se cargará automáticamente al primer uso")
+print("🎯 Los modelos se cargan en segundo plano al arrancar (ver GET /ready)")
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Precargar el modelo al iniciar el servidor"""
+    """Precargar y calentar todos los modelos en paralelo, sin bloquear el arranque"""
     try:
-        print("⏳ Precargando modelo BLIP...")
-        # Importar directamente desde el módulo
-        from blip.generation import get_global_generator
-        get_global_generator()  # Esto carga el modelo en memoria
-        print("✅ Modelo BLIP precargado exitosamente")
+        from arranque import get_orquestador
+        get_orquestador().iniciar()
     except Exception as e:
-        print(f"⚠️ Error precargando modelo: {e}")
-        print("💡 El modelo se cargará en la primera petición")
+        print(f"⚠️ Error iniciando la precarga de modelos: {e}")
+        print("💡 Los modelos se cargarán en la primera petición")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cerrar el pool de inferencia al apagar el servidor"""
+    get_inference_executor().shutdown()
+
+
+async def ejecutar_inferencia(request: Request, fn, *args, **kwargs):
+    """
+    Ejecuta una función de inferencia en el pool dedicado, sin bloquear el event loop.
+
+    Traduce los errores del ejecutor a códigos HTTP:
+    - 503: Cola de inferencia llena
+    - 504: Se superó el deadline de la petición
+    - 499: El cliente cerró la conexión
+    """
+    try:
+        return await get_inference_executor().submit(fn, *args, request=request, **kwargs)
+    except ExecutorSaturado as e:
+        print(f"⚠️ {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except InferenceTimeout as e:
+        print(f"⏰ {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClienteDesconectado as e:
+        print(f"🔌 {e}")
+        raise HTTPException(status_code=499, detail=str(e))
 
 
 @app.get("/")
@@ -50,22 +79,36 @@ def root():
     return {
         "message": "API de BLIP funcionando. Usa POST /predict para enviar una imagen.",
         "endpoints": {
-            "predict": "POST /predict - Genera caption para una imagen",
-            "health": "GET /health - Verifica estado del modelo"
+            "predict": "POST /predict - Genera caption para una imagen (mode=title para solo el título, mode=catalog/hybrid para captions conocidos)",
+            "health": "GET /health - Verifica estado del modelo",
+            "evaluate_batch": "POST /evaluate-batch - Evalúa muchos pares (texto_modelo, texto_nino) en una sola petición",
+            "ready": "GET /ready - 200 cuando todos los modelos están cargados y calientes (503 mientras tanto)",
+            "stats": "GET /stats - Métricas de inferencia y cache"
         }
     }
 
 
+@app.get("/ready")
+def ready():
+    """Estado de carga de cada modelo; 503 hasta que todos estén listos"""
+    from arranque import get_orquestador
+    estado = get_orquestador().estado()
+    return JSONResponse(status_code=200 if estado["listo"] else 503, content=estado)
+
+
 @app.get("/health")
 def health_check():
     """Endpoint para verificar que el modelo esté cargado"""
     try:
-        from blip.generation import get_global_generator
+        from blip.generation import get_global_generator, get_planificador
         generator = get_global_generator()
+        planificador = get_planificador(generator)
         return {
             "status": "healthy",
             "model_loaded": True,
-            "message": "Modelo BLIP listo para generar captions"
+            "message": "Modelo BLIP listo para generar captions",
+            "inferencia": get_inference_executor().stats(),
+            "lotes": planificador.stats() if planificador else None
         }
     except Exception as e:
         return {
@@ -76,48 +119,49 @@ def health_check():
 
 
 @app.post("/predict")
-async def predict(image: UploadFile = File(...)):
+async def predict(
+    request: Request,
+    image: UploadFile = File(...),
+    mode: str = Form("full")
+):
+    """
+    Genera el caption de una imagen.
+    
+    - mode: "full" (caption completo, default), "title" (solo el título;
+      la generación se detiene al emitir ':' y es mucho más rápida) o
+      "catalog" (elige el caption conocido más probable con una sola pasada
+      del decoder; si la confianza es baja genera libremente) o "hybrid"
+      (genera hasta que el prefijo identifica un caption conocido y lo completa)
+    """
     # 🔥 OPTIMIZACIÓN: Logs reducidos para menos overhead
-    print(f"\n🔄 /predict - {image.filename}")
-    
-    # Validar tipo de archivo (aceptar todos los formatos comunes)
-    allowed_types = [
-        "image/png", 
-        "image/jpeg", 
-        "image/jpg", 
-        "image/pjpeg",
-        "application/octet-stream"
-    ]
-    
-    # Verificar por extensión si el content-type no es reconocido
-    if image.content_type not in allowed_types:
-        if not (image.filename and any(image.filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png'])):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Formato no soportado: {image.content_type}",
-            )
-
-    # 🔥 OPTIMIZACIÓN: Leer y procesar en un solo paso
-    try:
-        file_bytes = await image.read()
-        # No convertir a RGB aquí - lo hace generate_caption() si es necesario
-        pil_image = Image.open(io.BytesIO(file_bytes))
-    except Exception as e:
+    print(f"\n🔄 /predict - {image.filename} (modo: {mode})")
+    
+    from blip.generation import MODOS_PREDICCION
+    if mode not in MODOS_PREDICCION:
         raise HTTPException(
             status_code=400,
-            detail="Imagen inválida",
+            detail=f"Modo no soportado: {mode}. Usa uno de {list(MODOS_PREDICCION)}",
         )
+    
+    # 🔥 OPTIMIZACIÓN: Leer, validar (bytes mágicos) y decodificar en un hilo
+    ingesta = await ingerir_imagen(image)
+    pil_image = ingesta.imagen
 
     # Generar caption
     try:
         import time
         start_time = time.time()
         
-        caption = quick_generate(pil_image)
+        from blip.generation import quick_generate_detallado
+        resultado = await ejecutar_inferencia(request, quick_generate_detallado, pil_image, mode=mode)
+        caption = resultado["caption"]
         processing_time = time.time() - start_time
         
         # Extraer el título (texto antes de los dos puntos)
-        title = caption.split(':', 1)[0].strip() if ':' in caption else caption.strip()
+        from blip.generation import extraer_titulo
+        title = extraer_titulo(caption)
+        
+        tiempos_ms = dict(ingesta.tiempos_ms, inferencia=round(1000 * processing_time, 2))
         
         print(f"✅ {processing_time:.2f}s - Título: {title} - {caption[:50]}...")
         
@@ -125,12 +169,18 @@ async def predict(image: UploadFile = File(...)):
             content={
                 "caption": caption,
                 "title": title,
+                "mode": mode,
+                "camino": resultado["camino"],
+                "confianza": resultado["confianza"],
                 "status": "success",
-                "processing_time_seconds": round(processing_time, 2)
+                "processing_time_seconds": round(processing_time, 2),
+                "tiempos_ms": tiempos_ms
             },
             media_type="application/json; charset=utf-8"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         raise HTTPException(
@@ -139,6 +189,38 @@ async def predict(image: UploadFile = File(...)):
         )
 
 
+@app.get("/stats")
+def stats():
+    """Métricas de rendimiento: inferencia, lotes, caches, duplicados perceptuales y memoria"""
+    from blip.generation import get_planificadores_stats
+    from blip.cache import get_cache_captions
+    from blip.phash import get_indices_stats
+    from blip.cache_visual import get_cache_embeddings
+    from blip.generation import get_reporte_pesos_compartidos, get_reportes_calentamiento
+    from registro_modelos import get_registro
+    from embeddings_texto import get_almacen_embeddings_stats
+    from cache_sujetos import get_caches_sujetos_stats
+    from activities.evaluator_game import stats_lexico
+    from evaluador import stats_niveles
+    
+    cache = get_cache_captions()
+    cache_embeddings = get_cache_embeddings()
+    return {
+        "inferencia": get_inference_executor().stats(),
+        "lotes": get_planificadores_stats(),
+        "cache": cache.stats() if cache else None,
+        "duplicados_perceptuales": get_indices_stats(),
+        "embeddings_visuales": cache_embeddings.stats() if cache_embeddings else None,
+        "pesos_compartidos": get_reporte_pesos_compartidos(),
+        "calentamiento": get_reportes_calentamiento(),
+        "modelos_texto": get_registro().stats(),
+        "embeddings_texto": get_almacen_embeddings_stats(),
+        "sujetos": get_caches_sujetos_stats(),
+        "lexico_sujetos": stats_lexico(),
+        "niveles_evaluacion": stats_niveles()
+    }
+
+
 @app.get("/ping")
 def ping():
     """Endpoint simple para verificar conectividad"""
@@ -156,6 +238,11 @@ class EvaluacionRequest(BaseModel):
     umbral: float = 0.6
 
 
+def _redondear(valor, decimales=4):
+    """round() que deja pasar None (campos que no se calcularon)."""
+    return round(valor, decimales) if valor is not None else None
+
+
 @app.post("/evaluate")
 async def evaluate(request: EvaluacionRequest):
     """
@@ -168,7 +255,10 @@ async def evaluate(request: EvaluacionRequest):
     Retorna:
     - mensaje: "¡Felicidades, respuesta correcta!" o "¡Inténtalo de nuevo!"
     - es_correcta: True/False
-    - detalles: Información adicional sobre la evaluación
+    - detalles: Información adicional sobre la evaluación (nivel: quién
+      decidió: "sujeto_distinto", "lexico_aceptar", "lexico_rechazar" o "encoder";
+      similitud: la del encoder, null si no corrió; indice_lexico: Jaccard de
+      lemas, null si no se calculó)
     """
     print(f"\n🔍 /evaluate - Umbral: {request.umbral}")
     
@@ -190,10 +280,11 @@ async def evaluate(request: EvaluacionRequest):
         # Determinar el mensaje según el resultado
         if resultado['es_correcta']:
             mensaje = "¡Felicidades, respuesta correcta!"
-            print(f"✅ {processing_time:.2f}s - Similitud: {resultado['similitud']:.3f}")
         else:
             mensaje = "¡Inténtalo de nuevo!"
-            print(f"❌ {processing_time:.2f}s - Similitud: {resultado['similitud']:.3f}")
+        print(f"{'✅' if resultado['es_correcta'] else '❌'} {processing_time:.2f}s - "
+              f"Similitud: {_redondear(resultado['similitud'])} - "
+              f"Índice léxico: {_redondear(resultado['indice_lexico'])} ({resultado['nivel']})")
         
         return JSONResponse(
             content={
@@ -203,8 +294,10 @@ async def evaluate(request: EvaluacionRequest):
                     "sujeto_modelo": resultado['sujeto_modelo'],
                     "sujeto_nino": resultado['sujeto_nino'],
                     "sujeto_igual": resultado['sujeto_igual'],
-                    "similitud": round(resultado['similitud'], 4),
-                    "umbral": resultado['umbral']
+                    "similitud": _redondear(resultado['similitud']),
+                    "indice_lexico": _redondear(resultado['indice_lexico']),
+                    "umbral": resultado['umbral'],
+                    "nivel": resultado['nivel']
                 },
                 "processing_time_seconds": round(processing_time, 2)
             },
@@ -225,6 +318,106 @@ async def evaluate(request: EvaluacionRequest):
         )
 
 
+class ParEvaluacion(BaseModel):
+    """Un par (texto del modelo, respuesta del niño) de una evaluación en lote"""
+    texto_modelo: str
+    texto_nino: str
+
+
+class EvaluacionLoteRequest(BaseModel):
+    """Modelo para la petición de evaluación en lote"""
+    pares: list[ParEvaluacion]
+    umbral: float = 0.6
+
+
+# Máximo de pares por petición a /evaluate-batch
+EVALUATE_BATCH_MAX = int(os.getenv('EVALUATE_BATCH_MAX', '512'))
+
+
+def _evaluar_lote_sync(pares, umbral):
+    from evaluador import evaluar_respuestas_lote
+    return evaluar_respuestas_lote(pares, umbral)
+
+
+@app.post("/evaluate-batch")
+async def evaluate_batch(request: Request, lote: EvaluacionLoteRequest):
+    """
+    Evalúa muchas respuestas a la vez (ej: corregir a toda una clase).
+
+    Mismo criterio que /evaluate, pero los sujetos se extraen con una sola
+    pasada de spaCy, los textos se codifican en un solo lote y las
+    similitudes salen de un solo producto de matrices.
+
+    - pares: Lista de {texto_modelo, texto_nino}
+    - umbral: Umbral de similitud (default: 0.6)
+
+    Retorna:
+    - resultados: Un elemento por par, en el mismo orden, con el formato de /evaluate
+    - correctas: Cantidad de respuestas correctas
+    """
+    n = len(lote.pares)
+    print(f"\n🔍 /evaluate-batch - {n} pares - Umbral: {lote.umbral}")
+
+    if n > EVALUATE_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Demasiados pares ({n}); el máximo por petición es {EVALUATE_BATCH_MAX}"
+        )
+
+    try:
+        import time
+        start_time = time.time()
+
+        pares = [(par.texto_modelo, par.texto_nino) for par in lote.pares]
+        evaluaciones = await ejecutar_inferencia(request, _evaluar_lote_sync, pares, lote.umbral)
+
+        processing_time = time.time() - start_time
+
+        resultados = [
+            {
+                "mensaje": "¡Felicidades, respuesta correcta!" if r['es_correcta'] else "¡Inténtalo de nuevo!",
+                "es_correcta": r['es_correcta'],
+                "detalles": {
+                    "sujeto_modelo": r['sujeto_modelo'],
+                    "sujeto_nino": r['sujeto_nino'],
+                    "sujeto_igual": r['sujeto_igual'],
+                    "similitud": _redondear(r['similitud']),
+                    "indice_lexico": _redondear(r['indice_lexico']),
+                    "umbral": r['umbral'],
+                    "nivel": r['nivel']
+                }
+            }
+            for r in evaluaciones
+        ]
+        correctas = sum(1 for r in evaluaciones if r['es_correcta'])
+        print(f"✅ {processing_time:.2f}s - {correctas}/{n} correctas")
+
+        return JSONResponse(
+            content={
+                "resultados": resultados,
+                "total": n,
+                "correctas": correctas,
+                "processing_time_seconds": round(processing_time, 2)
+            },
+            media_type="application/json; charset=utf-8"
+        )
+
+    except HTTPException:
+        raise
+    except ImportError as e:
+        print(f"❌ Error: Módulo no disponible: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Evaluador no disponible. Instala: pip install sentence-transformers spacy && python -m spacy download es_core_news_sm"
+        )
+    except Exception as e:
+        print(f"❌ Error evaluando lote: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error evaluando lote: {str(e)}"
+        )
+
+
 # ============================================
 # ENDPOINT DE JUEGO INTERACTIVO
 # ============================================
@@ -235,8 +428,79 @@ class ValidarRetoRequest(BaseModel):
     umbral: float = 0.7
 
 
+def _comparar_sujetos(sujeto_solicitado: str, sujeto_detectado, umbral: float):
+    """
+    Compara el sujeto detectado con el solicitado (exacto o similitud semántica).
+
+    Returns:
+        tuple: (es_correcto, similitud)
+    """
+    from activities.evaluator_game import similitud_semantica
+    
+    if not (sujeto_detectado and sujeto_solicitado):
+        return False, 0.0
+    
+    # Normalizar para comparación
+    sujeto_solicitado_norm = sujeto_solicitado.lower().strip()
+    sujeto_detectado_norm = sujeto_detectado.lower().strip()
+    
+    # Comparación exacta o similitud semántica
+    if sujeto_solicitado_norm == sujeto_detectado_norm:
+        return True, 1.0
+    similitud = similitud_semantica(sujeto_solicitado_norm, sujeto_detectado_norm)
+    return similitud >= umbral, similitud
+
+
+def _validar_reto_sync(pil_image, sujeto_solicitado: str, umbral: float):
+    """
+    Parte bloqueante de /validar-reto.
+
+    Primero intenta verificar el sujeto puntuando el catálogo de captions
+    (una sola pasada del modelo). Solo si el resultado es ambiguo, o el
+    sujeto no está en el catálogo, genera la descripción completa y extrae
+    el sujeto con spaCy. En ambos casos el sujeto detectado se compara con
+    el solicitado igual (_comparar_sujetos, con `umbral`).
+
+    Se ejecuta en el pool de inferencia para no congelar el event loop.
+
+    Returns:
+        tuple: (descripcion_completa, sujeto_detectado, es_correcto, similitud,
+                probabilidad, metodo); `probabilidad` es P(sujeto solicitado)
+                de la verificación (None si se generó el caption)
+    """
+    # 2a. Verificación directa contra el catálogo
+    from blip.generation import quick_verificar_sujeto, quick_generate
+    
+    verificacion = quick_verificar_sujeto(pil_image, sujeto_solicitado)
+    if verificacion is not None:
+        sujeto_detectado = verificacion["sujeto_detectado"]
+        es_correcto, similitud = _comparar_sujetos(sujeto_solicitado, sujeto_detectado, umbral)
+        return (
+            verificacion["descripcion"],
+            sujeto_detectado,
+            es_correcto,
+            similitud,
+            verificacion["probabilidad"],
+            "verificacion",
+        )
+    
+    # 2b. Generar descripción completa con BLIP
+    descripcion_completa = quick_generate(pil_image)
+    
+    # 3. Extraer sujeto de la descripción
+    from activities.evaluator_game import obtener_sujeto
+    
+    sujeto_detectado = obtener_sujeto(descripcion_completa)
+    
+    # 4. Comparar sujetos
+    es_correcto, similitud = _comparar_sujetos(sujeto_solicitado, sujeto_detectado, umbral)
+    
+    return descripcion_completa, sujeto_detectado, es_correcto, similitud, None, "generacion"
+
+
 @app.post("/validar-reto")
 async def validar_reto(
+    request: Request,
     image: UploadFile = File(...),
     sujeto_solicitado: str = Form(...),
     umbral: float = Form(0.7)
@@ -246,10 +510,10 @@ async def validar_reto(
     
     Flujo:
     1. Recibe imagen y sujeto solicitado (ej: "caballo", "burro")
-    2. Genera descripción completa con BLIP
-    3. Extrae el sujeto de la descripción
-    4. Compara con el sujeto solicitado
-    5. Devuelve: correcto, sujeto_detectado, descripcion_completa
+    2. Verifica el sujeto puntuando el catálogo de captions (una pasada)
+    3. Si es ambiguo: genera la descripción completa con BLIP, extrae el
+       sujeto y lo compara con el solicitado
+    4. Devuelve: correcto, sujeto_detectado, descripcion_completa
     
     Args:
     - image: Imagen a analizar
@@ -261,49 +525,32 @@ async def validar_reto(
     - sujeto_solicitado: Sujeto que se le pidió al niño
     - sujeto_detectado: Sujeto extraído de la imagen
     - descripcion_completa: Caption completo generado por BLIP
-    - similitud: Similitud semántica entre los sujetos
+    - similitud: Similitud semántica entre los sujetos (se compara con umbral)
+    - probabilidad: P(sujeto solicitado) según el catálogo (solo con metodo
+      "verificacion"; null si se generó el caption)
+    - metodo: "verificacion" (catálogo) o "generacion" (caption libre)
     """
     print(f"\n🎮 /validar-reto - Solicitado: '{sujeto_solicitado}'")
     
     try:
-        # 1. Validar imagen
-        file_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(file_bytes))
+        # 1. Leer, validar y decodificar imagen (en un hilo)
+        ingesta = await ingerir_imagen(image)
+        pil_image = ingesta.imagen
         
-        # 2. Generar descripción completa con BLIP
+        # 2-4. Generar descripción, extraer sujeto y comparar (en el pool de inferencia)
         import time
         start_time = time.time()
         
-        descripcion_completa = quick_generate(pil_image)
-        
-        # 3. Extraer sujeto de la descripción
-        from activities.evaluator_game import obtener_sujeto, similitud_semantica
-        
-        sujeto_detectado = obtener_sujeto(descripcion_completa)
-        
-        # 4. Comparar sujetos
-        if sujeto_detectado and sujeto_solicitado:
-            # Normalizar para comparación
-            sujeto_solicitado_norm = sujeto_solicitado.lower().strip()
-            sujeto_detectado_norm = sujeto_detectado.lower().strip()
-            
-            # Comparación exacta o similitud semántica
-            if sujeto_solicitado_norm == sujeto_detectado_norm:
-                es_correcto = True
-                similitud = 1.0
-            else:
-                similitud = similitud_semantica(sujeto_solicitado_norm, sujeto_detectado_norm)
-                es_correcto = similitud >= umbral
-        else:
-            es_correcto = False
-            similitud = 0.0
+        descripcion_completa, sujeto_detectado, es_correcto, similitud, probabilidad, metodo = await ejecutar_inferencia(
+            request, _validar_reto_sync, pil_image, sujeto_solicitado, umbral
+        )
         
         processing_time = time.time() - start_time
         
         # 5. Preparar respuesta
         mensaje = "¡Correcto! 🎉" if es_correcto else "¡Inténtalo de nuevo!"
         
-        print(f"{'✅' if es_correcto else '❌'} {processing_time:.2f}s - Detectado: '{sujeto_detectado}' - Similitud: {similitud:.3f}")
+        print(f"{'✅' if es_correcto else '❌'} {processing_time:.2f}s - Detectado: '{sujeto_detectado}' - Similitud: {similitud:.3f} ({metodo})")
         
         return JSONResponse(
             content={
@@ -314,11 +561,16 @@ async def validar_reto(
                 "descripcion_completa": descripcion_completa,
                 "similitud": round(similitud, 4),
                 "umbral": umbral,
-                "processing_time_seconds": round(processing_time, 2)
+                "probabilidad": _redondear(probabilidad),
+                "metodo": metodo,
+                "processing_time_seconds": round(processing_time, 2),
+                "tiempos_ms": dict(ingesta.tiempos_ms, inferencia=round(1000 * processing_time, 2))
             },
             media_type="application/json; charset=utf-8"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error validando reto: {str(e)}")
         raise HTTPException(
@@ -452,8 +704,33 @@ class CaracteristicasRequest(BaseModel):
     umbral: float = 0.7
 
 
+def _validar_caracteristicas_sync(pil_image, caracteristicas_nino: list):
+    """
+    Parte bloqueante de /validar-caracteristicas (modelo de características + validación).
+
+    Se ejecuta en el pool de inferencia para no congelar el event loop.
+
+    Returns:
+        tuple: (descripcion_modelo, resultado de validar_juego_caracteristicas)
+    """
+    from characteristics_model import quick_generate_characteristics
+    descripcion_modelo = quick_generate_characteristics(pil_image)
+    
+    print(f"   Descripción modelo: {descripcion_modelo}")
+    
+    # Validar características (comparación exacta)
+    from activities import validar_juego_caracteristicas
+    
+    resultado = validar_juego_caracteristicas(
+        descripcion_modelo=descripcion_modelo,
+        caracteristicas_nino=caracteristicas_nino
+    )
+    return descripcion_modelo, resultado
+
+
 @app.post("/validar-caracteristicas")
 async def validar_caracteristicas(
+    request: Request,
     image: UploadFile = File(...),
     caracteristicas_seleccionadas: str = Form(...)  # JSON string de lista o CSV
 ):
@@ -485,9 +762,9 @@ async def validar_caracteristicas(
     print(f"\n🎮 /validar-caracteristicas - Imagen: {image.filename}")
     
     try:
-        # 1. Validar y cargar imagen
-        file_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(file_bytes))
+        # 1. Leer, validar y decodificar imagen (en un hilo)
+        ingesta = await ingerir_imagen(image)
+        pil_image = ingesta.imagen
         
         # 2. Parsear características seleccionadas
         # Acepta tanto JSON como texto separado por comas
@@ -508,21 +785,12 @@ async def validar_caracteristicas(
         
         print(f"   Características seleccionadas: {caracteristicas_nino}")
         
-        # 3. Generar descripción con el modelo de características
+        # 3-4. Generar descripción y validar características (en el pool de inferencia)
         import time
         start_time = time.time()
         
-        from characteristics_model import quick_generate_characteristics
-        descripcion_modelo = quick_generate_characteristics(pil_image)
-        
-        print(f"   Descripción modelo: {descripcion_modelo}")
-        
-        # 4. Validar características (comparación exacta)
-        from activities import validar_juego_caracteristicas
-        
-        resultado = validar_juego_caracteristicas(
-            descripcion_modelo=descripcion_modelo,
-            caracteristicas_nino=caracteristicas_nino
+        descripcion_modelo, resultado = await ejecutar_inferencia(
+            request, _validar_caracteristicas_sync, pil_image, caracteristicas_nino
         )
         
         processing_time = time.time() - start_time
@@ -547,7 +815,8 @@ async def validar_caracteristicas(
                 "total_correctas": resultado["total_correctas"],
                 "detalles": resultado["detalles"],
                 "descripcion_completa": resultado["descripcion_completa"],
-                "processing_time_seconds": round(processing_time, 2)
+                "processing_time_seconds": round(processing_time, 2),
+                "tiempos_ms": dict(ingesta.tiempos_ms, inferencia=round(1000 * processing_time, 2))
             },
             media_type="application/json; charset=utf-8"
         )
@@ -0,0 +1,91 @@
+"""
+Paridad del léxico de sujetos con spaCy (evaluator_game de activities/).
+
+_sujeto_por_lexico() responde sin spaCy cuando la frase nombra un animal
+conocido tras un determinante o un sistema del cuerpo en el título. Este
+script compara esa respuesta con la de spaCy (la ruta sin léxico de
+_obtener_sujeto_sin_cache) sobre:
+- Los captions del catálogo de BLIP (si hay catálogo)
+- Las descripciones de analizar_sujetos.py
+- Respuestas cortas de niños armadas con los sujetos de esas frases
+
+Reporta cuántas frases resuelve el léxico, cuántas coinciden con spaCy y
+lista las que no coinciden.
+
+Uso:
+    python paridad_lexico_sujetos.py
+"""
+
+import csv
+
+from activities import evaluator_game
+from analizar_sujetos import csv_data
+
+PLANTILLAS_RESPUESTA = (
+    "es un {}",
+    "veo un {}",
+    "Un {} en la imagen",
+    "es muy {}",
+    "{} en la imagen",
+)
+
+
+def sujeto_spacy(frase):
+    """Sujeto de _obtener_sujeto_sin_cache sin el camino rápido del léxico."""
+    if ":" in frase:
+        prefijo, resto = frase.split(":", 1)
+        prefijo = prefijo.strip().lower()
+        for sistema in evaluator_game.SISTEMAS_CUERPO:
+            if sistema in prefijo:
+                return f"sistema {sistema}"
+        sujeto = evaluator_game._extraer_sujeto_de_texto(resto.strip())
+        if sujeto:
+            return sujeto
+    return evaluator_game._extraer_sujeto_de_texto(frase)
+
+
+def frases_de_referencia():
+    """Captions del catálogo, descripciones y respuestas cortas (sin repetir)."""
+    try:
+        from cache_sujetos import captions_catalogo
+        captions = captions_catalogo()
+    except Exception as e:
+        print(f"⚠️ Sin catálogo de BLIP ({e}); solo descripciones")
+        captions = []
+    descripciones = [fila["content"] for fila in csv.DictReader(csv_data.strip().splitlines())]
+    frases = list(dict.fromkeys(captions + descripciones))
+
+    sujetos = {sujeto_spacy(frase) for frase in frases} - {None}
+    respuestas = [plantilla.format(sujeto) for sujeto in sorted(sujetos)
+                  for plantilla in PLANTILLAS_RESPUESTA]
+    return len(captions), len(descripciones), frases + respuestas
+
+
+def paridad():
+    n_captions, n_descripciones, frases = frases_de_referencia()
+    print(f"📄 {n_captions} captions del catálogo, {n_descripciones} descripciones, "
+          f"{len(frases)} frases en total")
+
+    resueltas = 0
+    distintas = []
+    for frase in frases:
+        lexico = evaluator_game._sujeto_por_lexico(frase)
+        if lexico is None:
+            continue
+        resueltas += 1
+        spacy = sujeto_spacy(frase)
+        if lexico != spacy:
+            distintas.append((frase, lexico, spacy))
+
+    print("=" * 88)
+    print(f"⚡ Resueltas por el léxico: {resueltas}/{len(frases)} "
+          f"({resueltas / len(frases):.1%}); el resto va a spaCy")
+    print(f"✅ Coinciden con spaCy: {resueltas - len(distintas)}/{resueltas}")
+    for frase, lexico, spacy in distintas:
+        print(f"❌ léxico={lexico!r} spaCy={spacy!r}  {frase[:70]!r}")
+    print("=" * 88)
+    return resueltas, distintas
+
+
+if __name__ == "__main__":
+    paridad()
@@ -0,0 +1,29 @@
+"""
+Precalcula los embeddings de texto del catálogo para similitud_semantica().
+
+Codifica los captions, sujetos y carpetas del catálogo de BLIP
+(blip/catalogo.py o BLIP_CATALOGO_PATH) con el SentenceTransformer
+configurado y los guarda en TEXT_EMBEDDINGS_PATH. Al arrancar, la API los
+carga y esas comparaciones ya no pasan por el modelo.
+
+Uso:
+    python precalcular_embeddings.py [salida.npz]
+"""
+
+import sys
+import time
+
+from embeddings_texto import get_almacen_embeddings, ruta_embeddings_catalogo, textos_catalogo
+
+
+def main(ruta=None):
+    ruta = ruta or ruta_embeddings_catalogo()
+    textos = textos_catalogo()
+    print(f"⏳ Codificando {len(textos)} textos del catálogo...")
+    inicio = time.perf_counter()
+    total = get_almacen_embeddings().precalcular(textos, ruta)
+    print(f"✅ {total} embeddings guardados en {ruta} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
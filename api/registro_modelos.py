@@ -0,0 +1,216 @@
+# registro_modelos.py - Registro compartido de modelos de texto (spaCy, SentenceTransformer)
+"""
+Registro de modelos de texto compartido por todo el proceso.
+
+evaluador.py (/evaluate) y activities/evaluator_game.py (/validar-reto y las
+actividades) cargaban cada uno su propio spacy.load("es_core_news_sm") y
+SentenceTransformer(MiniLM). Con /evaluate y /validar-reto en uso, el
+servidor tenía dos copias de cada modelo.
+
+Este módulo:
+- Carga cada modelo UNA sola vez por proceso, en el primer uso
+- Es thread-safe: cargas concurrentes del mismo modelo esperan a la primera;
+  cargas de modelos distintos no se bloquean entre sí
+- Lleva cuenta de memoria (parámetros y RSS al cargar) y de uso por consumidor
+
+Uso:
+    from registro_modelos import get_nlp, get_sentence_transformer
+    doc = get_nlp("evaluador")("El perro come.")
+    emb = get_sentence_transformer("evaluador").encode("El perro come.")
+    get_registro().stats()  # para /stats
+"""
+
+import os
+import threading
+import time
+
+from blip.memoria import memoria_residente_bytes
+
+SPACY = "spacy"
+SENTENCE_TRANSFORMER = "sentence_transformer"
+
+# Componentes de spaCy que los evaluadores no usan: solo necesitan POS,
+# lemas y noun_chunks (tok2vec, morphologizer, parser, attribute_ruler,
+# lemmatizer). Sin NER cada frase se analiza más rápido.
+COMPONENTES_SPACY_NO_USADOS = ("ner",)
+
+
+def componentes_spacy_excluidos():
+    """Componentes que no se cargan (SPACY_SLIM=1, default) o ninguno (SPACY_SLIM=0)."""
+    if os.getenv('SPACY_SLIM', '1') == '1':
+        return list(COMPONENTES_SPACY_NO_USADOS)
+    return []
+
+
+def _cargar_spacy():
+    import spacy
+    return spacy.load(os.getenv('SPACY_MODEL', 'es_core_news_sm'), exclude=componentes_spacy_excluidos())
+
+
+def nombre_sentence_transformer():
+    """Modelo de sentence-transformers configurado (SENTENCE_MODEL)."""
+    return os.getenv('SENTENCE_MODEL', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+
+
+def _cargar_sentence_transformer():
+    # torch, int8 u onnx según SENTENCE_ENCODER_BACKEND (encoder_texto.py)
+    from encoder_texto import cargar_encoder
+    return cargar_encoder(nombre_sentence_transformer())
+
+
+def _bytes_parametros(modelo):
+    """Bytes de parámetros + buffers si es un módulo de torch (None si no)."""
+    parametros = getattr(modelo, "parameters", None)
+    if parametros is None:
+        return None
+    total = sum(p.numel() * p.element_size() for p in parametros())
+    total += sum(b.numel() * b.element_size() for b in modelo.buffers())
+    return total
+
+
+class _Entrada:
+    """Un modelo registrado y su contabilidad."""
+
+    __slots__ = ("fabrica", "modelo", "lock", "ms_carga", "bytes_parametros",
+                 "bytes_rss_carga", "usos", "ultimo_uso")
+
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+        self.modelo = None
+        self.lock = threading.Lock()
+        self.ms_carga = None
+        self.bytes_parametros = None
+        self.bytes_rss_carga = None
+        self.usos = {}
+        self.ultimo_uso = None
+
+
+class RegistroModelos:
+    """
+    Modelos cargados una sola vez por proceso, identificados por nombre.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre, fabrica):
+        """
+        Registra cómo se carga un modelo (no lo carga todavía).
+
+        Args:
+            nombre: Identificador del modelo
+            fabrica: Función sin argumentos que devuelve el modelo cargado
+        """
+        with self._lock:
+            if nombre not in self._entradas:
+                self._entradas[nombre] = _Entrada(fabrica)
+
+    def obtener(self, nombre, consumidor=None):
+        """
+        Devuelve el modelo, cargándolo la primera vez.
+
+        Args:
+            nombre: Identificador registrado
+            consumidor: Quién lo usa (para la cuenta de uso en stats())
+
+        Raises:
+            KeyError: Si el modelo no está registrado
+        """
+        with self._lock:
+            entrada = self._entradas[nombre]
+
+        if entrada.modelo is None:
+            # Lock por modelo: cargar spaCy no bloquea al SentenceTransformer
+            with entrada.lock:
+                if entrada.modelo is None:
+                    self._cargar(nombre, entrada)
+
+        with self._lock:
+            clave = consumidor or "otros"
+            entrada.usos[clave] = entrada.usos.get(clave, 0) + 1
+            entrada.ultimo_uso = time.time()
+        return entrada.modelo
+
+    def _cargar(self, nombre, entrada):
+        print(f"⏳ Cargando modelo compartido '{nombre}'...")
+        rss_antes = memoria_residente_bytes()
+        inicio = time.perf_counter()
+        modelo = entrada.fabrica()
+        entrada.ms_carga = round(1000 * (time.perf_counter() - inicio), 1)
+
+        rss_despues = memoria_residente_bytes()
+        if rss_antes is not None and rss_despues is not None:
+            # Aproximado: otras cargas en paralelo también suman al RSS
+            entrada.bytes_rss_carga = max(0, rss_despues - rss_antes)
+        entrada.bytes_parametros = _bytes_parametros(modelo)
+        entrada.modelo = modelo
+        print(f"✅ Modelo compartido '{nombre}' cargado en {entrada.ms_carga / 1000:.1f} s")
+
+    def cargado(self, nombre):
+        """True si el modelo ya está en memoria."""
+        with self._lock:
+            entrada = self._entradas.get(nombre)
+            return entrada is not None and entrada.modelo is not None
+
+    def stats(self):
+        """Memoria y uso de cada modelo registrado (para /stats)."""
+        with self._lock:
+            return {
+                nombre: {
+                    "cargado": entrada.modelo is not None,
+                    "ms_carga": entrada.ms_carga,
+                    "mb_parametros": (
+                        round(entrada.bytes_parametros / 2**20, 1)
+                        if entrada.bytes_parametros is not None else None
+                    ),
+                    "mb_rss_carga": (
+                        round(entrada.bytes_rss_carga / 2**20, 1)
+                        if entrada.bytes_rss_carga is not None else None
+                    ),
+                    "usos": sum(entrada.usos.values()),
+                    "usos_por_consumidor": dict(entrada.usos),
+                    "ultimo_uso": entrada.ultimo_uso,
+                }
+                for nombre, entrada in self._entradas.items()
+            }
+
+
+# ============================================
+# 🌍 Instancia global
+# ============================================
+
+_global_registro = None
+_global_registro_lock = threading.Lock()
+
+
+def get_registro():
+    """
+    Obtiene o crea el registro global con spaCy y el SentenceTransformer registrados.
+
+    Configuración desde .env:
+        SPACY_MODEL: Pipeline de spaCy (default: es_core_news_sm)
+        SPACY_SLIM: 1 = sin los componentes no usados (NER); 0 = pipeline completo
+        SENTENCE_MODEL: Modelo de sentence-transformers
+            (default: sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2)
+        SENTENCE_ENCODER_BACKEND: torch (default), int8 u onnx (encoder_texto.py)
+    """
+    global _global_registro
+    if _global_registro is None:
+        with _global_registro_lock:
+            if _global_registro is None:
+                registro = RegistroModelos()
+                registro.registrar(SPACY, _cargar_spacy)
+                registro.registrar(SENTENCE_TRANSFORMER, _cargar_sentence_transformer)
+                _global_registro = registro
+    return _global_registro
+
+
+def get_nlp(consumidor=None):
+    """Pipeline de spaCy en español compartido."""
+    return get_registro().obtener(SPACY, consumidor)
+
+
+def get_sentence_transformer(consumidor=None):
+    """SentenceTransformer multilingüe compartido."""
+    return get_registro().obtener(SENTENCE_TRANSFORMER, consumidor)
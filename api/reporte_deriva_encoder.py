@@ -0,0 +1,167 @@
+"""
+Reporte de deriva de los backends del encoder de frases (encoder_texto.py).
+
+Compara los puntajes de similitud de cada backend contra el encoder actual
+(torch float32) sobre las descripciones de analizar_sujetos.py:
+- Cada descripción contra todas las demás (matriz completa de cosenos)
+- Cada descripción contra respuestas cortas de un niño ("es un burro")
+
+Reporta por backend:
+- Diferencia absoluta de los cosenos (media, p95, máxima) y correlación
+- Decisiones que cambian con los umbrales de la API: /evaluate (similitud
+  + 0.15 >= 0.6) y /validar-reto (similitud >= 0.6)
+- Vecino más cercano de cada descripción igual al de torch
+- Tiempo de encode por frase
+
+Uso:
+    python reporte_deriva_encoder.py [backend ...] [--csv deriva.csv]
+
+Backends: int8, onnx (INT8), onnx-fp32. Sin argumentos se miden todos.
+"""
+
+import csv
+import sys
+import time
+
+import numpy as np
+
+from analizar_sujetos import csv_data
+from encoder_texto import cargar_encoder
+from registro_modelos import nombre_sentence_transformer
+
+BACKENDS = ("int8", "onnx", "onnx-fp32")
+UMBRAL = 0.6
+BONUS_EVALUADOR = 0.15
+PLANTILLAS_RESPUESTA = ("es un {}", "veo {}")
+
+
+def frases_de_referencia():
+    """Descripciones de analizar_sujetos.py y respuestas cortas por carpeta."""
+    filas = list(csv.DictReader(csv_data.strip().splitlines()))
+    descripciones = [fila['content'].strip() for fila in filas]
+    respuestas = [
+        plantilla.format(fila['folder_name'].strip().replace('_', ' '))
+        for fila in filas for plantilla in PLANTILLAS_RESPUESTA
+    ]
+    return descripciones, respuestas
+
+
+def cargar(backend):
+    # Estricto: si el backend falla no se compara torch contra sí mismo
+    nombre = nombre_sentence_transformer()
+    if backend == "onnx-fp32":
+        return cargar_encoder(nombre, "onnx", onnx_int8=False, estricto=True)
+    if backend == "onnx":
+        return cargar_encoder(nombre, "onnx", onnx_int8=True, estricto=True)
+    return cargar_encoder(nombre, backend, estricto=True)
+
+
+def codificar(encoder, frases):
+    """Embeddings normalizados [N, D] y ms por frase."""
+    encoder.encode(frases[:4], batch_size=4, convert_to_numpy=True, show_progress_bar=False)
+    inicio = time.perf_counter()
+    vectores = encoder.encode(
+        frases, batch_size=32, convert_to_numpy=True,
+        normalize_embeddings=True, show_progress_bar=False,
+    )
+    ms = 1000 * (time.perf_counter() - inicio) / len(frases)
+    return np.asarray(vectores, dtype=np.float32), ms
+
+
+def puntajes(vectores, n_descripciones):
+    """Cosenos descripción-descripción (triángulo superior) y descripción-respuesta."""
+    descripciones = vectores[:n_descripciones]
+    respuestas = vectores[n_descripciones:]
+    entre_descripciones = descripciones @ descripciones.T
+    filas, columnas = np.triu_indices(n_descripciones, k=1)
+    return {
+        "descripciones": entre_descripciones,
+        "pares": np.concatenate([
+            entre_descripciones[filas, columnas],
+            (descripciones @ respuestas.T).ravel(),
+        ]),
+    }
+
+
+def comparar(referencia, candidato):
+    diferencia = np.abs(candidato["pares"] - referencia["pares"])
+
+    def decisiones(pares, bonus):
+        return np.minimum(pares + bonus, 1.0) >= UMBRAL
+
+    def vecinos(matriz):
+        matriz = matriz.copy()
+        np.fill_diagonal(matriz, -np.inf)
+        return matriz.argmax(axis=1)
+
+    return {
+        "pares": len(diferencia),
+        "dif_media": float(diferencia.mean()),
+        "dif_p95": float(np.percentile(diferencia, 95)),
+        "dif_max": float(diferencia.max()),
+        "correlacion": float(np.corrcoef(referencia["pares"], candidato["pares"])[0, 1]),
+        "cambios_evaluate": int((decisiones(referencia["pares"], BONUS_EVALUADOR)
+                                 != decisiones(candidato["pares"], BONUS_EVALUADOR)).sum()),
+        "cambios_validar_reto": int((decisiones(referencia["pares"], 0.0)
+                                     != decisiones(candidato["pares"], 0.0)).sum()),
+        "vecino_igual": float((vecinos(referencia["descripciones"])
+                               == vecinos(candidato["descripciones"])).mean()),
+    }
+
+
+def reporte(backends=BACKENDS, ruta_csv=None):
+    descripciones, respuestas = frases_de_referencia()
+    frases = descripciones + respuestas
+    print(f"📄 {len(descripciones)} descripciones + {len(respuestas)} respuestas cortas")
+    print(f"🧠 Modelo: {nombre_sentence_transformer()}")
+
+    print("⏳ Encoder de referencia (torch float32)...")
+    vectores, ms_referencia = codificar(cargar("torch"), frases)
+    referencia = puntajes(vectores, len(descripciones))
+
+    filas = []
+    for backend in backends:
+        print(f"⏳ Backend {backend}...")
+        try:
+            vectores, ms = codificar(cargar(backend), frases)
+        except Exception as e:
+            print(f"❌ Backend {backend} no disponible: {e}")
+            continue
+        fila = {"backend": backend, "ms_por_frase": ms, "aceleracion": ms_referencia / ms}
+        fila.update(comparar(referencia, puntajes(vectores, len(descripciones))))
+        filas.append(fila)
+
+    print("=" * 100)
+    print(f"{'Backend':10s} {'ms/frase':>9s} {'x':>5s} {'dif media':>10s} {'p95':>8s} {'máx':>8s} "
+          f"{'corr':>7s} {'Δ/evaluate':>11s} {'Δ/validar':>10s} {'vecino':>7s}")
+    print("-" * 100)
+    print(f"{'torch':10s} {ms_referencia:>9.2f} {1.0:>5.1f} {'-':>10s} {'-':>8s} {'-':>8s} "
+          f"{'-':>7s} {'-':>11s} {'-':>10s} {'-':>7s}")
+    for fila in filas:
+        print(f"{fila['backend']:10s} {fila['ms_por_frase']:>9.2f} {fila['aceleracion']:>5.1f} "
+              f"{fila['dif_media']:>10.4f} {fila['dif_p95']:>8.4f} {fila['dif_max']:>8.4f} "
+              f"{fila['correlacion']:>7.4f} {fila['cambios_evaluate']:>5d}/{fila['pares']:<5d} "
+              f"{fila['cambios_validar_reto']:>4d}/{fila['pares']:<5d} {fila['vecino_igual']:>6.0%}")
+    print("=" * 100)
+    print("Δ = decisiones que cambian respecto a torch con el umbral de cada endpoint")
+
+    if ruta_csv and filas:
+        with open(ruta_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(filas[0]))
+            writer.writeheader()
+            writer.writerows(filas)
+        print(f"💾 Reporte guardado en {ruta_csv}")
+    return filas
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    ruta_csv = None
+    if "--csv" in argumentos:
+        i = argumentos.index("--csv")
+        ruta_csv = argumentos[i + 1]
+        del argumentos[i:i + 2]
+    desconocidos = [a for a in argumentos if a not in BACKENDS]
+    if desconocidos:
+        sys.exit(f"Backends desconocidos {desconocidos} (usa {', '.join(BACKENDS)})")
+    reporte(tuple(argumentos) or BACKENDS, ruta_csv)
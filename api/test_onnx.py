@@ -0,0 +1,110 @@
+"""
+Test de paridad: backend ONNX Runtime vs. PyTorch de BlipEspanol
+
+Carga el mismo checkpoint con BLIP_BACKEND=torch y BLIP_BACKEND=onnx y
+compara, para cada imagen del set de referencia
+(predicciones_test4-compromiso.csv):
+- image_embeds del encoder de visión (diferencia máxima)
+- Caption generado (modo "full")
+- Caption del catálogo más probable (modo "catalog", sin umbral)
+
+Ambos backends usan pesos INT8 cuantizados de forma distinta (torch vs.
+onnxruntime), así que no se exige igualdad bit a bit: el test pasa si al
+menos COINCIDENCIA_MINIMA de los captions son idénticos.
+
+Uso:
+    python test_onnx.py [carpeta_imagenes] [csv_referencia]
+
+Sin carpeta se usan imágenes sintéticas.
+"""
+
+import os
+import sys
+
+# La cache de embeddings se comparte por checkpoint: desactivarla para que un
+# backend no reciba los embeddings calculados por el otro
+os.environ['BLIP_FEATURE_CACHE_ENABLED'] = '0'
+
+import torch
+from PIL import Image
+
+from benchmark_caminos import CSV_REFERENCIA, leer_referencia
+from blip.catalogo import obtener_catalogo
+from blip.generation import BlipEspanol
+from imagenes_prueba import imagenes_sinteticas
+
+COINCIDENCIA_MINIMA = 0.9
+
+
+def cargar(backend):
+    os.environ['BLIP_BACKEND'] = backend
+    modelo = BlipEspanol.from_pretrained()
+    modelo.cargar_catalogo(obtener_catalogo())
+    return modelo
+
+
+def test_onnx(carpeta_imagenes=None, ruta_csv=CSV_REFERENCIA):
+    print("=" * 60)
+    print("🧪 TEST: PARIDAD ONNX RUNTIME vs. PYTORCH")
+    print("=" * 60)
+
+    if carpeta_imagenes:
+        rutas = [ruta for ruta, _ in leer_referencia(ruta_csv, carpeta_imagenes)]
+        imagenes = [Image.open(ruta) for ruta in rutas]
+        nombres = [os.path.basename(ruta) for ruta in rutas]
+    else:
+        imagenes = imagenes_sinteticas()
+        nombres = [f"sintetica_{i}" for i in range(len(imagenes))]
+    if not imagenes:
+        print(f"❌ No se encontró ninguna imagen del CSV en {carpeta_imagenes}")
+        return False
+
+    modelos = {"torch": cargar("torch"), "onnx": cargar("onnx")}
+    if not modelos["onnx"].onnx:
+        print("❌ No se pudo cargar el backend ONNX")
+        return False
+
+    diferencias = []
+    iguales = {"full": 0, "catalog": 0}
+    with torch.inference_mode():
+        for nombre, imagen in zip(nombres, imagenes):
+            imagen = modelos["torch"]._preparar_imagen(imagen)
+            pixel_values = modelos["torch"]._pixel_values([imagen])
+
+            embeds = {b: m._codificar_imagen(pixel_values) for b, m in modelos.items()}
+            diferencias.append((embeds["torch"] - embeds["onnx"]).abs().max().item())
+
+            captions = {}
+            for backend, modelo in modelos.items():
+                config = modelo._config_generacion()
+                salida = modelo._generar_desde_embeds(embeds[backend], config)
+                generado = modelo._corregir_texto(modelo.processor.decode(salida[0], skip_special_tokens=True))
+                mejor = modelo.puntuar_catalogo(embeds[backend]).argmax().item()
+                captions[backend] = {"full": generado, "catalog": modelo.catalogo["salidas"][mejor]}
+
+            for modo in iguales:
+                igual = captions["torch"][modo] == captions["onnx"][modo]
+                iguales[modo] += igual
+                if not igual:
+                    print(f"   ⚠️ [{modo}] {nombre}")
+                    print(f"      torch: {captions['torch'][modo][:70]}")
+                    print(f"      onnx:  {captions['onnx'][modo][:70]}")
+
+    total = len(imagenes)
+    print(f"\n1️⃣ image_embeds: diferencia máxima {max(diferencias):.3e} "
+          f"(promedio {sum(diferencias) / total:.3e})")
+    ok = True
+    for i, (modo, n) in enumerate(iguales.items(), 2):
+        tasa = n / total
+        ok = ok and tasa >= COINCIDENCIA_MINIMA
+        print(f"{i}️⃣ Captions '{modo}' idénticos: {n}/{total} ({100 * tasa:.1f}%)")
+
+    print("\n" + "=" * 60)
+    print("✅ Paridad verificada" if ok else "❌ Paridad NO verificada")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    sys.exit(0 if test_onnx(*argumentos[:2]) else 1)
@@ -0,0 +1,80 @@
+"""
+Test de paridad: PreprocesadorImagenes vs. BlipProcessor
+
+Verifica que el preprocesamiento rápido de BlipEspanol produce los mismos
+pixel_values que `processor(images=..., return_tensors="pt")` (salvo
+redondeo de float32) y que los captions generados son idénticos.
+
+Uso:
+    python test_preprocesamiento.py [imagen1.jpg imagen2.png ...]
+"""
+
+import sys
+import time
+
+import torch
+from PIL import Image
+
+from blip.generation import BlipEspanol, PreprocesadorImagenes
+from imagenes_prueba import imagenes_sinteticas
+
+TOLERANCIA = 1e-5
+
+
+def test_preprocesamiento(rutas=()):
+    print("=" * 60)
+    print("🧪 TEST: PARIDAD DEL PREPROCESAMIENTO RÁPIDO")
+    print("=" * 60)
+
+    modelo = BlipEspanol.from_pretrained()
+    if not PreprocesadorImagenes.compatible(modelo.processor.image_processor):
+        print("⚠️ La configuración del processor no es compatible con el camino rápido")
+        return False
+
+    rapido = PreprocesadorImagenes(modelo.processor.image_processor)
+    imagenes = [modelo._preparar_imagen(Image.open(r)) for r in rutas] or imagenes_sinteticas()
+
+    # 1. pixel_values (individual y en lote)
+    ok = True
+    inicio = time.perf_counter()
+    esperado = modelo.processor(images=imagenes, return_tensors="pt")["pixel_values"]
+    t_hf = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obtenido = rapido(imagenes)
+    t_rapido = time.perf_counter() - inicio
+
+    diferencia = (obtenido - esperado).abs().max().item()
+    print(f"\n1️⃣ pixel_values {tuple(obtenido.shape)}: diferencia máxima {diferencia:.2e}")
+    print(f"   BlipProcessor: {1000 * t_hf:.1f} ms | rápido: {1000 * t_rapido:.1f} ms")
+    if obtenido.dtype != esperado.dtype or obtenido.shape != esperado.shape or diferencia > TOLERANCIA:
+        print("❌ Los pixel_values no coinciden")
+        ok = False
+
+    for i, imagen in enumerate(imagenes):
+        individual = rapido([imagen])
+        if not torch.allclose(individual[0], obtenido[i], atol=0, rtol=0):
+            print(f"❌ La imagen {i} procesada sola difiere de la procesada en lote")
+            ok = False
+
+    # 2. Captions
+    print("\n2️⃣ Captions (BlipProcessor vs. rápido):")
+    config = modelo._config_generacion()
+    with torch.inference_mode():
+        for i in range(len(imagenes)):
+            captions = []
+            for pixel_values in (esperado[i:i + 1], obtenido[i:i + 1]):
+                salida = modelo._generar_desde_embeds(modelo._codificar_imagen(pixel_values), config)
+                captions.append(modelo.processor.decode(salida[0], skip_special_tokens=True))
+            igual = captions[0] == captions[1]
+            ok = ok and igual
+            print(f"   {'✅' if igual else '❌'} [{i}] {captions[1][:70]}")
+
+    print("\n" + "=" * 60)
+    print("✅ Paridad verificada" if ok else "❌ Paridad NO verificada")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_preprocesamiento(sys.argv[1:]) else 1)